@@ -1,21 +1,45 @@
-import os
+import importlib
+import logging
 import sys
+import threading
+import time
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-import google.generativeai as genai
+
+# Seconds spent importing the heavy modules, logged at startup
+IMPORT_TIMINGS = {}
+
+
+def timed_import(name):
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMINGS[name] = time.perf_counter() - started
+    return module
+
+
+import ast
 import json
-import pandas as pd
 import re
-import sys
-import io
-from config import settings
-from agentFunctions import agentFunctions
-import gradio as gr
 import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
+pd = timed_import("pandas")
+agentFunctions = timed_import("agentFunctions").agentFunctions
+from routeCache import RouteCache, relevant_history
+from historyCompactor import HistoryCompactor
+import explainTemplates
+from fastRouter import FastRouter
+from toolSpecs import validate_plan, merge_sibling_calls, normalize_plan, plan_schema, describe_tool, TOOL_SPECS
+import tracing
+import util
+gr = timed_import("gradio")
 
 # Sätt UTF-8 encoding för stdout/stderr
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+tracing.configure_logging()
+log = logging.getLogger("agentApp")
 
 def extract_json(text: str) -> str:
     """Extract and validate JSON from text, handling incomplete responses."""
@@ -70,6 +94,86 @@ def extract_json(text: str) -> str:
     
     return text[start:end]
 
+
+def parse_plan(text: str):
+    """
+    (plan, problems) for a routing reply: the JSON in it parsed, normalized and
+    validated. Python-style dicts (single quotes, None, trailing commas) are
+    accepted too. plan is None when the reply holds no object at all.
+    """
+    json_text = extract_json(text)
+    try:
+        plan = json.loads(json_text)
+    except json.JSONDecodeError as e:
+        try:
+            plan = ast.literal_eval(json_text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None, [f"reply is not valid JSON: {e}"]
+    plan = normalize_plan(plan)
+    return plan, validate_plan(plan)
+
+
+def repair_prompt(question: str, reply: str, problems: list) -> str:
+    """Asks the model to fix its own routing reply, with the specs of the tools it tried to use."""
+    mentioned = [tool for tool in TOOL_SPECS if tool in reply]
+    return f"""
+    You are a hockey data assistant routing a question to tools. Your previous reply could not be used:
+    {reply[:2000]}
+
+    Problems:
+    {chr(10).join("- " + problem for problem in problems)}
+
+    Tools and their parameters ([optional]):
+    {chr(10).join(describe_tool(tool) for tool in (mentioned or TOOL_SPECS))}
+
+    User question:
+    "{question}"
+
+    Return ONLY the corrected JSON object, either {{"tools": [{{"tool": ..., ...parameters}}]}} or
+    {{"tool": "none" or "enough", "explanation": ...}}, with no markdown formatting.
+    """
+
+
+# Set when the model rejects the response schema, routing falls back to plain text
+_structured_output_failed = False
+
+
+def structured_routing() -> bool:
+    """Whether routing asks for schema-constrained output, see ROUTER_STRUCTURED_OUTPUT."""
+    if _structured_output_failed:
+        return False
+    if settings.ROUTER_STRUCTURED_OUTPUT == "auto":
+        return settings.LLM_MODEL.startswith("gemini")
+    return settings.ROUTER_STRUCTURED_OUTPUT == "true"
+
+
+def route_config():
+    return get_genai().types.GenerationConfig(
+        temperature=0.0,
+        response_mime_type="application/json",
+        response_schema=plan_schema(),
+    )
+
+
+def generate_route(prompt: str, span_name: str):
+    """The model's reply to a routing prompt, with the schema when it is supported."""
+    global _structured_output_failed
+    with tracing.span(span_name) as current:
+        response = None
+        if structured_routing():
+            try:
+                response = get_model().generate_content(prompt, generation_config=route_config())
+                current.set(structured=True)
+            except Exception as e:
+                log.warning("Structured output failed, routing with plain text from now on: %s", e)
+                _structured_output_failed = True
+        if response is None:
+            response = get_model().generate_content(prompt)
+        text = response.text.strip()
+        tracing.record_tokens(current, "route", prompt, text, getattr(response, "usage_metadata", None))
+    return text
+
+
 def decide_tool(question: str, history_text: str = ""):
     """
     Decide which tool(s) to use based on the question and previous results.
@@ -79,7 +183,6 @@ def decide_tool(question: str, history_text: str = ""):
         previous_results: List of previous tool calls and their results
         history_text: Previous conversation history
     """
-    print()
     conversation_context = ""
     if history_text:
         conversation_context = f"\nConversation history:\n{history_text}\n"
@@ -99,27 +202,79 @@ def decide_tool(question: str, history_text: str = ""):
     "{question}"
     
     Decide which tool(s) to use. You can return:
-    1. A single tool call
-    2. Multiple tool calls (as a list) if the question requires data from multiple sources
+    1. A list with a single tool call
+    2. A list with multiple tool calls if the question requires data from multiple sources
     3. "none" if no tools can help, you have to giva an explanation of why
     4. "enough" if the chat history contains the information needed for answering a question
     
-    Return ONLY a JSON object with no markdown formatting, no explanation.
+    Return ONLY a JSON object with no markdown formatting, no explanation. Tool calls always go in the "tools" list,
+    a top-level "tool" is only "none" or "enough".
     
     Example formats:
-    Single tool: {{"tool": "get_player_overview", "player_name": "Sidney Crosby", "season": "20252026"}}
+    Single tool: {{"tools": [{{"tool": "get_player_overview", "player_name": "Sidney Crosby", "season": "20252026"}}]}}
     Multiple tools: {{"tools": [{{"tool": "get_player_overview", "player_name": "Sidney Crosby", "season": "20252026"}}, {{"tool": "get_player_overview", "player_name": "Connor McDavid", "season": "20252026"}}]}}    
     No tool: {{"tool": "none", "explanation": "I can only answer questions related to the NHL and not about fotboll."}}
     Enough: {{"tool": "enough", "explanation": "Based on Sidney Crosby and Steven Stamkos data from earlier in the conversation, Sidney Crosby had the better season"}}
     """
     
-    response = model.generate_content(prompt)
-    raw_text = response.text.strip()
-    
-    # Extract JSON from the response
-    json_text = extract_json(raw_text)
-    
-    return json_text
+    raw_text = generate_route(prompt, "llm.route")
+    plan, problems = parse_plan(raw_text)
+    if not problems:
+        return json.dumps(plan)
+
+    # One targeted repair round trip instead of failing the question
+    log.info("Repairing routing decision: %s", "; ".join(problems))
+    repaired_text = generate_route(repair_prompt(question, raw_text, problems), "llm.route_repair")
+    repaired, repair_problems = parse_plan(repaired_text)
+    tracing.metrics.inc(
+        "agent_route_repairs_total", help="Routing replies that needed a repair, by outcome",
+        outcome="fixed" if not repair_problems else "failed",
+    )
+    if repaired is not None and (not repair_problems or plan is None):
+        return json.dumps(repaired)
+    # Still invalid: the first plan if it parsed (its tool errors are reported per call), else the raw reply
+    return json.dumps(plan) if plan is not None else extract_json(repaired_text)
+
+
+route_cache = RouteCache(settings.ROUTE_CACHE_PATH, settings.ROUTE_CACHE_MAX_ENTRIES)
+history_compactor = HistoryCompactor(settings.HISTORY_TOKEN_BUDGET, max_turns=6, max_sessions=settings.HISTORY_MAX_SESSIONS)
+fast_router = FastRouter(settings.FAST_ROUTER_THRESHOLD, entity_kind=agentFunctions.entity_kind)
+
+
+def route_question(question: str, history_text: str = ""):
+    """
+    Decides which tool(s) to use, trying the cheap paths before decide_tool:
+    1. The fast router for common question shapes ("top 10 defensemen by points")
+    2. Memoized decisions, repeated questions reuse an earlier decision
+    Only decisions that parse and validate are cached, and never "enough" since
+    that one is an answer from the history itself.
+    """
+    season = util.get_season(datetime.date.today())
+
+    with tracing.span("route") as current:
+        if settings.FAST_ROUTER_ENABLED and not relevant_history(question, history_text):
+            plan = fast_router.route(question)
+            if plan is not None:
+                log.info("Routing decision from the fast router")
+                current.set(source="fast_router")
+                return json.dumps(plan)
+
+        plan = route_cache.get(question, season, history_text)
+        if plan is not None:
+            log.info("Routing decision from cache")
+            current.set(source="cache")
+            return json.dumps(plan)
+
+        current.set(source="llm")
+        decision = decide_tool(question, history_text)
+        try:
+            plan = json.loads(decision)
+        except json.JSONDecodeError:
+            return decision
+
+        if isinstance(plan, dict) and plan.get("tool") != "enough" and not validate_plan(plan):
+            route_cache.put(question, season, history_text, plan)
+        return decision
 
 
 def execute_tool(tool_name: str, params: dict):
@@ -165,6 +320,11 @@ def execute_tool(tool_name: str, params: dict):
             season=params.get("season"),
             n=params.get("n", 5)
         )
+    elif tool_name == "league_form_table":
+        return agentFunctions.league_form_table(
+            season=params.get("season"),
+            n=params.get("n", 5)
+        )
     elif tool_name == "get_player_form":
         return agentFunctions.get_player_form(
             player_name=params.get("player_name"),
@@ -183,29 +343,115 @@ def execute_tool(tool_name: str, params: dict):
             opponent=params.get("opponent"),
             season=params.get("season")
         )
+    elif tool_name == "get_rivalry":
+        return agentFunctions.get_rivalry(
+            team=params.get("team"),
+            opponent=params.get("opponent")
+        )
     elif tool_name == "get_player_performance_against_team":
         return agentFunctions.get_player_performance_against_team(
             player_name=params.get("player_name"),
             opponent_team_abbrev=params.get("opponent_team_abbrev"),
             season=params.get("season")
         )
+    elif tool_name == "compare_players":
+        return agentFunctions.compare_players(
+            player_names=params.get("player_names"),
+            season=params.get("season")
+        )
+    elif tool_name == "compare_goalies":
+        return agentFunctions.compare_goalies(
+            goalie_names=params.get("goalie_names"),
+            season=params.get("season")
+        )
+    elif tool_name == "compare_teams":
+        return agentFunctions.compare_teams(
+            team_names=params.get("team_names"),
+            season=params.get("season")
+        )
+    elif tool_name == "compare_player_form":
+        return agentFunctions.compare_player_form(
+            player_names=params.get("player_names"),
+            season=params.get("season"),
+            n=params.get("n", 5)
+        )
+    elif tool_name == "get_player_seasons":
+        return agentFunctions.get_player_seasons(
+            player_name=params.get("player_name"),
+            start_season=params.get("start_season"),
+            end_season=params.get("end_season")
+        )
+    elif tool_name == "get_team_seasons":
+        return agentFunctions.get_team_seasons(
+            team_name=params.get("team_name"),
+            start_season=params.get("start_season"),
+            end_season=params.get("end_season")
+        )
+    elif tool_name == "top_players_range":
+        return agentFunctions.top_players_range(
+            start_season=params.get("start_season"),
+            end_season=params.get("end_season"),
+            position=params.get("position"),
+            metric=params.get("metric", "points"),
+            n=params.get("n", 5),
+            min_games=params.get("min_games", 0)
+        )
+    elif tool_name == "top_goalies_range":
+        return agentFunctions.top_goalies_range(
+            start_season=params.get("start_season"),
+            end_season=params.get("end_season"),
+            metric=params.get("metric", "save_pct"),
+            n=params.get("n", 5),
+            min_games=params.get("min_games", 0)
+        )
     else:
         return f"Unknown tool: {tool_name}"
 
 
-def run_agent(question: str, history_text: str = ""):
+# Shared pool for the tool calls of multi-tool plans, bounds how many
+# feature-store reads run at the same time across all chats.
+tool_executor = ThreadPoolExecutor(
+    max_workers=settings.AGENT_MAX_PARALLEL_TOOLS,
+    thread_name_prefix="tool",
+)
+
+
+def execute_tool_isolated(tool_name: str, params: dict):
+    """Runs a tool and returns the error as text instead of raising, so one failing call doesn't abort the others."""
+    # One span name per known tool, anything else the LLM makes up shares one
+    span_name = f"tool.{tool_name}" if tool_name in TOOL_SPECS else "tool.unknown"
+    try:
+        with tracing.span(span_name, params=params):
+            return execute_tool(tool_name, params)
+    except Exception as e:
+        log.exception("Error in %s with params %s", tool_name, params)
+        return f"Error in {tool_name}: {str(e)}"
+
+
+def execute_tools(tool_calls):
     """
-    Run the agent with support for multiple tool calls.
-    
-    Args:
-        question: The user's question
-        history_text: Previous conversation history
+    Executes a list of (tool_name, params) concurrently on the shared tool pool.
+    The results are returned in the same order as tool_calls.
     """
-    previous_results = []
-    
+    if len(tool_calls) == 1:
+        return [execute_tool_isolated(*tool_calls[0])]
+
+    futures = [tool_executor.submit(tracing.bind(execute_tool_isolated), name, params) for name, params in tool_calls]
+    return [future.result() for future in futures]
+
+
+def plan_agent(question: str, history_text: str = ""):
+    """
+    Decides what to do with a question.
+
+    Returns:
+        (list of (tool_name, params), "tools") when tools should be called, or
+        (text, "text") when the question is answered without tools or the decision failed
+    """
+    decision = None
     try:
-        decision = decide_tool(question, history_text)
-        print(f"Raw decision: {decision}")
+        decision = route_question(question, history_text)
+        log.debug("Raw decision: %s", decision)
         
         params = json.loads(decision)
         
@@ -215,56 +461,65 @@ def run_agent(question: str, history_text: str = ""):
         if params.get("tool") == "enough":
             return params.get("explanation"), "text"
         
+        tool_calls = []
         # Handle multiple tools
         if "tools" in params:
-            print(f"Executing {len(params['tools'])} tools...")
             for tool_call in params["tools"]:
                 tool_name = tool_call.get("tool")
                 tool_params = {k: v for k, v in tool_call.items() if k != "tool"}
-                
-                print(f"  Calling {tool_name} with params: {tool_params}")
-                result = execute_tool(tool_name, tool_params)
-                
-                previous_results.append({
-                    "tool": tool_name,
-                    "params": tool_params,
-                    "result": result
-                })
+                tool_calls.append((tool_name, tool_params))
         
         # Handle single tool
-        elif "tool" in params and params.get("tool") not in ["none", "enough"]:
+        elif "tool" in params:
             tool_name = params["tool"]
             tool_params = {k: v for k, v in params.items() if k != "tool"}
-            
-            print(f"  Calling {tool_name} with params: {tool_params}")
-            result = execute_tool(tool_name, tool_params)
-            print("RESULT:", result)
-            previous_results.append({
-                "tool": tool_name,
-                "params": tool_params,
-                "result": result
-            })
-        
-        # After executing tools, return the raw results
-        if previous_results:
-            return previous_results, "data"
+            tool_calls.append((tool_name, tool_params))
+
+        # Sibling calls (eight players in the same season) become one batched read
+        tool_calls = merge_sibling_calls(tool_calls)
+
+        if log.isEnabledFor(logging.DEBUG):
+            for tool_name, tool_params in tool_calls:
+                log.debug("Calling %s with params: %s", tool_name, tool_params)
+
+        if tool_calls:
+            return tool_calls, "tools"
         else:
             return "No tools were called to answer the question", "text"
     
     except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Attempted to parse: {decision}")
+        log.warning("JSON decode error: %s, attempted to parse: %s", e, decision)
         return f"Error parsing decision: {str(e)}", "text"
     except Exception as e:
-        print(f"Error in run_agent: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error in plan_agent: %s", e)
         return f"Error: {str(e)}", "text"
 
-def explain_result(question, table_text):
+
+def run_agent(question: str, history_text: str = ""):
+    """
+    Run the agent with support for multiple tool calls.
+    
+    Args:
+        question: The user's question
+        history_text: Previous conversation history
+    """
+    with tracing.span("turn", question=question):
+        plan, plan_type = plan_agent(question, history_text)
+        if plan_type == "text":
+            return plan, "text"
+
+        # The tool calls are executed concurrently, the results come back in plan order
+        results = execute_tools(plan)
+    return [
+        {"tool": tool_name, "params": tool_params, "result": result}
+        for (tool_name, tool_params), result in zip(plan, results)
+    ], "data"
+
+
+def explain_prompt(question, table_text):
     today = datetime.date.today()
     today = str(today)
-    prompt = f"""
+    return f"""
 User question:
 {question}
 
@@ -277,20 +532,80 @@ If the user asks about a name that matches multiple entities and does not specif
 Present both entities separately.
 Todays date is : {today}
 """
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.types.GenerationConfig(
-            max_output_tokens=350,
-            temperature=0.7,
-            top_p=0.9,
-            top_k=40
-        )
+
+
+def explain_config():
+    return get_genai().types.GenerationConfig(
+        max_output_tokens=350,
+        temperature=0.7,
+        top_p=0.9,
+        top_k=40
     )
+
+
+def explain_result(question, table_text):
+    prompt = explain_prompt(question, table_text)
+    with tracing.span("llm.explain") as current:
+        response = get_model().generate_content(
+            prompt,
+            generation_config=explain_config()
+        )
+        tracing.record_tokens(current, "explain", prompt, response.text, getattr(response, "usage_metadata", None))
     return response.text
 
+
+def explain_result_stream(question, table_text, parent=None):
+    """
+    Same as explain_result, but yields the text in chunks as the model generates it.
+    The span is closed by hand since it stays open across the yields.
+    """
+    prompt = explain_prompt(question, table_text)
+    current = tracing.start("llm.explain", parent, stream=True)
+    response, text, error = None, "", None
+    try:
+        response = get_model().generate_content(
+            prompt,
+            generation_config=explain_config(),
+            stream=True
+        )
+        for chunk in response:
+            if chunk.text:
+                if not text:
+                    current.set(first_chunk_ms=round((time.perf_counter() - current.started) * 1000, 1))
+                text += chunk.text
+                yield chunk.text
+    except GeneratorExit:
+        # The user left before the explanation was done
+        current.set(cancelled=True)
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        tracing.record_tokens(current, "explain", prompt, text, getattr(response, "usage_metadata", None))
+        tracing.finish(current, error)
+
 # Initialize
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-model = genai.GenerativeModel("gemma-3-27b-it")
+# google.generativeai is imported and configured on first use, not at startup
+_genai = None
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _genai, _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _genai = timed_import("google.generativeai")
+                _genai.configure(api_key=settings.GOOGLE_API_KEY)
+                _model = _genai.GenerativeModel(settings.LLM_MODEL)
+    return _model
+
+
+def get_genai():
+    get_model()
+    return _genai
 
 # Tool descriptions
 TOOLS_DESCRIPTION = """
@@ -366,116 +681,172 @@ You can use the following tools for answer questions related to the NHL
     Parameters:
     - player_name: The full (first name and last name) name of the player
     -  opponent_team_abbrev: The abbrev of the opponent team, NYR for New York Rangers for example
+    - season: Which season. The format is YYYYYYYY, 20252026 for example. Use "all" for the whole career
+      ("How has Crosby done against the Rangers in his career?"), one row per season and a total
+12. league_form_table:
+    Use when the user asks which teams are in the best or worst form, hottest teams, longest streaks in the league,
+    or home/away records for all teams
+    Example: "Which teams are hot right now?", "Who has the longest winning streak this season?"
+    Parameters:
+    - season: Which season. The format is YYYYYYYY, 20252026 for example
+    - n: number of recent games to rank the teams on (default: 5)
+13. get_rivalry:
+    Use when the user asks about the all-time or historical record between two teams, over every season
+    Example: "What is the all-time record between Boston and Montreal?"
+    Parameters:
+    - team: The full name of the team
+    - opponent: The full name of the opponent team
+14. get_player_seasons:
+    Use when the user asks about a player (skater or goalie) over several seasons or the whole career
+    Example: "Ovechkin's goals 2005-2015", "Crosby's career stats"
+    Parameters:
+    - player_name: The full (first name and last name) name of the player
+    - start_season: First season, format YYYYYYYY (20052006). Leave out for the start of the career
+    - end_season: Last season, format YYYYYYYY (20142015). Leave out for the latest season
+15. get_team_seasons:
+    Use when the user asks about a team over several seasons
+    Example: "How have the Oilers done the last five seasons?"
+    Parameters:
+    - team_name: The full name of the team
+    - start_season: First season, format YYYYYYYY. Leave out for every season
+    - end_season: Last season, format YYYYYYYY. Leave out for the latest season
+16. top_players_range:
+    Use when the user asks for the best players over several seasons instead of one
+    Example: "Most goals over the last five seasons", "Best defensemen by points since 2015"
+    Parameters:
+    - start_season: First season, format YYYYYYYY
+    - end_season: Last season, format YYYYYYYY. Leave out for the latest season
+    - position: same as in top_players
+    - metric: same as in top_players
+    - n: number of players to return
+    - min_games: only players with at least this many games in the range, use it for rate metrics (e.g. 200)
+17. top_goalies_range:
+    Use when the user asks for the best goalies over several seasons
+    Example: "Best save percentage over the last five seasons"
+    Parameters:
+    - start_season: First season, format YYYYYYYY
+    - end_season: Last season, format YYYYYYYY. Leave out for the latest season
+    - metric: same as in top_goalies
+    - n: number of goalies to return
+    - min_games: only goalies with at least this many games in the range, use it for save_pct and goals_against_average (e.g. 100)
+18. compare_players, compare_goalies, compare_teams, compare_player_form:
+    Use when the user compares several players, goalies or teams in the same season. One call returns them side by side
+    Example: "Compare Crosby, McDavid and Matthews this season", "Who has been in better form, Pastrnak or Kucherov?"
+    Parameters:
+    - player_names / goalie_names / team_names: List of full names
     - season: Which season. The format is YYYYYYYY, 20252026 for example
+    - n: (compare_player_form) number of latest games, default 5
+    compare_player_form only has each player's totals over the games. When the user wants to see the games
+    ("show me Matthews' and Marner's last 5 games"), call get_player_form once per player instead
 """
 
-def history_to_text(history, max_turns=6):
-    """Convert Gradio history to text format."""
-    if not history:
-        return ""
-    # take the N latest turns
-    h = history[-max_turns:]
-
-    # tuple-format: [(user, bot), ...]
-    if isinstance(h[0], (list, tuple)) and len(h[0]) == 2:
-        lines = []
-        for u, a in h:
-            if u: lines.append(f"User: {u}")
-            if a: lines.append(f"Assistant: {a}")
-        return "\n".join(lines)
-
-    # dict-format: [{"role":"user","content":"..."}, ...]
-    if isinstance(h[0], dict):
-        lines = []
-        for m in h:
-            role = m.get("role", "user")
-            content = m.get("content", "")
-            lines.append(f"{role.capitalize()}: {content}")
-        return "\n".join(lines)
-
-    return str(h)
-
-def chat_interface(question, history): 
+def render_result(tool_name, tool_result):
+    """Returns (markdown for the chat, plain text for the explanation) for one tool result."""
+    # Special handling for get_team_form which returns a tuple of two DataFrames
+    if tool_name == "get_team_form" and isinstance(tool_result, tuple):
+        summary_df, matches_df = tool_result
+        
+        # Create markdown for both tables
+        table_md = f"**Form Summary:**\n{summary_df.to_markdown(index=False)}\n\n**Recent Matches:**\n{matches_df.to_markdown(index=False)}"
+        
+        # Create text version for explanation
+        table_text = f"Summary:\n{summary_df.to_string(index=False)}\n\nMatches:\n{matches_df.to_string(index=False)}"
+        return table_md, table_text
+        
+    # Handle regular DataFrame results
+    if isinstance(tool_result, pd.DataFrame):
+        return tool_result.to_markdown(index=False), tool_result.to_string(index=False, justify="left")
+    
+    # If we get two or more players with the same name
+    if (
+        tool_name in ("get_player_performance_against_team", "get_player_form", "get_player_seasons")
+        and isinstance(tool_result, list)):
+        md_tables = []
+        text_tables = []
+        for i, dfi in enumerate(tool_result, start=1):
+            md_tables.append(f"**Player {i}:**\n{dfi.to_markdown(index=False)}")
+            text_tables.append(f"Player {i}:\n{dfi.to_string(index=False)}")
+
+        header = "There are more than one player with that name"
+        return header + "\n\n" + "\n\n".join(md_tables), header + "\n\n" + "\n\n".join(text_tables)
+
+    # compare_players with both skaters and goalies: one table each
+    if tool_name == "compare_players" and isinstance(tool_result, list):
+        return (
+            "\n\n".join(df.to_markdown(index=False) for df in tool_result),
+            "\n\n".join(df.to_string(index=False) for df in tool_result),
+        )
+
+    # Handle other results (strings, etc.)
+    return str(tool_result), str(tool_result)
+
+
+def chat_interface(question, history, request: gr.Request = None):
+    """
+    Streams the answer: every table is shown as soon as its tool has finished,
+    then the explanation is streamed token by token.
+    """
+    # The turn stays open across the yields, so its children get it as parent explicitly
+    turn = tracing.start("turn", question=question)
+    error = None
     try:
-        history_text = history_to_text(history, max_turns=6)
+        # Tables as digests, only the turns the question is about, see historyCompactor.py
+        with tracing.span("history", parent=turn, turns=len(history or [])) as current:
+            history_text = history_compactor.compact(question, history, getattr(request, "session_hash", None))
+            current.set(tokens=tracing.estimate_tokens(history_text))
         
-        # Get tool decision and execute
-        result, result_type = run_agent(question, history_text=history_text)
+        # Get tool decision
+        with tracing.span("plan", parent=turn):
+            plan, plan_type = plan_agent(question, history_text=history_text)
         
         # If it's a text response (error or no tool needed)
-        if result_type == "text":
-            return result
+        if plan_type == "text":
+            yield plan
+            return
         
-        # If we have data results
-        if result_type == "data":
-            # Combine all results into markdown tables
-            all_tables = []
-            table_texts = []
-            
-            for r in result:
-                tool_name = r['tool']
-                tool_result = r['result']
-                
-                # Special handling for get_team_form which returns a tuple of two DataFrames
-                if tool_name == "get_team_form" and isinstance(tool_result, tuple):
-                    summary_df, matches_df = tool_result
-                    
-                    # Create markdown for both tables
-                    table_md = f"**Form Summary:**\n{summary_df.to_markdown(index=False)}\n\n**Recent Matches:**\n{matches_df.to_markdown(index=False)}"
-                    all_tables.append(table_md)
-                    
-                    # Create text version for explanation
-                    table_text = f"Summary:\n{summary_df.to_string(index=False)}\n\nMatches:\n{matches_df.to_string(index=False)}"
-                    table_texts.append(table_text)
-                    
-                # Handle regular DataFrame results
-                elif isinstance(tool_result, pd.DataFrame):
-                    table_md = tool_result.to_markdown(index=False)
-                    all_tables.append(table_md)
-                    table_texts.append(tool_result.to_string(index=False, justify="left"))
-                
-                # If we get two or more players with the same name
-                elif (
-                    tool_name in ("get_player_performance_against_team", "get_player_form")
-                    and isinstance(tool_result, list)):
-                    md_tables = []
-                    text_tables = []
-                    for i, dfi in enumerate(tool_result, start=1):
-                        md_tables.append(f"**Player {i}:**\n{dfi.to_markdown(index=False)}")
-                        text_tables.append(f"Player {i}:\n{dfi.to_string(index=False)}")
-
-                    header = "There are more than one player with that name"
-
-                    table_md = header + "\n\n" + "\n\n".join(md_tables)
-                    all_tables.append(table_md)
-                    table_text = header + "\n\n" + "\n\n".join(text_tables)
-                    table_texts.append(table_text)
-
-                
-                # Handle other results (strings, etc.)
-                else:
-                    all_tables.append(str(tool_result))
-                    table_texts.append(str(tool_result))
-            
-            # Combine all table texts for explanation
-            combined_table_text = "\n\n".join([
-                f"Tool: {result[i]['tool']}\nParameters: {result[i]['params']}\nResult:\n{table_texts[i]}"
-                for i in range(len(result))
-            ])
-            
-            # Get explanation
-            explanation = explain_result(question, combined_table_text)
-            
-            # Format final response - only tables and explanation, no tool names
-            tables_section = "\n\n".join(all_tables)
-            return f"{tables_section}\n\n{explanation}"
+        # Execute the tools concurrently and show the tables in plan order as they finish
+        results = [None] * len(plan)
+        rendered = [None] * len(plan)
+        futures = {
+            tool_executor.submit(tracing.bind(execute_tool_isolated, turn), tool_name, tool_params): i
+            for i, (tool_name, tool_params) in enumerate(plan)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            with tracing.span("render", parent=turn, tool=plan[i][0]):
+                rendered[i] = render_result(plan[i][0], results[i])
+            yield "\n\n".join(table_md for table_md, _ in filter(None, rendered))
         
-        return "Unexpected result type"
+        # Format final response - only tables and explanation, no tool names
+        answer = "\n\n".join(table_md for table_md, _ in rendered) + "\n\n"
+
+        # Simple answers are explained from templates, no second LLM call, see explainTemplates.py
+        with tracing.span("explain.local", parent=turn) as current:
+            explanation, reason = explainTemplates.explain_locally(question, plan, results, settings.EXPLAIN_MODE)
+            current.set(used=explanation is not None, reason=reason)
+        tracing.metrics.inc("agent_explanations_total", help="Explanations by who wrote them",
+                            source="template" if explanation is not None else "llm", reason=reason)
+        if explanation is not None:
+            yield answer + explanation
+            return
+
+        # Combine all table texts for explanation
+        combined_table_text = "\n\n".join([
+            f"Tool: {tool_name}\nParameters: {tool_params}\nResult:\n{table_text}"
+            for (tool_name, tool_params), (_, table_text) in zip(plan, rendered)
+        ])
+
+        for chunk in explain_result_stream(question, combined_table_text, parent=turn):
+            answer += chunk
+            yield answer
     
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return f"Error: {str(e)}"
+        error = e
+        log.exception("Error in chat_interface: %s", e)
+        yield f"Error: {str(e)}"
+    finally:
+        tracing.finish(turn, error)
 
 demo = gr.ChatInterface(
     fn=chat_interface,
@@ -494,5 +865,41 @@ demo = gr.ChatInterface(
     ],
 )
 
+def readiness():
+    """Readiness probe: 200 once the Hopsworks connection is warm, 503 before that."""
+    from fastapi.responses import JSONResponse
+
+    body = {
+        "ready": agentFunctions.ready.is_set(),
+        "error": agentFunctions.warm_up_error,
+        "import_timings": {name: round(seconds, 3) for name, seconds in IMPORT_TIMINGS.items()},
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+def metrics_endpoint():
+    """Span durations, feature store reads and LLM tokens in the Prometheus text format."""
+    from fastapi.responses import PlainTextResponse
+
+    return PlainTextResponse(tracing.metrics_text(), media_type="text/plain; version=0.0.4")
+
+
+def launch():
+    """
+    Starts the server first and warms up the Hopsworks connection on a
+    background thread afterwards, so the UI accepts traffic right away.
+    """
+    log.info("Import timings: %s", ", ".join(f"{name} {seconds:.2f}s" for name, seconds in IMPORT_TIMINGS.items()))
+
+    started = time.perf_counter()
+    demo.launch(prevent_thread_lock=True)
+    demo.app.add_api_route("/ready", readiness, methods=["GET"])
+    demo.app.add_api_route("/metrics", metrics_endpoint, methods=["GET"])
+    log.info("Listening after %.2fs", time.perf_counter() - started)
+
+    threading.Thread(target=agentFunctions.warm_up, name="warm-up", daemon=True).start()
+    demo.block_thread()
+
+
 if __name__ == "__main__":
-    demo.launch()
\ No newline at end of file
+    launch()
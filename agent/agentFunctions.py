@@ -1,40 +1,411 @@
 import sys
+import functools
+import inspect
+import logging
+import threading
+import time
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-import hopsworks
 from config import settings
 import pandas as pd
 from unidecode import unidecode
-
+from toolCache import ToolCache, DEFAULT_TTLS, DEFAULT_TTL
+from frameStore import FrameStore, SEASON_COLUMNS
+from nameIndex import NameIndex
+from teamResolver import TeamResolver
+from teamForm import LeagueForm
+from headToHead import HeadToHead
+from leaderboards import Leaderboards, POSITION_GROUPS
+from rangeQueries import SeasonHistory
+import tracing
+import util
+import materialize
+
+
+log = logging.getLogger(__name__)
+
+
+def cached_tool(*feature_groups):
+    """
+    Caches the result of a tool in self.cache, keyed on the tool name and its
+    normalized parameters. feature_groups are the feature groups the result is
+    built from, used for TTLs and for invalidation when the pipelines write new data.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != "self"}
+
+            self.sync_versions()
+            hit, result = self.cache.get(method.__name__, params)
+            tracing.annotate(cache_hit=hit)
+            if hit:
+                return result
+
+            result = method(self, *args, **kwargs)
+            self.cache.put(method.__name__, params, feature_groups, result)
+            return result
+        return wrapper
+    return decorator
+
+
+# Feature groups the tools read, their handles are resolved by warm_up()
+TOOL_FEATURE_GROUPS = ("player_season_stats", "goalies", "teams", "matches", "players_form", "goalies_form")
+
+# (key column, group column) of the leaderboards for the top_* tools
+LEADERBOARD_KEYS = {
+    "player_season_stats": ("player_id", "position_code"),
+    "goalies": ("player_id", None),
+    "teams": ("team_full_name", None),
+}
+
+# Seconds between warm-up attempts while Hopsworks cannot be reached, the last one repeats
+WARM_UP_RETRY_SECONDS = (5, 15, 30, 60)
+
+# Feature group behind the season-range tools, per kind
+HISTORY_FEATURE_GROUPS = {"skater": "player_season_stats", "goalie": "goalies", "team": "teams"}
 
 
 class AgentFunctions:
 
     def __init__(self) -> None:
-       
-        self.project = hopsworks.login(
-            project=settings.HOPSWORKS_PROJECT,
-            api_key_value=settings.HOPSWORKS_API_KEY,
-            host = settings.HOPSWORKS_HOST
+        # The Hopsworks connection is opened on first use (or by warm_up()),
+        # so importing this module never blocks on the network
+        self._project = None
+        self._fs = None
+        self._connect_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.warm_up_error = None
+
+        self.feature_groups = {}
+        self.versions_fg = None
+
+        self.cache = ToolCache(max_bytes=settings.TOOL_CACHE_MAX_MB * 1024 * 1024)
+        self._versions_checked_at = float("-inf")
+        self._versions_lock = threading.Lock()
+
+        # Optional in-memory copy of the feature groups, see frameStore.py
+        self.store = FrameStore(self.get_fg) if settings.FRAME_STORE_ENABLED else None
+
+        # Structures built per season from the feature groups (NameIndex, LeagueForm),
+        # (kind, season) -> (value, feature_groups, expires_at)
+        self.season_views = {}
+        self._views_lock = threading.Lock()
+        self._view_build_locks = {}
+
+        # Team aliases, built from the NHL API on first use, see teamResolver.py
+        self._team_resolver = None
+        self._teams_lock = threading.Lock()
+
+        # Team-vs-team matrix, seasons are added on first use, see headToHead.py
+        self._head_to_head = HeadToHead()
+        self._h2h_lock = threading.Lock()
+        self._h2h_stale = False
+        self._h2h_refreshed_at = time.monotonic()
+
+    @property
+    def project(self):
+        self.connect()
+        return self._project
+
+    @property
+    def fs(self):
+        return self.connect()
+
+    def connect(self):
+        """Logs in to Hopsworks and returns the feature store, only the first call does any work."""
+        if self._fs is not None:
+            return self._fs
+
+        with self._connect_lock:
+            if self._fs is None:
+                import hopsworks  # Slow to import, only needed once we connect
+
+                started = time.perf_counter()
+                self._project = hopsworks.login(
+                    project=settings.HOPSWORKS_PROJECT,
+                    api_key_value=settings.HOPSWORKS_API_KEY,
+                    host = settings.HOPSWORKS_HOST
+                )
+                self._fs = self._project.get_feature_store()
+                log.info("Connected to Hopsworks in %.2fs", time.perf_counter() - started)
+        return self._fs
+
+    def warm_up(self):
+        """
+        Connects and resolves the feature group handles ahead of the first question,
+        then loads the team list.
+        Meant to run on a background thread once the UI is listening, sets self.ready when done.
+        A failed attempt is retried with backoff until one succeeds.
+        """
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                self.connect()
+                for name in TOOL_FEATURE_GROUPS:
+                    self.get_fg(name)
+                self.sync_versions()
+                break
+            except Exception as e:
+                # The tools connect on first use anyway, a failed warm-up only costs latency
+                self.warm_up_error = str(e)
+                delay = WARM_UP_RETRY_SECONDS[min(attempt, len(WARM_UP_RETRY_SECONDS) - 1)]
+                log.warning("Warm-up failed, retrying in %ds: %s", delay, e)
+                attempt += 1
+                time.sleep(delay)
+        self.warm_up_error = None
+        self.ready.set()
+        log.info("Warm-up done in %.2fs", time.perf_counter() - started)
+
+        # The team list comes from the NHL API, readiness does not wait on it and resolve_team() retries on use
+        try:
+            self.team_resolver()
+        except Exception as e:
+            log.warning("Could not load the team list: %s", e)
+
+    def get_fg(self, name):
+        """Returns the feature group handle, fetched on first use."""
+        if self.feature_groups.get(name) is None:
+            # A group the pipeline has not created yet is looked up again next time
+            self.feature_groups[name] = self.fs.get_feature_group(name=name, version=1)
+        return self.feature_groups[name]
+
+    def _read(self, fg_name, season, **equals):
+        """
+        Reads the rows of a feature group for one season where every given column
+        equals its value. Answered from the frame store when it is enabled,
+        otherwise with a filter().read() against Hopsworks.
+        """
+        if self.store is not None:
+            return self.store.lookup(fg_name, season, **equals)
+
+        fg = self.get_fg(fg_name)
+        condition = getattr(fg, SEASON_COLUMNS[fg_name]) == season
+        for column, value in equals.items():
+            if isinstance(value, (list, tuple, set)):
+                condition = condition & getattr(fg, column).isin(list(value))
+            else:
+                condition = condition & (getattr(fg, column) == value)
+        return tracing.read(fg.filter(condition), fg_name)
+
+    def _read_team_games(self, season, *teams):
+        """Reads the matches in a season where every given team played, home or away."""
+        if self.store is not None:
+            return self.store.team_games(season, *teams)
+
+        fg = self.get_fg("matches")
+        condition = fg.season == season
+        for team in teams:
+            condition = condition & ((fg.home_team_name == team) | (fg.away_team_name == team))
+        return tracing.read(fg.filter(condition), "matches")
+
+    def season_view(self, kind, season, feature_groups, build, refresh=None):
+        """
+        A structure built from feature_groups for one season, built on first use and
+        rebuilt when it expires or sync_versions() sees new data in one of feature_groups.
+        If refresh is given the expired structure is passed to it instead of building a new one.
+        """
+        key = (kind, season)
+        with self._views_lock:
+            build_lock = self._view_build_locks.setdefault(key, threading.Lock())
+
+        # One build per key at a time, other seasons and kinds are not blocked
+        with build_lock:
+            with self._views_lock:
+                value, _, expires_at = self.season_views.get(key, (None, (), 0.0))
+            if value is not None and time.monotonic() < expires_at:
+                return value
+
+            value = refresh(value) if value is not None and refresh is not None else build()
+            ttl = min(DEFAULT_TTLS.get(fg, DEFAULT_TTL) for fg in feature_groups)
+            with self._views_lock:
+                self.season_views[key] = (value, feature_groups, time.monotonic() + ttl)
+            return value
+
+    def name_index(self, season):
+        """The NameIndex over all skaters and goalies in a season, or in every season if season is None."""
+        return self.season_view("names", season, ("player_season_stats", "goalies"), lambda: NameIndex.from_frames(
+            self._read_columns("player_season_stats", season, ["skater_full_name", "player_id"]),
+            self._read_columns("goalies", season, ["goalie_full_name", "player_id"]),
+        ))
+
+    def league_form(self, season):
+        """The LeagueForm (form, streaks and splits of every team) of a season."""
+        return self.season_view("league_form", season, ("matches",), lambda: LeagueForm(self._read("matches", season)))
+
+    def leaderboards(self, fg_name, season):
+        """The Leaderboards of player_season_stats, goalies or teams for a season, refreshed with the changed rows."""
+        key_column, group_column = LEADERBOARD_KEYS[fg_name]
+        return self.season_view(
+            "leaderboards:" + fg_name, season, (fg_name,),
+            build=lambda: Leaderboards(self._read(fg_name, season), key_column, group_column),
+            refresh=lambda boards: boards.refresh(self._read(fg_name, season)),
         )
 
-        self.fs = self.project.get_feature_store()
-        self.games_fg = None
-        self.player_season_stats_fg = None
-        self.teams_fg = None
+    def season_history(self, kind):
+        """The SeasonHistory (every season in one frame) of player_season_stats, goalies or teams."""
+        fg_name = HISTORY_FEATURE_GROUPS[kind]
+        return self.season_view("history:" + fg_name, None, (fg_name,), lambda: SeasonHistory(
+            tracing.read(self.get_fg(fg_name), fg_name), SEASON_COLUMNS[fg_name], kind,
+        ))
+
+    def _read_columns(self, fg_name, season, columns):
+        """A few columns of every row in a season, or in every season if season is None."""
+        if self.store is not None and season is not None:
+            return self.store.lookup(fg_name, season)[columns]
+
+        fg = self.get_fg(fg_name)
+        if season is None:
+            return tracing.read(fg.select(columns), fg_name)
+        return tracing.read(fg.select(columns).filter(getattr(fg, SEASON_COLUMNS[fg_name]) == season), fg_name)
+
+    def head_to_head(self, season=None):
+        """
+        The HeadToHead matrix with season in it, or every season if season is None.
+        Seasons are read once; after new matches are written only the games from the
+        latest date in the matrix and on are read and added.
+        """
+        with self._h2h_lock:
+            h2h = self._head_to_head
+            expired = time.monotonic() - self._h2h_refreshed_at > DEFAULT_TTLS["matches"]
+            if self._h2h_stale or expired:
+                if h2h.latest_date is not None:
+                    fg = self.get_fg("matches")
+                    added = h2h.add_games(tracing.read(fg.filter(fg.game_date >= h2h.latest_date.isoformat()), "matches"))
+                    log.info("Added %d new games to the head-to-head matrix", added)
+                self._h2h_stale = False
+                self._h2h_refreshed_at = time.monotonic()
+
+            if season is None and not h2h.complete:
+                h2h.add_games(tracing.read(self.get_fg("matches"), "matches"))
+                h2h.complete = True
+            elif season is not None and not h2h.complete and str(season) not in h2h.seasons:
+                h2h.add_games(self._read("matches", season))
+                h2h.seasons.add(str(season))
+            return h2h
+
+    def resolve_player(self, name, season, kind=None):
+        """NameMatches for a skater or goalie name in a season, empty if the name is unknown."""
+        try:
+            return self.name_index(season).resolve(name, kind)
+        except Exception as e:
+            log.warning("Could not resolve %s: %s", name, e)
+            return []
+
+    def _player_filter(self, name, season, kind, name_column):
+        """
+        The _read() filter for a player: the resolved player ids, or the exact
+        (unaccented) name as before if the name could not be resolved.
+        """
+        matches = self.resolve_player(name, season, kind)
+        if matches:
+            return {"player_id": [match.player_id for match in matches]}
+        return {name_column: unidecode(name)} #replace åäö etc with aao
+
+    def team_resolver(self):
+        """The TeamResolver, the team list is fetched from the NHL API (or its disk cache) once."""
+        with self._teams_lock:
+            if self._team_resolver is None:
+                self._team_resolver = TeamResolver(
+                    util.fetch_teams(),
+                    season_names=lambda season: self._read_columns("teams", season, ["team_full_name"])["team_full_name"],
+                )
+            return self._team_resolver
+
+    def resolve_team(self, text, season):
+        """TeamMatch for a team name, abbreviation, city or nickname in a season, None if unknown."""
+        try:
+            return self.team_resolver().resolve(text, season)
+        except Exception as e:
+            log.warning("Could not resolve team %s: %s", text, e)
+            return None
+
+    def team_name(self, text, season):
+        """Full team name as the teams and matches feature groups have it, text as it is if unknown."""
+        match = self.resolve_team(text, season)
+        return match.name if match else text
+
+    def team_abbrev(self, text, season):
+        """Team abbreviation as players_form has it, text as it is if unknown."""
+        match = self.resolve_team(text, season)
+        return match.abbrev if match and match.abbrev else text
+
+    def entity_kind(self, name, season):
+        """
+        Returns "skater", "goalie" or "team" if name is one in the given season, otherwise None.
+        Lets the fast router check a name before it skips the LLM.
+        """
+        kinds = {match.kind for match in self.resolve_player(name, season)}
+        if len(kinds) == 1:
+            return kinds.pop()
+        if kinds: # Both a skater and a goalie, let the LLM decide
+            return None
+        if self.resolve_team(name, season) is not None:
+            return "team"
+        return None
+
+    def sync_versions(self):
+        """
+        Reads the version markers the pipelines write after insert() (see
+        util.mark_feature_group_updated) and drops cached results for the feature
+        groups that got new data. Checked at most every TOOL_CACHE_VERSION_CHECK_SECONDS.
+        """
+        with self._versions_lock:
+            now = time.monotonic()
+            if now - self._versions_checked_at < settings.TOOL_CACHE_VERSION_CHECK_SECONDS:
+                return
+            self._versions_checked_at = now
+
+        try:
+            if self.versions_fg is None:
+                self.versions_fg = self.fs.get_feature_group(name="pipeline_versions", version=1)
+            if self.versions_fg is None: # No pipeline has written a marker yet, rely on the TTLs
+                return
+            versions = tracing.read(self.versions_fg, "pipeline_versions")
+        except Exception as e:
+            log.warning("Could not read pipeline versions: %s", e)
+            return
+
+        latest = versions.groupby("feature_group")["version"].max()
+        changed = self.cache.apply_versions(latest.to_dict())
+        for feature_group in changed:
+            if self.store is not None:
+                self.store.invalidate(feature_group)
+            with self._views_lock:
+                # Expired, not dropped, so views with a refresh can update what they have
+                for key, (value, feature_groups, _) in list(self.season_views.items()):
+                    if feature_group in feature_groups:
+                        self.season_views[key] = (value, feature_groups, 0.0)
+            if feature_group == "teams":
+                with self._teams_lock:
+                    self._team_resolver = None
+            if feature_group == "matches":
+                self._h2h_stale = True
+        if changed:
+            log.info("New data in %s, cached results invalidated", changed)
         
 
+    @cached_tool("player_season_stats", "goalies")
     def get_player_overview(self, player_name, season):
         """
         Returns a player's stats for a specific season
         """
-        if self.player_season_stats_fg is None:
-            self.player_season_stats_fg = self.fs.get_feature_group(name='player_season_stats', version=1)
-        
-        player_name = unidecode(player_name) #replace åäö etc with aao 
+        # One lookup tells if the name is a skater, a goalie or a misspelling of either
+        matches = self.resolve_player(player_name, season)
+        skater_ids = [match.player_id for match in matches if match.kind == "skater"]
+        if matches and not skater_ids:
+            return self.get_goalie(matches[0].name, season)
 
-        data =self.player_season_stats_fg.filter((self.player_season_stats_fg.skater_full_name == player_name) &
-                                                (self.player_season_stats_fg.season_id == season)).read()
+        player_name = unidecode(player_name) #replace åäö etc with aao 
+        if skater_ids:
+            data = self._read("player_season_stats", season, player_id=skater_ids)
+        else:
+            data = self._read("player_season_stats", season, skater_full_name=player_name)
     
         cols = [
             "skater_full_name",
@@ -58,22 +429,18 @@ class AgentFunctions:
         })
 
         if len(data_to_return) == 0: # Here's a case where the user probably searches for a goalie.
-            print("Calling get goalie", player_name)
+            log.debug("No skater named %s, trying the goalies", player_name)
             return self.get_goalie(player_name, season)
             
         return data_to_return
     
+    @cached_tool("teams")
     def get_team_overview(self, teamName, season):
         """
         Fetches all available stats for a team during a given season.
         """
-        if self.teams_fg is None:
-            self.teams_fg = self.fs.get_feature_group(name='teams', version=1)
-
-        data = self.teams_fg.filter(
-            (self.teams_fg.team_full_name == teamName) &
-            (self.teams_fg.season_id == season)
-        ).read()
+        teamName = self.team_name(teamName, season)
+        data = self._read("teams", season, team_full_name=teamName)
         
         # The most important columns for a team overview.
         key_cols = [
@@ -96,40 +463,20 @@ class AgentFunctions:
         data_to_return.columns = (data_to_return.columns.str.replace("_", " ", regex=False).str.title())  
         return data_to_return
 
+    @cached_tool("player_season_stats")
     def top_players(self, season, position=None, metric="points", n=10):
-        if self.player_season_stats_fg is None:
-            self.player_season_stats_fg = self.fs.get_feature_group(name='player_season_stats', version=1)
-        data = self.player_season_stats_fg.filter((self.player_season_stats_fg.season_id == season)).read()
-
-        if position == "F":
-            data = data[data["position_code"].isin(["C", "L", "R"])]
-        elif position:
-            data = data[data["position_code"] == position]
-        data = data[data[metric].notna()]
-        data = data.sort_values(metric, ascending=False).head(n)[["skater_full_name", "position_code", metric, "games_played"]]
+        data = self.leaderboards("player_season_stats", season).top(metric, n, group=position or None)
+        data = data[["skater_full_name", "position_code", metric, "games_played"]]
         data.columns = (data.columns.str.replace("_", " ", regex=False).str.title())
         return data
     
+    @cached_tool("goalies")
     def top_goalies(self, season, metric="save_pct", n=10):
         """
         Returns the top n goalkeepers for a season based on the selected metric.
         """
-        if not hasattr(self, "goalies_fg") or self.goalies_fg is None:
-            self.goalies_fg = self.fs.get_feature_group(
-                name="goalies",
-                version=1
-            )
-
-        data = self.goalies_fg.filter(
-            self.goalies_fg.season_id == season
-        ).read()
-
-        # Remove rows with no value in the metric.
-        data = data[data[metric].notna()]
-
-        # Sort (lower GAA is better; otherwise, higher is better).
-        ascending = True if metric == "goals_against_average" else False
-        data = data.sort_values(metric, ascending=ascending).head(n)
+        # Rows without a value are skipped, lower GAA is better (see leaderboards.py)
+        data = self.leaderboards("goalies", season).top(metric, n)
 
         cols = [
             "goalie_full_name",
@@ -148,24 +495,13 @@ class AgentFunctions:
 
         return data_to_return
 
+    @cached_tool("teams")
     def top_teams(self, season, metric="points", n=10):
         """
         Returns the top n teams for a season based on the selected metric.
         Example metrics: points, wins, goals_for, power_play_pct.
         """
-        if self.teams_fg is None:
-
-            self.teams_fg = self.fs.get_feature_group(
-                name="teams",
-                version=1
-            )
-
-        data = self.teams_fg.filter(
-            self.teams_fg.season_id == season
-        ).read()
-
-        data = data[data[metric].notna()]
-        data = data.sort_values(metric, ascending=False).head(n)
+        data = self.leaderboards("teams", season).top(metric, n)
 
         cols = [
             "team_full_name",
@@ -183,87 +519,110 @@ class AgentFunctions:
 
         return data_to_return
 
+    @cached_tool("matches")
     def get_team_form(self, team_name, season, n=5):
         """
         Returnerar:
-        1) Ett lags form över de n senaste matcherna
+        1) Ett lags form över de n senaste matcherna (W/L/OTL, poäng, mål och aktuell svit)
         2) En tabell med matcherna (datum, motstånd, resultat)
         """
-        # Hämta feature group på samma sätt som övriga funktioner
-        if self.games_fg == None:
-            self.games_fg = self.fs.get_feature_group(name="matches", version=1)
-        
-        data = self.games_fg.filter(
-            ((self.games_fg.home_team_name == team_name) |
-            (self.games_fg.away_team_name == team_name)) &
-            (self.games_fg.season == season)
-        ).read()
+        team_name = self.team_name(team_name, season)
+        return self.league_form(season).team_form(team_name, n)
 
-        # Konvertera datum och filtrera bort framtida matcher
-        data["game_date"] = pd.to_datetime(data["game_date"])
-        today = pd.Timestamp.now().normalize()  # Dagens datum utan tid
-        data = data[data["game_date"] < today]  # Behåll bara matcher upp till idag
-    
-        # Sortera på datum och ta n senaste
+    @cached_tool("matches")
+    def league_form_table(self, season, n=5):
+        """
+        Returns every team ranked by points over their last n games, with the
+        current streak, the longest win and winless streaks and home/away records.
+        """
+        return self.league_form(season).table(n)
+
+    def _recent_games(self, kind, season, player_filter, n):
+        """
+        The n latest games per player, newest first. A keyed lookup in the
+        materialized last games table (see materialize.py) when n is at most
+        MAX_WINDOW, otherwise or if that table has no rows yet, from the full game log.
+        """
+        source, last_fg = (
+            ("players_form", materialize.PLAYERS_LAST_GAMES_FG) if kind == "skater"
+            else ("goalies_form", materialize.GOALIES_LAST_GAMES_FG)
+        )
+
+        if n <= materialize.MAX_WINDOW and "player_id" in player_filter:
+            try:
+                data = self._read(last_fg, season, **player_filter)
+            except Exception as e:
+                log.warning("Could not read %s: %s", last_fg, e)
+                data = pd.DataFrame()
+            if not data.empty:
+                data = data[data["game_rank"] < n].sort_values(["player_id", "game_rank"])
+                data["game_date"] = pd.to_datetime(data["game_date"])
+                return data
+
+        # Exact path: the whole season for the player, sorted here
+        data = self._read(source, season, **player_filter)
         data["game_date"] = pd.to_datetime(data["game_date"])
-        data = data.sort_values("game_date").tail(n)
-
-        points = 0
-        goals_for = 0
-        goals_against = 0
-        wins = 0
-        losses = 0
-
-        matches = []
-
-        for _, row in data.iterrows():
-            if row["home_team_name"] == team_name:
-                gf = row["home_score"]
-                ga = row["visiting_score"]
-                opponent = row["away_team_name"]
-                home_away = "Home"
-            else:
-                gf = row["visiting_score"]
-                ga = row["home_score"]
-                opponent = row["home_team_name"]
-                home_away = "Away"
-
-            goals_for += gf
-            goals_against += ga
-
-            if gf > ga:
-                points += 2
-                wins += 1
-                result = "W"
-            else:
-                losses += 1
-                result = "L"
-
-            matches.append({
-                "Date": row["game_date"].date(),
-                "Opponent": opponent,
-                "Home/Away": home_away,
-                "Result": result,
-                "Score": f"{gf}-{ga}"
-            })
+        today = pd.Timestamp.now().normalize()
+        data = data[data["game_date"] <= today]
+        data = data.sort_values("game_date", ascending=False)
+        return data.groupby("player_id", sort=False).head(n)
 
-        summary = pd.DataFrame([{
-            "Team": team_name,
-            "Games": len(data),
-            "Wins": wins,
-            "Losses": losses,
-            "Points": points,
-            "Points Per Game": round(points / len(data), 2),
-            "Goals For": goals_for,
-            "Goals Against": goals_against,
-            "Goal Diff": goals_for - goals_against
-        }])
+    def _form_totals(self, kind, season, games, n):
+        """
+        Totals over the games of one player, from the materialized rolling form table
+        when n is one of its windows, otherwise summed from the rows.
+        """
+        rolling_fg = materialize.PLAYERS_ROLLING_FG if kind == "skater" else materialize.GOALIES_ROLLING_FG
+        player_id = games["player_id"].iloc[0]
+
+        if n in materialize.WINDOWS:
+            try:
+                totals = self._read(rolling_fg, season, player_id=player_id)
+                totals = totals[totals["window"] == n]
+                if not totals.empty:
+                    return totals.iloc[0]
+            except Exception as e:
+                log.warning("Could not read %s: %s", rolling_fg, e)
+
+        games = games.assign(season_id=season)
+        return materialize.window_totals(games, kind).iloc[0]
+
+    def _format_player_games(self, player_data, cols, totals):
+        """Formats a skater's games for the chat, with a last row holding the totals."""
+        # Filtrera bara kolumner som finns
+        available_cols = [col for col in cols if col in player_data.columns]
+        player_data = player_data[available_cols].copy()
 
-        matches_df = pd.DataFrame(matches)
+        # Formatera datum till enbart datum (inte datetime)
+        if "game_date" in player_data.columns:
+            player_data["game_date"] = player_data["game_date"].dt.date
 
-        matches_df = matches_df.iloc[::-1] #Reverse it so it's correct order.
-        return summary, matches_df
+        total_row = {col: totals[col] if col in totals.index else "" for col in available_cols}
+        total_row["game_date"] = f"Last {int(totals['games'])}"
+        player_data = pd.concat([player_data, pd.DataFrame([total_row])], ignore_index=True)
 
+        # Formatera kolumnnamn
+        player_data.columns = (
+            player_data.columns
+            .str.replace("_", " ", regex=False)
+            .str.title()
+        )
+
+        # Specifika ombenämningar
+        rename_dict = {
+            "Skater Full Name": "Full Name",
+            "Team Abbrev": "Team",
+            "Posistion Code": "Posistion",
+            "Time On Ice Per Game": "TOI (sec)",
+            "Opponent Team Abbrev": "Opponent",
+            "Home Road": "H/A",
+            "Plus Minus": "+/-",
+            "Pp Points": "PP Pts",
+            "Ev Points": "EV Pts"
+        }
+        return player_data.rename(columns=rename_dict)
+
+    @cached_tool("players_form", materialize.PLAYERS_LAST_GAMES_FG, materialize.PLAYERS_ROLLING_FG)
     def get_player_form(self, player_name, season, n=5):
         """
         Hämtar en spelares n senaste matcher med mål, assists, poäng etc.
@@ -277,23 +636,9 @@ class AgentFunctions:
             DataFrame med matchstatistik
             Eller lista med DataFrames med matchstatistik
         """
-        # Hämta feature group med per-match data
-        if not hasattr(self, "player_game_log_fg") or self.player_game_log_fg is None:
-            self.player_game_log_fg = self.fs.get_feature_group(
-                name="players_form",
-                version=1
-            )
-        player_name = unidecode(player_name) #replace åäö etc with aao
         # Filtrera på spelare och säsong
-        data = self.player_game_log_fg.filter(
-            (self.player_game_log_fg.skater_full_name == player_name) &
-            (self.player_game_log_fg.season_id == season)
-        ).read()
-
-        # Konvertera game_date till datetime och filtrera upp till idag
-        data["game_date"] = pd.to_datetime(data["game_date"])
-        today = pd.Timestamp.now().normalize()
-        data = data[data["game_date"] <= today]
+        player_filter = self._player_filter(player_name, season, "skater", "skater_full_name")
+        data = self._recent_games("skater", season, player_filter, n)
         
         if data.empty:
             return pd.DataFrame({
@@ -302,16 +647,9 @@ class AgentFunctions:
         
         # If more than one player with the same name
         if data["player_id"].nunique(dropna=False) > 1:
-            player_ids = data["player_id"].unique()
             data_list = []
             #split it to a pd frame for each unique player
-            for player_id in player_ids:
-                mask = (data["player_id"] == player_id)
-                player_data = data.loc[mask].copy()
-
-                # Sortera på datum och ta n senaste
-                player_data = player_data.sort_values("game_date", ascending=False).head(n)
-
+            for _, player_data in data.groupby("player_id", sort=False):
                 # Välj och formatera kolumner
                 cols = [
                     "game_date",
@@ -329,45 +667,12 @@ class AgentFunctions:
                     "pp_points",
                     "ev_points"
                 ]
-                
-                # Filtrera bara kolumner som finns
-                available_cols = [col for col in cols if col in player_data.columns]
-                player_data = player_data[available_cols].copy()
-                
-                # Formatera kolumnnamn
-                player_data.columns = (
-                    player_data.columns
-                    .str.replace("_", " ", regex=False)
-                    .str.title()
-                )
-                
-                # Specifika ombenämningar
-                rename_dict = {
-                    "Skater Full Name": "Full Name",
-                    "Team Abbrev": "Team",
-                    "Posistion Code": "Posistion",
-                    "Time On Ice Per Game": "TOI (sec)",
-                    "Opponent Team Abbrev": "Opponent",
-                    "Home Road": "H/A",
-                    "Plus Minus": "+/-",
-                    "Pp Points": "PP Pts",
-                    "Ev Points": "EV Pts"
-                }
-                
-                player_data = player_data.rename(columns=rename_dict)
-                
-                # Formatera datum till enbart datum (inte datetime)
-                if "Game Date" in player_data.columns:
-                    player_data["Game Date"] = player_data["Game Date"].dt.date
-
-                data_list.append(player_data)
+                totals = self._form_totals("skater", season, player_data, n)
+                data_list.append(self._format_player_games(player_data, cols, totals))
 
             return data_list
         
         else:
-            # Sortera på datum och ta n senaste
-            data = data.sort_values("game_date", ascending=False).head(n)
-            
             # Välj och formatera kolumner
             cols = [
                 "game_date",
@@ -383,37 +688,10 @@ class AgentFunctions:
                 "pp_points",
                 "ev_points"
             ]
-            
-            # Filtrera bara kolumner som finns
-            available_cols = [col for col in cols if col in data.columns]
-            data_to_return = data[available_cols].copy()
-            
-            # Formatera kolumnnamn
-            data_to_return.columns = (
-                data_to_return.columns
-                .str.replace("_", " ", regex=False)
-                .str.title()
-            )
-            
-            # Specifika ombenämningar
-            rename_dict = {
-                "Skater Full Name" : "Full Name",
-                "Time On Ice Per Game": "TOI (sec)",
-                "Opponent Team Abbrev": "Opponent",
-                "Home Road": "H/A",
-                "Plus Minus": "+/-",
-                "Pp Points": "PP Pts",
-                "Ev Points": "EV Pts"
-            }
-            
-            data_to_return = data_to_return.rename(columns=rename_dict)
-            
-            # Formatera datum till enbart datum (inte datetime)
-            if "Game Date" in data_to_return.columns:
-                data_to_return["Game Date"] = data_to_return["Game Date"].dt.date
-            
-            return data_to_return
+            totals = self._form_totals("skater", season, data, n)
+            return self._format_player_games(data, cols, totals)
 
+    @cached_tool("goalies_form", materialize.GOALIES_LAST_GAMES_FG, materialize.GOALIES_ROLLING_FG)
     def get_goalie_form(self, goalie_name, season, n=5):
         """
         Hämtar en målvakts n senaste matcher med saves, GAA, save%, etc.
@@ -426,36 +704,17 @@ class AgentFunctions:
         Returns:
             DataFrame med matchstatistik
         """
-        # Hämta feature group med per-match data
-        if not hasattr(self, "goalie_game_log_fg") or self.goalie_game_log_fg is None:
-            self.goalie_game_log_fg = self.fs.get_feature_group(
-                name="goalies_form",
-                version=1
-            )
-        gaolie_name = unidecode(goalie_name) #replace åäö etc with aao
         # Filtrera på målvakt och säsong
-        data = self.goalie_game_log_fg.filter(
-            (self.goalie_game_log_fg.goalie_full_name == goalie_name) &
-            (self.goalie_game_log_fg.season_id == season)
-        ).read()
-                
-        if data.empty:
-            return pd.DataFrame({
-                "Message": [f"No game data found for {goalie_name} in season {season}"]
-            })
-        
-        # Konvertera game_date till datetime och filtrera upp till idag
-        data["game_date"] = pd.to_datetime(data["game_date"])
-        today = pd.Timestamp.now().normalize()
-        data = data[data["game_date"] <= today]
+        player_filter = self._player_filter(goalie_name, season, "goalie", "goalie_full_name")
+        data = self._recent_games("goalie", season, player_filter, n)
         
         if data.empty:
             return pd.DataFrame({
                 "Message": [f"No games played yet for {goalie_name} in season {season}"]
             })
-        
-        # Sortera på datum och ta n senaste
-        data = data.sort_values("game_date", ascending=False).head(n)
+
+        # Två målvakter med samma namn: visa den första
+        data = data[data["player_id"] == data["player_id"].iloc[0]]
         
         # Välj och formatera kolumner för målvakter
         cols = [
@@ -474,6 +733,17 @@ class AgentFunctions:
         # Filtrera bara kolumner som finns
         available_cols = [col for col in cols if col in data.columns]
         data_to_return = data[available_cols].copy()
+
+        # Formatera datum till enbart datum (inte datetime)
+        if "game_date" in data_to_return.columns:
+            data_to_return["game_date"] = data_to_return["game_date"].dt.date
+
+        totals = self._form_totals("goalie", season, data, n)
+        total_row = {col: totals[col] if col in totals.index else "" for col in available_cols}
+        total_row["game_date"] = f"Last {int(totals['games'])}"
+        if "decision" in available_cols and "wins" in totals.index:
+            total_row["decision"] = f"{int(totals['wins'])} W"
+        data_to_return = pd.concat([data_to_return, pd.DataFrame([total_row])], ignore_index=True)
         
         # Formatera kolumnnamn
         data_to_return.columns = (
@@ -495,38 +765,20 @@ class AgentFunctions:
         
         data_to_return = data_to_return.rename(columns=rename_dict)
         
-        # Formatera datum till enbart datum (inte datetime)
-        if "Game Date" in data_to_return.columns:
-            data_to_return["Game Date"] = data_to_return["Game Date"].dt.date
-        
         # Formatera SV% och GAA till 3 decimaler
         if "SV%" in data_to_return.columns:
-            data_to_return["SV%"] = data_to_return["SV%"].round(3)
+            data_to_return["SV%"] = data_to_return["SV%"].astype(float).round(3)
         if "GAA" in data_to_return.columns:
-            data_to_return["GAA"] = data_to_return["GAA"].round(2)
+            data_to_return["GAA"] = data_to_return["GAA"].astype(float).round(2)
         
         return data_to_return
 
+    @cached_tool("goalies")
     def get_goalie(self, name, season):
         """
         Returns a goalie's stats for a given season.
         """
-        if not hasattr(self, "goalies_fg") or self.goalies_fg is None:
-            self.goalies_fg = self.fs.get_feature_group(
-                name="goalies",
-                version=1
-            )
-
-        name = unidecode(name) #replace åäö etc with aao
-
-        data = (
-            self.goalies_fg
-            .filter(
-                (self.goalies_fg.goalie_full_name == name) &
-                (self.goalies_fg.season_id == season)
-            )
-            .read()
-        )
+        data = self._read("goalies", season, **self._player_filter(name, season, "goalie", "goalie_full_name"))
 
         cols = [
             "goalie_full_name",
@@ -551,26 +803,170 @@ class AgentFunctions:
         }) 
         return data_to_return
     
+    def _rows_for_names(self, fg_name, season, names, kind, name_column):
+        """
+        The rows of every name in one read: resolved names by player_id, the rest by
+        the exact (unaccented) name. Returns (rows, [(name, ids or None)]) in the order of names.
+        """
+        resolved = []
+        for name in names:
+            matches = self.resolve_player(name, season, kind)
+            resolved.append((name, [match.player_id for match in matches] or None))
+
+        ids = [player_id for _, found in resolved if found for player_id in found]
+        unresolved = [unidecode(name) for name, found in resolved if not found]
+        frames = []
+        if ids:
+            frames.append(self._read(fg_name, season, player_id=ids))
+        if unresolved:
+            frames.append(self._read(fg_name, season, **{name_column: unresolved}))
+        rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return rows, resolved
+
+    def _aligned(self, rows, resolved, name_column):
+        """The rows of each name in the order they were asked for, a row with only the name if it has none."""
+        aligned = []
+        for name, ids in resolved:
+            if rows.empty:
+                found = rows
+            elif ids:
+                found = rows[rows["player_id"].isin(ids)]
+            else:
+                found = rows[rows[name_column].isin([name, unidecode(name)])]
+            aligned.append(found if not found.empty else pd.DataFrame({name_column: [name]}))
+        aligned = pd.concat(aligned, ignore_index=True)
+
+        # A name without rows turns integer columns into floats, keep them integers
+        for column in rows.columns:
+            if column in aligned.columns and pd.api.types.is_integer_dtype(rows[column]):
+                aligned[column] = aligned[column].astype("Int64")
+        return aligned
+
+    @cached_tool("player_season_stats", "goalies")
+    def compare_players(self, player_names, season):
+        """
+        Returns the season stats of several skaters side by side, one row per player
+        in the order of player_names, from one read. Goalies are compared with compare_goalies.
+        """
+        kinds = [{match.kind for match in self.resolve_player(name, season)} for name in player_names]
+        skaters = [name for name, kind in zip(player_names, kinds) if "skater" in kind or not kind]
+        goalies = [name for name, kind in zip(player_names, kinds) if kind == {"goalie"}]
+        if not skaters:
+            return self.compare_goalies(goalies, season)
+
+        rows, resolved = self._rows_for_names("player_season_stats", season, skaters, "skater", "skater_full_name")
+        cols = [
+            "skater_full_name",
+            "season_id",
+            "team_abbrevs",
+            "games_played",
+            "position_code",
+            "goals",
+            "assists",
+            "points",
+            "points_per_game",
+            "shots",
+            "shooting_pct",
+            "plus_minus",
+            "time_on_ice_per_game",
+        ]
+        data = self._aligned(rows, resolved, "skater_full_name").reindex(columns=cols)
+        data.columns = (data.columns.str.replace("_", " ", regex=False).str.title())
+        data = data.rename(columns={"Time On Ice Per Game": "Time On Ice Per Game (sec)"})
+
+        if goalies:
+            return [data, self.compare_goalies(goalies, season)]
+        return data
+
+    @cached_tool("goalies")
+    def compare_goalies(self, goalie_names, season):
+        """Returns the season stats of several goalies side by side, one row per goalie, from one read."""
+        rows, resolved = self._rows_for_names("goalies", season, goalie_names, "goalie", "goalie_full_name")
+        cols = [
+            "goalie_full_name",
+            "team_abbrevs",
+            "season_id",
+            "games_played",
+            "wins",
+            "losses",
+            "save_pct",
+            "goals_against_average",
+            "shots_against",
+            "goals_against",
+            "time_on_ice",
+        ]
+        data = self._aligned(rows, resolved, "goalie_full_name").reindex(columns=cols)
+        data.columns = (data.columns.str.replace("_", " ", regex=False).str.title())
+        return data.rename(columns={"Time On Ice": "Time On Ice (sec)"})
+
+    @cached_tool("teams")
+    def compare_teams(self, team_names, season):
+        """Returns the season stats of several teams side by side, one row per team, from one read."""
+        names = [self.team_name(team, season) for team in team_names]
+        rows = self._read("teams", season, team_full_name=names)
+
+        key_cols = [
+            "team_full_name",
+            "season_id",
+            "games_played",
+            "wins",
+            "losses",
+            "ot_losses",
+            "points",
+            "goals_for",
+            "goals_against",
+            "power_play_pct",
+            "penalty_kill_pct",
+        ]
+        data = self._aligned(rows, [(name, None) for name in names], "team_full_name").reindex(columns=key_cols)
+        data.columns = (data.columns.str.replace("_", " ", regex=False).str.title())
+        return data
+
+    @cached_tool("players_form", materialize.PLAYERS_LAST_GAMES_FG)
+    def compare_player_form(self, player_names, season, n=5):
+        """
+        Returns the form of several skaters side by side: one row per player with the
+        totals over their n latest games, from one read of the games.
+        """
+        resolved = []
+        for name in player_names:
+            matches = self.resolve_player(name, season, "skater")
+            resolved.append((name, [match.player_id for match in matches] or None))
+
+        ids = [player_id for _, found in resolved if found for player_id in found]
+        unresolved = [unidecode(name) for name, found in resolved if not found]
+        frames = []
+        if ids:
+            frames.append(self._recent_games("skater", season, {"player_id": ids}, n))
+        if unresolved:
+            frames.append(self._recent_games("skater", season, {"skater_full_name": unresolved}, n))
+        games = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        if games.empty:
+            totals = pd.DataFrame(columns=["player_id", "skater_full_name"])
+        else:
+            totals = materialize.window_totals(games.assign(season_id=season), "skater")
+            names = games.groupby("player_id", sort=False)[["skater_full_name", "team_abbrev"]].first()
+            totals = totals.join(names, on="player_id")
+            totals["last_game"] = totals["player_id"].map(games.groupby("player_id")["game_date"].max().dt.date)
+
+        cols = ["skater_full_name", "team_abbrev", "games", "goals", "assists", "points", "points_per_game",
+                "shots", "plus_minus", "pp_points", "ev_points", "time_on_ice_per_game", "last_game"]
+        data = self._aligned(totals, resolved, "skater_full_name").reindex(columns=cols)
+        data.columns = (data.columns.str.replace("_", " ", regex=False).str.title())
+        return data.rename(columns={
+            "Team Abbrev": "Team",
+            "Games": f"Games (last {n})",
+            "Time On Ice Per Game": "Time On Ice Per Game (sec)",
+        })
+
+    @cached_tool("matches")
     def get_game_results(self, team, opponent, season):
         """
         returns the game results between two teams for a specific season
         """
-        if self.games_fg == None:
-            self.games_fg = self.fs.get_feature_group(name="matches", version=1)
-        
-        data = self.games_fg.filter(
-            ((self.games_fg.home_team_name == team) |
-            (self.games_fg.away_team_name == team)) &
-            ((self.games_fg.home_team_name == opponent) |
-            (self.games_fg.away_team_name == opponent)) &
-            (self.games_fg.season == season)
-        ).read()
-
-        #Only take the games that have been played
-        data["game_date"] = pd.to_datetime(data["game_date"])
-        today = pd.Timestamp.now().normalize()
-        data = data[data["game_date"] < today]
-        data = data.sort_values("game_date", ascending=True)
+        team, opponent = self.team_name(team, season), self.team_name(opponent, season)
+        data = self.head_to_head(season).games(season, team, opponent)
 
         #Have it in the format YYYY-MM-DD
         data["game_date_str"] = pd.to_datetime(data["game_date"]).dt.strftime("%Y-%m-%d")
@@ -587,67 +983,204 @@ class AgentFunctions:
         })
         return data_to_return 
 
-    def get_player_performance_against_team(self, player_name, opponent_team_abbrev, season):
+    @cached_tool("matches")
+    def get_rivalry(self, team, opponent):
         """
-        returns the stats of a player against a specific team
+        Returns the record of team against opponent season by season over every
+        season in the matches feature group, with the all-time total as the last row.
+        Relocated franchises are counted under all their names.
         """
-        if not hasattr(self, "player_game_log_fg") or self.player_game_log_fg is None:
-            self.player_game_log_fg = self.fs.get_feature_group(
-                name="players_form",
-                version=1
-            )
-        player_name = unidecode(player_name) #replace åäö etc with aao
-        
-        data = self.player_game_log_fg.filter(
-            ((self.player_game_log_fg.skater_full_name == player_name)) &
-            ((self.player_game_log_fg.opponent_team_abbrev == opponent_team_abbrev)) &
-            ((self.player_game_log_fg.season_id == season))
-        ).read()
+        resolver = self.team_resolver()
+        names = []
+        for text in (team, opponent):
+            match = resolver.resolve(text)
+            names.append(resolver.franchise_names(match.franchise_id) if match else [text])
+
+        table = self.head_to_head().rivalry(names[0], names[1])
+        if table.empty:
+            return pd.DataFrame({"Message": [f"No games found between {team} and {opponent}"]})
+
+        total = table.drop(columns="season").sum()
+        table = pd.concat([table, pd.DataFrame([{"season": "Total", **total.to_dict()}])], ignore_index=True)
+
+        table.insert(0, "team", " / ".join(names[0]))
+        table.insert(1, "opponent", " / ".join(names[1]))
+        table.columns = table.columns.str.replace("_", " ", regex=False).str.title()
+        return table.rename(columns={"W": "Wins", "L": "Losses", "Otl": "OT Losses"})
+
+    @cached_tool("player_season_stats", "goalies")
+    def get_player_seasons(self, player_name, start_season=None, end_season=None):
+        """
+        Returns a skater's or goalie's stats season by season from start_season to
+        end_season (the whole career if they are not given), with the total last.
+        """
+        matches = self.resolve_player(player_name, None)
+        kind = "skater" if any(match.kind == "skater" for match in matches) else ("goalie" if matches else "skater")
+        history = self.season_history(kind)
+
+        rows = history.between(start_season, end_season)
+        ids = [match.player_id for match in matches if match.kind == kind]
+        if ids:
+            rows = rows[rows["player_id"].isin(ids)]
+        else:
+            rows = rows[rows["skater_full_name"] == unidecode(player_name)]
+        if rows.empty:
+            return pd.DataFrame({"Message": [f"No seasons found for {player_name}"]})
 
-        #Only take the games that have been played
-        data["game_date"] = pd.to_datetime(data["game_date"])
-        today = pd.Timestamp.now().normalize()
-        data = data[data["game_date"] < today]
-        data = data.sort_values("game_date", ascending=True)
+        if kind == "skater":
+            cols = ["season_id", "skater_full_name", "team_abbrevs", "games_played", "goals", "assists", "points",
+                    "points_per_game", "shots", "shooting_pct", "plus_minus", "time_on_ice_per_game"]
+        else:
+            cols = ["season_id", "goalie_full_name", "team_abbrevs", "games_played", "wins", "losses",
+                    "save_pct", "goals_against_average", "shots_against", "goals_against"]
+
+        data_list = []
+        #One table per player, two players can have the same name
+        for _, player_rows in rows.groupby("player_id", sort=False):
+            table = history.per_season(player_rows)
+            table = table.loc[:, [c for c in cols if c in table.columns]]
+            table.columns = table.columns.str.replace("_", " ", regex=False).str.title()
+            data_list.append(table.rename(columns={
+                "Season Id": "Season",
+                "Time On Ice Per Game": "Time On Ice Per Game (sec)",
+            }))
+        return data_list if len(data_list) > 1 else data_list[0]
+
+    @cached_tool("teams")
+    def get_team_seasons(self, team_name, start_season=None, end_season=None):
+        """
+        Returns a team's record season by season from start_season to end_season
+        (every season if they are not given) with the total last. A relocated
+        franchise is counted under all its names.
+        """
+        match = self.resolve_team(team_name, None)
+        names = self.team_resolver().franchise_names(match.franchise_id) if match else [team_name]
+
+        history = self.season_history("team")
+        rows = history.between(start_season, end_season)
+        rows = rows[rows["team_full_name"].isin(names)]
+        if rows.empty:
+            return pd.DataFrame({"Message": [f"No seasons found for {team_name}"]})
+
+        table = history.per_season(rows)
+        cols = ["season_id", "team_full_name", "games_played", "wins", "losses", "ot_losses", "points",
+                "point_pct", "goals_for", "goals_against", "power_play_pct", "penalty_kill_pct"]
+        table = table.loc[:, [c for c in cols if c in table.columns]]
+        table.columns = table.columns.str.replace("_", " ", regex=False).str.title()
+        return table.rename(columns={"Season Id": "Season", "Ot Losses": "OT Losses"})
+
+    @cached_tool("player_season_stats")
+    def top_players_range(self, start_season=None, end_season=None, position=None, metric="points", n=10, min_games=0):
+        """
+        Returns the top n players over the seasons start_season..end_season, rates
+        (points per game, TOI) are over all the games in the range.
+        """
+        group_mask = None
+        if position:
+            positions = POSITION_GROUPS.get(position, (position,))
+            group_mask = lambda rows: rows["position_code"].isin(positions)
+
+        totals = self.season_history("skater").leaders(start_season, end_season, group_mask, min_games)
+        data = Leaderboards(totals, "player_id").top(metric, n)
+        data = data[["skater_full_name", "position_code", metric, "games_played", "seasons"]]
+        data.columns = data.columns.str.replace("_", " ", regex=False).str.title()
+        return data
 
-        #Have it in the format YYYY-MM-DD
-        data["game_date_str"] = pd.to_datetime(data["game_date"]).dt.strftime("%Y-%m-%d")
+    @cached_tool("goalies")
+    def top_goalies_range(self, start_season=None, end_season=None, metric="save_pct", n=10, min_games=0):
+        """
+        Returns the top n goalies over the seasons start_season..end_season, SV% and
+        GAA are recomputed from the shots, saves and time over the whole range.
+        """
+        totals = self.season_history("goalie").leaders(start_season, end_season, min_games=min_games)
+        data = Leaderboards(totals, "player_id").top(metric, n)
+        cols = ["goalie_full_name", "team_abbrevs", "games_played", "seasons", metric]
+        data = data.loc[:, [c for c in cols if c in data.columns]]
+        data.columns = data.columns.str.replace("_", " ", regex=False).str.title()
+        return data
 
-        
-        #Check if we have two or more players with the same name
+    def _opponent_splits(self, season, player_filter, abbrevs):
+        """
+        Rows of players_vs_opponent (see materialize.py) for the players and opponents,
+        in one season or every season if season is None. Built from players_form
+        instead if the aggregate has no rows for them.
+        """
+        fg_name = materialize.PLAYERS_VS_OPPONENT_FG
+        if "player_id" in player_filter:
+            try:
+                if season is not None:
+                    splits = self._read(fg_name, season, **player_filter, opponent_team_abbrev=abbrevs)
+                else:
+                    fg = self.get_fg(fg_name)
+                    splits = tracing.read(fg.filter(fg.player_id.isin(player_filter["player_id"]) & fg.opponent_team_abbrev.isin(abbrevs)), fg_name)
+                if not splits.empty:
+                    return splits
+            except Exception as e:
+                log.warning("Could not read %s: %s", fg_name, e)
+
+        # Not materialized yet: aggregate the game log
+        if season is not None:
+            games = self._read("players_form", season, **player_filter, opponent_team_abbrev=abbrevs)
+        else:
+            fg = self.get_fg("players_form")
+            column, value = next(iter(player_filter.items()))
+            condition = getattr(fg, column).isin(value) if isinstance(value, list) else getattr(fg, column) == value
+            games = tracing.read(fg.filter(condition & fg.opponent_team_abbrev.isin(abbrevs)), "players_form")
+        return materialize.opponent_splits(games)
 
-        if data["player_id"].nunique(dropna=False) > 1:
-            player_ids = data["player_id"].unique()
-            data_list = []
-            #split it to a pd frame for each unique player
-            for player_id in player_ids:
-                mask = (data["player_id"] == player_id)
-                player_data = data.loc[mask].copy()
-
-                #Which cols to pick
-                cols = ["game_date_str", "team_abbrev","opponent_team_abbrev", "position_code", "assists", "goals", 
-                        "game_winning_goals", "penalty_minutes", "plus_minus"]
-
-                player_data = player_data.loc[:, cols].copy()
-                player_data.columns = (player_data.columns.str.replace("_", " ", regex=False).str.title())       
-                player_data = player_data.rename(columns={
-                    "Game Date Str": "Game Date",
-                    "Posistion Code": "Posistion",
-                })
-                data_list.append(player_data)
-            return data_list
+    @cached_tool("players_form", materialize.PLAYERS_VS_OPPONENT_FG)
+    def get_player_performance_against_team(self, player_name, opponent_team_abbrev, season):
+        """
+        returns the stats of a player against a specific team, for one season or
+        season by season with a career total if season is "all"
+        """
+        all_seasons = season is None or str(season).lower() in ("all", "career")
+        season_key = None if all_seasons else season
+
+        player_filter = self._player_filter(player_name, season_key, "skater", "skater_full_name")
+        if all_seasons:
+            match = self.resolve_team(opponent_team_abbrev, None)
+            abbrevs = self.team_resolver().franchise_abbrevs(match.franchise_id) if match else [opponent_team_abbrev]
         else:
-            #Which cols to pick
-            cols = ["game_date_str", "opponent_team_abbrev", "assists", "goals", 
-                    "game_winning_goals", "penalty_minutes", "plus_minus"]
+            abbrevs = [self.team_abbrev(opponent_team_abbrev, season)]
 
-            data_to_return = data.loc[:, cols].copy()
+        data = self._opponent_splits(season_key, player_filter, abbrevs)
+        if data.empty:
+            return pd.DataFrame({
+                "Message": [f"No games found for {player_name} against {opponent_team_abbrev}"]
+            })
 
-            data_to_return.columns = (data_to_return.columns.str.replace("_", " ", regex=False).str.title())       
-            data_to_return = data_to_return.rename(columns={
-                "Game Date Str": "Game Date",
+        cols = ["season_id", "skater_full_name", "team_abbrev", "position_code", "opponent_team_abbrev", "games",
+                "goals", "assists", "points", "game_winning_goals", "penalty_minutes", "plus_minus"]
+
+        data_list = []
+        #One table per player, two players can have the same name
+        for _, player_data in data.groupby("player_id", sort=False):
+            player_data = player_data.assign(season_id=player_data["season_id"].astype(str))
+            player_data = player_data.sort_values("season_id")
+            player_data = player_data.loc[:, [c for c in cols if c in player_data.columns]]
+
+            if all_seasons:
+                sums = player_data[["games"] + [c for c in materialize.OPPONENT_SUM_COLUMNS if c in player_data.columns]].sum()
+                total = {col: "" for col in player_data.columns}
+                total.update(sums.to_dict())
+                total["season_id"] = "Total"
+                player_data = pd.concat([player_data, pd.DataFrame([total])], ignore_index=True)
+
+            player_data.columns = (player_data.columns.str.replace("_", " ", regex=False).str.title())
+            player_data = player_data.rename(columns={
+                "Season Id": "Season",
+                "Skater Full Name": "Full Name",
+                "Team Abbrev": "Team",
+                "Position Code": "Position",
+                "Opponent Team Abbrev": "Opponent",
+                "Game Winning Goals": "GWG",
+                "Penalty Minutes": "PIM",
+                "Plus Minus": "+/-",
             })
-            return data_to_return   
+            data_list.append(player_data.reset_index(drop=True))
+
+        return data_list if len(data_list) > 1 else data_list[0]
 
 
 agentFunctions = AgentFunctions()
@@ -0,0 +1,601 @@
+"""
+Explanations written from the tool results without a second LLM call.
+
+Most answers are one table: a leaderboard, a player's season, a team's last
+games. For those a template per tool summarises the DataFrame (the leader and
+the gap to the next, per-game rates, streaks, totals over several seasons) and
+gives players who share a name unique labels. explain_locally() decides when
+that is enough and when the question still needs explain_result: questions
+that ask for an opinion or a yes/no answer, plans with several tools, errors,
+empty results and tools without a template.
+"""
+import functools
+import logging
+import math
+import re
+
+import pandas as pd
+
+from leaderboards import ASCENDING_METRICS
+
+
+log = logging.getLogger(__name__)
+
+# Words that ask for reasoning the tables cannot give
+ANALYSIS_WORDS = {
+    "why", "should", "would", "could", "better", "worse", "predict", "prediction", "expect", "chance", "chances",
+    "likely", "think", "opinion", "explain", "analyze", "analyse", "analysis", "deserve", "deserves",
+    "overrated", "underrated", "trend", "improve", "improved", "improving", "worried", "concern", "mvp",
+}
+# A question that starts with these wants a yes or no
+YES_NO_WORDS = {"is", "are", "was", "were", "did", "does", "do", "has", "have", "had", "can", "will"}
+
+# Tool calls in a plan that are explained locally in "auto" mode
+MAX_LOCAL_TOOLS = 1
+# Rows of a leaderboard named after the leader and the runner-up
+MAX_LISTED = 5
+# Comparisons with more rows than this get the leaders only, not a sentence per row
+MAX_ROW_SENTENCES = 3
+
+# Rates written as .913 and as percentages, everything else as numbers
+DECIMAL_RATES = {"Save Pct", "SV%", "Point Pct"}
+PERCENTAGES = {"Shooting Pct", "Power Play Pct", "Penalty Kill Pct"}
+STAT_NAMES = {
+    "Save Pct": "save percentage",
+    "Goals Against Average": "GAA",
+    "Plus Minus": "plus/minus",
+    "Time On Ice Per Game (sec)": "time on ice per game",
+    "Ev Points": "even strength points",
+    "Pp Points": "power play points",
+}
+NAME_COLUMNS = ("Skater Full Name", "Goalie Full Name", "Team Full Name", "Full Name", "Team")
+# Columns that describe a leaderboard row rather than rank it
+ROW_COLUMNS = {"Skater Full Name", "Goalie Full Name", "Team Full Name", "Position Code", "Team Abbrevs",
+               "Team", "Games Played", "Seasons", "Last Game"}
+# Board metrics where a high value is bad, their leader "has the most" instead of "leads"
+HIGH_IS_BAD = {"goals_against", "penalty_minutes"}
+STREAK_WORDS = {"W": ("win", "wins"), "L": ("loss", "losses"), "OTL": ("overtime loss", "overtime losses")}
+
+
+def _missing(value) -> bool:
+    return value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value))
+
+
+def number(value, column: str = "") -> str:
+    """A stat the way it is written in hockey: 25, 0.35, .913, 15.8%, +5, 16:44."""
+    if _missing(value):
+        return "n/a"
+    value = float(value)
+    if column in DECIMAL_RATES:
+        return f"{value:.3f}".replace("0.", ".", 1)
+    if column in PERCENTAGES:
+        return f"{value * 100:.1f}%"
+    if "(sec)" in column:
+        return f"{int(value // 60)}:{int(value % 60):02d}"
+    if column in ("Plus Minus", "+/-", "Goal Diff"):
+        return f"{value:+.0f}"
+    return f"{value:.0f}" if value.is_integer() else f"{value:.2f}"
+
+
+def season_label(season) -> str:
+    """20252026 -> "2025-26"."""
+    text = str(season)
+    return f"{text[:4]}-{text[6:]}" if len(text) == 8 and text.isdigit() else text
+
+
+def stat_name(column: str) -> str:
+    return STAT_NAMES.get(column, re.sub(r"\s*\(.*?\)", "", column).lower())
+
+
+def _plural(count, singular: str, plural: str | None = None) -> str:
+    return f"{number(count)} {singular if count == 1 else plural or singular + 's'}"
+
+
+def _column(df: pd.DataFrame, *names):
+    return next((name for name in names if name in df.columns), None)
+
+
+def labels(df: pd.DataFrame, name_column: str) -> list[str]:
+    """
+    The names of the rows, with team and position added to a name that appears
+    more than once, so two players called Sebastian Aho stay apart.
+    """
+    names = df[name_column].astype(str).tolist()
+    team = _column(df, "Team Abbrevs", "Team")
+    position = _column(df, "Position Code", "Position")
+    duplicated = df[name_column].duplicated(keep=False).tolist()
+
+    result = []
+    for i, name in enumerate(names):
+        details = [str(df[column].iloc[i]) for column in (team, position)
+                   if column and column != name_column and not _missing(df[column].iloc[i])]
+        result.append(f"{name} ({', '.join(details)})" if duplicated[i] and details else name)
+    return result
+
+
+def _record(row, otl_column: str | None) -> str:
+    record = f"{number(row['Wins'])}-{number(row['Losses'])}"
+    return record + (f"-{number(row[otl_column])}" if otl_column else "")
+
+
+def _streak(code) -> str:
+    """"W3" -> "3 wins", "OTL1" -> "1 overtime loss"."""
+    match = re.fullmatch(r"([A-Z]+)(\d+)", str(code or ""))
+    if not match or match.group(1) not in STREAK_WORDS:
+        return ""
+    singular, plural = STREAK_WORDS[match.group(1)]
+    return _plural(int(match.group(2)), singular, plural)
+
+
+def _split_total(df: pd.DataFrame, season_column: str = "Season"):
+    """(season rows, the Total row or the only row) of a table with a total at the end."""
+    is_total = df[season_column].astype(str).str.lower() == "total"
+    seasons = df[~is_total]
+    if is_total.any():
+        return seasons, df[is_total].iloc[-1]
+    return seasons, (seasons.iloc[0] if len(seasons) == 1 else None)
+
+
+def _span(seasons: pd.DataFrame, season_column: str = "Season") -> str:
+    values = seasons[season_column].tolist()
+    if not values:
+        return ""
+    first, last = season_label(values[0]), season_label(values[-1])
+    return first if first == last else f"{first} to {last}"
+
+
+def _skater_line(row, games_column: str = "Games Played") -> str:
+    games = row[games_column]
+    line = (f"{_plural(row['Points'], 'point')} ({_plural(row['Goals'], 'goal')}, {_plural(row['Assists'], 'assist')}) "
+            f"in {_plural(games, 'game')}")
+    if games:
+        line += f", {float(row['Points']) / float(games):.2f} per game"
+    plus_minus = next((column for column in ("Plus Minus", "+/-") if column in row.index), None)
+    if plus_minus and not _missing(row[plus_minus]):
+        line += f", {number(row[plus_minus], 'Plus Minus')}"
+    return line
+
+
+def leaderboard(df: pd.DataFrame, metric: str | None = None, games_column: str = "Games Played",
+                prefix: str = "", ascending: bool = False, high_is_bad: bool = False) -> str | None:
+    """
+    The leader, the gap to the next and the rest of the top rows. ascending is the
+    order the tool sorted the board in (lowest first for GAA), it is not guessed
+    from the values.
+    """
+    name_column = _column(df, *NAME_COLUMNS)
+    metric = metric or next((column for column in df.columns if column not in ROW_COLUMNS), None)
+    if name_column is None or metric is None or metric not in df.columns:
+        return None
+    df = df[df[metric].notna()]
+    if df.empty:
+        return None
+
+    names = labels(df, name_column)
+    values = df[metric].astype(float).tolist()
+    stat = stat_name(metric)
+
+    verb = f"has the most {stat}" if high_is_bad and not ascending else f"leads in {stat}"
+    leader = f"{prefix}{names[0]} {verb} with {number(values[0], metric)}"
+    if games_column in df.columns and not _missing(df[games_column].iloc[0]):
+        games = float(df[games_column].iloc[0])
+        leader += f" in {_plural(games, 'game')}"
+        # Per-game rate for counting stats, the float columns already are rates
+        if games and metric != "Plus Minus" and pd.api.types.is_integer_dtype(df[metric]):
+            leader += f" ({values[0] / games:.2f} per game)"
+
+    if len(values) == 1:
+        return leader + "."
+    if values[0] == values[1]:
+        tied = [name for name, value in zip(names, values) if value == values[0]]
+        text = f"{prefix}{', '.join(tied[:-1])} and {tied[-1]} are tied at the top in {stat} with {number(values[0], metric)}."
+    else:
+        gap = abs(values[0] - values[1])
+        word = "better than" if ascending else "more than" if high_is_bad else "ahead of"
+        gap_text = number(gap, "" if metric == "Plus Minus" else metric)
+        text = f"{leader}, {gap_text} {word} {names[1]} ({number(values[1], metric)})."
+    rest = [f"{name} {number(value, metric)}" for name, value in zip(names[2:MAX_LISTED], values[2:MAX_LISTED])]
+    if rest:
+        text += " Next: " + ", ".join(rest) + "."
+    return text
+
+
+def explain_top(df, params, default_metric: str = "points") -> str | None:
+    if not isinstance(df, pd.DataFrame):
+        return None
+    prefix = ""
+    if params.get("start_season"):
+        span = season_label(params["start_season"])
+        if params.get("end_season") and params["end_season"] != params["start_season"]:
+            span += f" to {season_label(params['end_season'])}"
+        prefix = f"From {span}, "
+    metric = params.get("metric") or default_metric
+    column = metric.replace("_", " ").title()
+    # Every top_* tool ranks through leaderboards.Leaderboards, which sorts these lowest first
+    return leaderboard(df, column if column in df.columns else None, prefix=prefix,
+                       ascending=metric in ASCENDING_METRICS, high_is_bad=metric in HIGH_IS_BAD)
+
+
+def _season_rows(df: pd.DataFrame, name_column: str, line) -> str | None:
+    """One sentence per row of a season table, "No stats" for a name without rows."""
+    games = _column(df, "Games Played")
+    if games is None:
+        return None
+    names = labels(df, name_column)
+    duplicates = df[name_column][df[name_column].duplicated()].unique().tolist()
+
+    sentences = []
+    if duplicates:
+        sentences.append(" ".join(
+            f"There are {(df[name_column] == name).sum()} players named {name}, shown separately." for name in duplicates
+        ))
+    brief = len(df) > MAX_ROW_SENTENCES
+    for label, (_, row) in zip(names, df.iterrows()):
+        season = season_label(row["Season Id"]) if "Season Id" in df.columns and not _missing(row["Season Id"]) else ""
+        if _missing(row[games]):
+            sentences.append(f"No stats found for {label}{' in ' + season if season else ''}.")
+        elif not brief:
+            sentences.append(f"{label}{' in ' + season if season else ''}: {line(row)}.")
+    return " ".join(sentences)
+
+
+def _leaders(df: pd.DataFrame, name_column: str, stats: list[tuple[str, str]]) -> str:
+    """ "Most points: Sidney Crosby (31)." for each (column, wording) when there are several rows."""
+    names = labels(df, name_column)
+    df = df.reset_index(drop=True)
+    sentences = []
+    for column, wording in stats:
+        if column not in df.columns:
+            continue
+        values = df[column].astype(float)
+        if values.notna().sum() < 2:
+            continue
+        best = values.min() if wording.startswith("Lowest") else values.max()
+        tied = [names[i] for i in values.index if values[i] == best]
+        sentences.append(f"{wording}: {' and '.join(tied)} ({number(best, column)}).")
+    return " ".join(sentences)
+
+
+def explain_skaters(df: pd.DataFrame) -> str | None:
+    name_column = "Skater Full Name"
+    text = _season_rows(df, name_column, lambda row: _skater_line(row))
+    if text is None:
+        return None
+    if df[name_column].nunique() > 1:
+        text += " " + _leaders(df, name_column, [("Points", "Most points"), ("Goals", "Most goals"),
+                                                 ("Points Per Game", "Most points per game")])
+    return text.strip()
+
+
+def explain_goalies(df: pd.DataFrame) -> str | None:
+    name_column = "Goalie Full Name"
+
+    def line(row):
+        return (f"{number(row['Wins'])}-{number(row['Losses'])} in {_plural(row['Games Played'], 'game')}, "
+                f"{number(row['Save Pct'], 'Save Pct')} save percentage and {number(row['Goals Against Average'])} GAA")
+
+    text = _season_rows(df, name_column, line)
+    if text is None:
+        return None
+    if df[name_column].nunique() > 1:
+        text += " " + _leaders(df, name_column, [("Save Pct", "Best save percentage"),
+                                                 ("Goals Against Average", "Lowest GAA")])
+    return text.strip()
+
+
+def explain_teams(df: pd.DataFrame) -> str | None:
+    name_column = "Team Full Name"
+    otl = _column(df, "Ot Losses", "OT Losses")
+
+    def line(row):
+        diff = row["Goals For"] - row["Goals Against"]
+        return (f"{_record(row, otl)} with {number(row['Points'])} points in {_plural(row['Games Played'], 'game')}, "
+                f"goals {number(row['Goals For'])}-{number(row['Goals Against'])} ({number(diff, 'Goal Diff')})")
+
+    text = _season_rows(df, name_column, line)
+    if text is None:
+        return None
+    if df[name_column].nunique() > 1:
+        text += " " + _leaders(df, name_column, [("Points", "Most points")])
+    return text.strip()
+
+
+def explain_season_rows(result, params) -> str | None:
+    """get_player_overview, get_goalie, get_team_overview and the compare_* tools."""
+    frames = result if isinstance(result, list) else [result]
+    texts = []
+    for df in frames:
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return None
+        if "Skater Full Name" in df.columns:
+            texts.append(explain_skaters(df))
+        elif "Goalie Full Name" in df.columns:
+            texts.append(explain_goalies(df))
+        elif "Team Full Name" in df.columns:
+            texts.append(explain_teams(df))
+        else:
+            return None
+    return None if None in texts else " ".join(texts)
+
+
+def explain_team_form(result, params) -> str | None:
+    if not isinstance(result, tuple) or len(result) != 2:
+        return None
+    summary, matches = result
+    if summary.empty or not summary["Games"].iloc[0]:
+        return None
+    row = summary.iloc[0]
+    text = (f"{row['Team']} over the last {_plural(row['Games'], 'game')}: {_record(row, 'OT Losses')}, "
+            f"{number(row['Points'])} points ({float(row['Points Per Game']):.2f} per game), "
+            f"goals {number(row['Goals For'])}-{number(row['Goals Against'])} ({number(row['Goal Diff'], 'Goal Diff')}).")
+    streak = _streak(row.get("Streak"))
+    if streak:
+        text += f" Current streak: {streak}."
+    if not matches.empty:
+        last = matches.iloc[0]
+        where = "at home against" if last["Home/Away"] == "Home" else "away against"
+        text += f" Last game: {last['Result']} {last['Score']} {where} {last['Opponent']} on {last['Date']}."
+    return text
+
+
+def explain_league_form(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    first, last = df.iloc[0], df.iloc[-1]
+    text = (f"Best form over the last {_plural(first['Games'], 'game')}: {first['Team']}, {_record(first, 'OT Losses')} "
+            f"with {number(first['Points'])} points.")
+    if len(df) > 1:
+        text += f" Weakest: {last['Team']}, {_record(last, 'OT Losses')} with {number(last['Points'])} points."
+
+    streaks = df["Streak"].astype(str).str.extract(r"^W(\d+)$")[0].dropna().astype(int)
+    if not streaks.empty:
+        longest = streaks.max()
+        teams = df.loc[streaks[streaks == longest].index, "Team"].tolist()
+        text += f" Longest current winning streak: {' and '.join(teams)} with {_plural(longest, 'win')}."
+    return text
+
+
+def _games(df: pd.DataFrame) -> pd.DataFrame:
+    """The game rows of a form table, without the "Last N" totals row at the end."""
+    return df[~df["Game Date"].astype(str).str.startswith("Last")]
+
+
+def _player_form(df: pd.DataFrame, label: str) -> str:
+    df = _games(df)
+    games = len(df)
+    totals = {column: df[column].sum() for column in ("Goals", "Assists", "Points", "Shots", "+/-") if column in df}
+    text = (f"{label} over the last {_plural(games, 'game')}: {_plural(totals['Points'], 'point')} "
+            f"({_plural(totals['Goals'], 'goal')}, {_plural(totals['Assists'], 'assist')}), "
+            f"{float(totals['Points']) / games:.2f} per game")
+    if "Shots" in totals:
+        text += f", {number(totals['Shots'])} shots"
+    if "+/-" in totals:
+        text += f", {number(totals['+/-'], '+/-')}"
+    text += "."
+
+    # Newest game first, count from the top until the streak breaks
+    scored = (df["Points"].astype(float) > 0).tolist()
+    run = next((i for i, value in enumerate(scored) if value != scored[0]), len(scored))
+    if scored[0] and run >= 2:
+        text += f" Points in each of the last {run} games."
+    elif not scored[0] and run >= 2:
+        text += f" No points in the last {run} games."
+    return text
+
+
+def explain_player_form(result, params) -> str | None:
+    frames = result if isinstance(result, list) else [result]
+    if not all(isinstance(df, pd.DataFrame) and "Points" in df and not _games(df).empty for df in frames):
+        return None
+    if len(frames) == 1:
+        return _player_form(frames[0], _games(frames[0])["Full Name"].iloc[0])
+
+    # Several players with the same name, one frame each with its team and position
+    combined = pd.concat([_games(df).iloc[:1] for df in frames], ignore_index=True)
+    names = labels(combined, "Full Name")
+    text = f"There are {len(frames)} players named {combined['Full Name'].iloc[0]}, shown separately."
+    return " ".join([text] + [_player_form(df, label) for df, label in zip(frames, names)])
+
+
+def explain_goalie_form(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or _games(df).empty:
+        return None
+    df = _games(df)
+    decisions = df["Decision"].astype(str).value_counts()
+    wins, losses = int(decisions.get("W", 0)), int(decisions.get("L", 0))
+    other = sum(int(decisions.get(code, 0)) for code in ("O", "OT", "OTL"))
+    saves, shots, goals = float(df["Saves"].sum()), float(df["SA"].sum()), float(df["GA"].sum())
+    seconds = float(df["TOI"].sum())
+
+    record = f"{wins}-{losses}" + (f"-{other}" if other > 0 else "")
+    name = params.get("player_name") or params.get("goalie_name") or "The goalie"
+    text = f"{name} over the last {_plural(len(df), 'game')}: {record}"
+    if shots:
+        text += f", {number(saves / shots, 'SV%')} save percentage ({number(saves)} saves on {number(shots)} shots)"
+    if seconds:
+        text += f" and {goals * 3600 / seconds:.2f} GAA"
+    return text + "."
+
+
+def explain_game_results(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    wins, games = {}, []
+    for _, row in df.sort_values("Game Date", kind="stable").iterrows():
+        home, away = row["Home Team Name"], row["Visiting Team Name"]
+        if row["Home Score"] > row["Visiting Score"]:
+            winner, loser, score, where = home, away, f"{row['Home Score']}-{row['Visiting Score']}", "at home"
+        else:
+            winner, loser, score, where = away, home, f"{row['Visiting Score']}-{row['Home Score']}", "away"
+        wins[winner] = wins.get(winner, 0) + 1
+        games.append(f"{winner} beat {loser} {score} {where} on {row['Game Date']}")
+
+    if len(games) == 1:
+        return games[0] + "."
+    tally = ", ".join(f"{team} won {count}" for team, count in sorted(wins.items(), key=lambda item: -item[1]))
+    return f"{len(games)} games: {tally}. Latest: {games[-1]}."
+
+
+def explain_rivalry(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    seasons, total = _split_total(df)
+    if total is None:
+        return None
+    return (f"{total['Team']} against {total['Opponent']} ({_span(seasons)}): {_record(total, 'OT Losses')} in "
+            f"{_plural(total['Games'], 'game')}, goals {number(total['Goals For'])}-{number(total['Goals Against'])} "
+            f"({number(total['Goal Diff'], 'Goal Diff')}).")
+
+
+def _vs_team(df: pd.DataFrame, label: str | None = None) -> str | None:
+    seasons, total = _split_total(df)
+    if total is None:
+        return None
+    first = seasons.iloc[0]
+    return f"{label or first['Full Name']} against {first['Opponent']} ({_span(seasons)}): {_skater_line(total, 'Games')}."
+
+
+def explain_player_vs_team(result, params) -> str | None:
+    frames = result if isinstance(result, list) else [result]
+    if not all(isinstance(df, pd.DataFrame) and not df.empty for df in frames):
+        return None
+    if len(frames) == 1:
+        return _vs_team(frames[0])
+    firsts = pd.concat([df.iloc[:1] for df in frames], ignore_index=True)
+    texts = [_vs_team(df, label) for df, label in zip(frames, labels(firsts, "Full Name"))]
+    return None if None in texts else f"There are {len(frames)} players with that name, shown separately. " + " ".join(texts)
+
+
+def _best_season(seasons: pd.DataFrame, column: str) -> str:
+    if len(seasons) < 2:
+        return ""
+    best = seasons.loc[seasons[column].astype(float).idxmax()]
+    return f" Best season: {season_label(best['Season'])} with {number(best[column], column)} {stat_name(column)}."
+
+
+def _player_seasons(df: pd.DataFrame, label: str | None = None) -> str | None:
+    seasons, total = _split_total(df)
+    if total is None:
+        return None
+    name = label or total["Skater Full Name"]
+    return f"{name}, {_span(seasons)}: {_skater_line(total)}." + _best_season(seasons, "Points")
+
+
+def explain_player_seasons(result, params) -> str | None:
+    frames = result if isinstance(result, list) else [result]
+    if not all(isinstance(df, pd.DataFrame) and not df.empty for df in frames):
+        return None
+    if len(frames) == 1:
+        return _player_seasons(frames[0])
+    firsts = pd.concat([df.iloc[:1] for df in frames], ignore_index=True)
+    texts = [_player_seasons(df, label) for df, label in zip(frames, labels(firsts, "Skater Full Name"))]
+    return None if None in texts else f"There are {len(frames)} players with that name, shown separately. " + " ".join(texts)
+
+
+def explain_team_seasons(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    seasons, total = _split_total(df)
+    if total is None:
+        return None
+    text = (f"{total['Team Full Name']}, {_span(seasons)}: {_record(total, 'OT Losses')} with "
+            f"{number(total['Points'])} points in {_plural(total['Games Played'], 'game')}, "
+            f"{number(total['Point Pct'], 'Point Pct')} point percentage.")
+    return text + _best_season(seasons, "Points")
+
+
+def explain_compare_form(df, params) -> str | None:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return None
+    games = next((column for column in df.columns if column.startswith("Games")), None)
+    ranked = df.sort_values("Points", ascending=False, kind="stable")
+    text = leaderboard(ranked, "Points", games_column=games or "Games")
+    missing = df.loc[df["Points"].isna(), "Skater Full Name"].tolist()
+    if text and missing:
+        text += f" No recent games found for {', '.join(missing)}."
+    return text
+
+
+# tool -> template(result, params), text or None when the result does not fit it
+TEMPLATES = {
+    "top_players": explain_top,
+    "top_goalies": functools.partial(explain_top, default_metric="save_pct"),
+    "top_teams": explain_top,
+    "top_players_range": explain_top,
+    "top_goalies_range": functools.partial(explain_top, default_metric="save_pct"),
+    "get_player_overview": explain_season_rows,
+    "get_goalie": explain_season_rows,
+    "get_team_overview": explain_season_rows,
+    "compare_players": explain_season_rows,
+    "compare_goalies": explain_season_rows,
+    "compare_teams": explain_season_rows,
+    "get_team_form": explain_team_form,
+    "league_form_table": explain_league_form,
+    "get_player_form": explain_player_form,
+    "get_goalie_form": explain_goalie_form,
+    "get_game_results": explain_game_results,
+    "get_rivalry": explain_rivalry,
+    "get_player_performance_against_team": explain_player_vs_team,
+    "get_player_seasons": explain_player_seasons,
+    "get_team_seasons": explain_team_seasons,
+    "compare_player_form": explain_compare_form,
+}
+
+
+def _empty(result) -> bool:
+    if isinstance(result, pd.DataFrame):
+        return result.empty
+    if isinstance(result, (list, tuple)):
+        return not result or all(_empty(part) for part in result)
+    return False
+
+
+def llm_reason(question: str, plan: list, results: list, mode: str = "auto") -> str | None:
+    """
+    Why the answer needs explain_result, None when the templates can write it.
+    mode "llm" always uses the LLM, "local" uses a template whenever the tool has
+    one, "auto" also keeps the LLM for questions that want an opinion or a yes/no
+    answer and for plans with more than MAX_LOCAL_TOOLS tool calls.
+    """
+    if mode == "llm":
+        return "mode"
+    if any(tool_name not in TEMPLATES for tool_name, _ in plan):
+        return "no_template"
+    if any(isinstance(result, str) for result in results):
+        return "error"
+    if any(_empty(result) for result in results):
+        return "empty"
+    if mode == "local":
+        return None
+
+    if len(plan) > MAX_LOCAL_TOOLS:
+        return "tools"
+    words = re.findall(r"[a-z]+", question.lower())
+    if set(words) & ANALYSIS_WORDS:
+        return "analysis"
+    if words and words[0] in YES_NO_WORDS:
+        return "yes_no"
+    return None
+
+
+def explain_locally(question: str, plan: list, results: list, mode: str = "auto") -> tuple[str | None, str]:
+    """
+    (explanation, reason): the explanation written from the templates, or None
+    and the reason the LLM has to write it.
+    """
+    reason = llm_reason(question, plan, results, mode)
+    if reason:
+        return None, reason
+
+    texts = []
+    for (tool_name, params), result in zip(plan, results):
+        try:
+            text = TEMPLATES[tool_name](result, params or {})
+        except (AttributeError, KeyError, TypeError, ValueError, IndexError) as e:
+            # A result in a shape the template does not know, the LLM gets it instead
+            log.debug("Template for %s failed: %s", tool_name, e)
+            text = None
+        if not text:
+            return None, "template_failed"
+        texts.append(text)
+    return "\n\n".join(texts), "template"
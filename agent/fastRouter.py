@@ -0,0 +1,284 @@
+"""
+Deterministic router for the most common question shapes. Emits the same JSON
+plan as decide_tool for questions it is confident about, everything else is
+left to the LLM.
+"""
+import re
+import threading
+from collections import Counter
+from datetime import date
+
+from unidecode import unidecode
+
+from leaderboards import ASCENDING_METRICS
+
+
+POSITION_WORDS = {
+    "forwards": "F", "forward": "F",
+    "defensemen": "D", "defenseman": "D", "defencemen": "D", "defenceman": "D", "d-men": "D",
+    "centers": "C", "center": "C", "centres": "C", "centre": "C",
+    "left wings": "L", "left wingers": "L", "left wing": "L",
+    "right wings": "R", "right wingers": "R", "right wing": "R",
+    "players": None, "skaters": None, "scorers": None,
+}
+GOALIE_WORDS = {"goalies", "goalie", "goaltenders", "goaltender", "netminders", "keepers"}
+TEAM_WORDS = {"teams", "team", "clubs"}
+
+# Phrase -> metric, longest phrases are matched first
+PLAYER_METRICS = {
+    "points per game": "points_per_game", "ppg": "points_per_game",
+    "even strength points": "ev_points", "even-strength points": "ev_points", "ev points": "ev_points",
+    "5 on 5": "ev_points", "5 against 5": "ev_points", "5v5": "ev_points", "five on five": "ev_points",
+    "penalty minutes": "penalty_minutes", "pim": "penalty_minutes",
+    "plus minus": "plus_minus", "plus-minus": "plus_minus", "+/-": "plus_minus",
+    "time on ice": "time_on_ice_per_game", "ice time": "time_on_ice_per_game", "toi": "time_on_ice_per_game",
+    "points": "points", "goals": "goals", "assists": "assists",
+}
+GOALIE_METRICS = {
+    "save percentage": "save_pct", "save %": "save_pct", "save pct": "save_pct", "sv%": "save_pct", "sv %": "save_pct",
+    "goals against average": "goals_against_average", "gaa": "goals_against_average",
+    "shots against": "shots_against", "wins": "wins",
+}
+TEAM_METRICS = {
+    "power play": "power_play_pct", "powerplay": "power_play_pct", "pp%": "power_play_pct",
+    "penalty kill": "penalty_kill_pct", "pk%": "penalty_kill_pct",
+    "goals for": "goals_for", "goals against": "goals_against",
+    "points": "points", "wins": "wins",
+}
+RANKING_WORDS = {"top", "best", "most", "leaders", "leading", "highest", "leader", "rank", "ranking", "rankings"}
+
+# Words that say which end of a metric is asked for. The boards list the highest
+# values first, except ASCENDING_METRICS, so a question asking for the other end
+# ("lowest plus-minus", "highest GAA") is left to the LLM
+DIRECTION_WORDS = {"most": "high", "highest": "high", "lowest": "low", "fewest": "low", "least": "low"}
+# Metrics where the lowest value is the best, "best"/"top" asks for the low end
+LOWER_IS_BETTER = {"goals_against_average", "goals_against"}
+# Asks for the bottom of a board, which the tools do not return
+REVERSED_WORDS = {"worst", "bottom"}
+
+# Words that may be left over in a leaderboard question without changing its meaning
+FILLER = {
+    "which", "who", "what", "were", "was", "are", "is", "the", "had", "have", "has", "in", "by", "of", "for",
+    "season", "nhl", "with", "me", "show", "give", "list", "a", "at", "on", "to", "there", "so", "far",
+    "regular", "league", "this", "year", "and", "based", "according", "terms", "please", "get", "tell",
+    "current", "right", "now", "did", "do", "does", "been", "all", "during",
+}
+
+DEFAULT_N = 5
+
+SEASON_PATTERNS = [
+    re.compile(r"\b(?P<y1>(?:19|20)\d{2})\s*[/-]\s*(?P<y2>(?:19|20)?\d{2})\b"),
+    re.compile(r"\b(?P<full>(?:19|20)\d{2}(?:19|20)\d{2})\b"),
+    re.compile(r"\b(?P<s1>\d{2})\s*/\s*(?P<s2>\d{2})\b"),
+    re.compile(r"\b(?P<rel>this|current|last|previous)\s+season\b"),
+]
+
+PLAYER_FORM_PATTERNS = [
+    re.compile(r"^(?:show me|give me|what (?:are|were)|how (?:are|were|was))?\s*(?P<name>[\w .'-]+?)(?:'s|s')?\s+"
+               r"(?:last|past|previous|latest|recent)\s+(?P<n>\d+)\s+games?$", re.I),
+    re.compile(r"^how (?:has|is) (?P<name>[\w .'-]+?) (?:been )?(?:playing|performing|doing)\s*"
+               r"(?:lately|recently|of late)$", re.I),
+]
+
+GAME_RESULTS_PATTERNS = [
+    re.compile(r"^(?:show me|give me|what (?:are|were))?\s*(?:the\s+)?(?:game\s+)?results?\s+(?:between|of|for)\s+"
+               r"(?:the\s+)?(?P<team>[\w .'-]+?)\s+(?:and|vs\.?|versus|against)\s+(?:the\s+)?(?P<opponent>[\w .'-]+?)$", re.I),
+    re.compile(r"^(?:the\s+)?(?P<team>[\w .'-]+?)\s+(?:vs\.?|versus|against)\s+(?:the\s+)?(?P<opponent>[\w .'-]+?)\s+"
+               r"(?:game\s+)?results?$", re.I),
+]
+
+
+def season_of(today: date) -> str:
+    start_year = today.year if today.month >= 10 else today.year - 1
+    return f"{start_year}{start_year + 1}"
+
+
+def extract_season(text: str, today: date) -> tuple[str, str]:
+    """
+    Finds a season expression ("2023/2024", "2023-24", "20232024", "18/19", "last season")
+    and returns (season id, text without it). The current season if there is none.
+    """
+    current = season_of(today)
+    for pattern in SEASON_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+
+        groups = match.groupdict()
+        if groups.get("full"):
+            season = groups["full"]
+        elif groups.get("y1"):
+            y1 = int(groups["y1"])
+            season = f"{y1}{y1 + 1}"
+            if int(groups["y2"][-2:]) != (y1 + 1) % 100:
+                continue
+        elif groups.get("s1"):
+            y1 = int(groups["s1"])
+            if int(groups["s2"]) != (y1 + 1) % 100:
+                continue
+            y1 += 2000 if y1 < 50 else 1900
+            season = f"{y1}{y1 + 1}"
+        elif groups["rel"] in ("last", "previous"):
+            y1 = int(current[:4]) - 1
+            season = f"{y1}{y1 + 1}"
+        else:
+            season = current
+
+        text = (text[:match.start()] + " " + text[match.end():]).strip()
+        return season, " ".join(text.split())
+    return current, text
+
+
+def take_phrase(text: str, phrases: dict):
+    """Finds the longest phrase from phrases in text, returns (value, text without it) or (None, text)."""
+    for phrase in sorted(phrases, key=len, reverse=True):
+        match = re.search(rf"(?<![\w+/%-]){re.escape(phrase)}(?![\w+/%-])", text)
+        if match:
+            return phrases[phrase], " ".join((text[:match.start()] + " " + text[match.end():]).split())
+    return None, text
+
+
+class FastRouter:
+    """
+    Pattern and small-grammar based router in front of decide_tool.
+
+    Each matcher scores the question shape it knows:
+    - "top N <position|goalies|teams> by <metric> [season]"
+    - "show me <player> last N games", "how has <player> been playing lately"
+    - "results between <team> and <team> [season]"
+    route() returns the best plan if its confidence reaches the threshold, otherwise None.
+
+    entity_kind(name, season) -> "skater" | "goalie" | "team" | None is used to
+    check that a name really is a player or a team before it is trusted.
+    """
+
+    def __init__(self, threshold: float, entity_kind=None) -> None:
+        self.threshold = threshold
+        self.entity_kind = entity_kind
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, question: str, today: date | None = None):
+        """Returns a plan dict if the question is matched with enough confidence, otherwise None."""
+        today = today or date.today()
+        best_plan, best_confidence, best_name = None, 0.0, None
+
+        for name, matcher in (
+            ("leaderboard", self._match_leaderboard),
+            ("player_form", self._match_player_form),
+            ("game_results", self._match_game_results),
+        ):
+            plan, confidence = matcher(question, today)
+            if plan is not None and confidence > best_confidence:
+                best_plan, best_confidence, best_name = plan, confidence, name
+
+        with self._lock:
+            if best_plan is not None and best_confidence >= self.threshold:
+                self.counters["hits"] += 1
+                self.counters[f"hits_{best_name}"] += 1
+                return best_plan
+            self.counters["fallbacks"] += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.counters["hits"] + self.counters["fallbacks"]
+            return {**self.counters, "hit_rate": self.counters["hits"] / total if total else 0.0}
+
+    def _match_leaderboard(self, question, today):
+        text = unidecode(question).lower().strip().rstrip("?!. ")
+        season, text = extract_season(text, today)
+
+        n = None
+        match = re.search(r"\b(?:top|best)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:best|top)\b", text)
+        if match:
+            n = int(match.group(1) or match.group(2))
+            text = " ".join((text[:match.start()] + " " + text[match.end():]).split())
+        elif re.search(r"\btop\b", text):
+            text = " ".join(re.sub(r"\btop\b", " ", text).split())
+        else:
+            ranking = [w for w in text.split() if w in RANKING_WORDS or w in DIRECTION_WORDS]
+            if not ranking:
+                return None, 0.0
+        if any(w in REVERSED_WORDS for w in text.split()):
+            return None, 0.0
+
+        goalie_words = [w for w in GOALIE_WORDS if re.search(rf"\b{w}\b", text)]
+        team_words = [w for w in TEAM_WORDS if re.search(rf"\b{w}\b", text)]
+        if goalie_words:
+            tool, metrics, params = "top_goalies", GOALIE_METRICS, {}
+            text = " ".join(re.sub(rf"\b(?:{'|'.join(goalie_words)})\b", " ", text).split())
+        elif team_words:
+            tool, metrics, params = "top_teams", TEAM_METRICS, {}
+            text = " ".join(re.sub(rf"\b(?:{'|'.join(team_words)})\b", " ", text).split())
+        else:
+            position, text = take_phrase(text, {k: v or "ALL" for k, v in POSITION_WORDS.items()})
+            if position is None:
+                return None, 0.0
+            tool, metrics, params = "top_players", PLAYER_METRICS, {"position": None if position == "ALL" else position}
+
+        metric, text = take_phrase(text, metrics)
+        words = text.split()
+        leftover = [w for w in words if w not in FILLER and w not in RANKING_WORDS and w not in DIRECTION_WORDS]
+
+        if metric is None:
+            # "Who are the top defensemen" - points is what the LLM picks as well
+            if tool == "top_goalies":
+                metric = "save_pct"
+            else:
+                metric = "points"
+            confidence = 0.85
+        else:
+            confidence = 0.95
+
+        # The board's order has to be the order the question asks for
+        directions = {DIRECTION_WORDS[w] for w in words if w in DIRECTION_WORDS}
+        if not directions:
+            directions = {"low" if metric in LOWER_IS_BETTER else "high"}
+        if directions != {"low" if metric in ASCENDING_METRICS else "high"}:
+            return None, 0.0
+
+        if leftover:
+            confidence -= 0.2 * len(leftover)
+        return {"tool": tool, "season": season, **params, "metric": metric, "n": n or DEFAULT_N}, confidence
+
+    def _match_player_form(self, question, today):
+        text = unidecode(question).strip().rstrip("?!. ")
+        season, text = extract_season(text, today)
+        text = re.sub(r"\s+(?:in|during|for|of)?\s*(?:the)?\s*(?:season)?$", "", text, flags=re.I)
+
+        for pattern in PLAYER_FORM_PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+            name = " ".join(match.group("name").split())
+            n = int(match.groupdict().get("n") or DEFAULT_N)
+
+            kind = self.entity_kind(name, season) if self.entity_kind else None
+            if kind == "skater":
+                return {"tool": "get_player_form", "player_name": name, "season": season, "n": n}, 0.95
+            if kind == "goalie":
+                return {"tool": "get_goalie_form", "player_name": name, "season": season, "n": n}, 0.95
+            # Can't tell if it's a skater, a goalie or a misspelling, let the LLM decide
+            return {"tool": "get_player_form", "player_name": name, "season": season, "n": n}, 0.6
+        return None, 0.0
+
+    def _match_game_results(self, question, today):
+        # Team names are kept as written, the matches feature group has "Montréal Canadiens" with the accent
+        text = question.strip().rstrip("?!. ")
+        season, text = extract_season(text, today)
+        text = re.sub(r"\s+(?:in|during|for|of)?\s*(?:the)?\s*(?:season)?$", "", text, flags=re.I)
+
+        for pattern in GAME_RESULTS_PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+            team = " ".join(match.group("team").split())
+            opponent = " ".join(match.group("opponent").split())
+
+            known = self.entity_kind is not None and all(
+                self.entity_kind(t, season) == "team" for t in (team, opponent)
+            )
+            plan = {"tool": "get_game_results", "team": team, "opponent": opponent, "season": season}
+            return plan, 0.95 if known else 0.6
+        return None, 0.0
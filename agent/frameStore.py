@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from toolCache import DEFAULT_TTLS, DEFAULT_TTL
+import tracing
+
+log = logging.getLogger(__name__)
+
+
+# Which column holds the season in each feature group
+SEASON_COLUMNS = {
+    "player_season_stats": "season_id",
+    "goalies": "season_id",
+    "teams": "season_id",
+    "matches": "season",
+    "players_form": "season_id",
+    "goalies_form": "season_id",
+    "players_last_games": "season_id",
+    "goalies_last_games": "season_id",
+    "players_rolling_form": "season_id",
+    "goalies_rolling_form": "season_id",
+    "players_vs_opponent": "season_id",
+}
+
+# Columns the tools look rows up by, a hash index is built for each of them
+INDEX_COLUMNS = {
+    "player_season_stats": ["skater_full_name", "player_id"],
+    "goalies": ["goalie_full_name", "player_id"],
+    "teams": ["team_full_name"],
+    "matches": ["home_team_name", "away_team_name"],
+    "players_form": ["skater_full_name", "player_id", "opponent_team_abbrev"],
+    "goalies_form": ["goalie_full_name", "player_id", "opponent_team_abbrev"],
+    "players_last_games": ["player_id"],
+    "goalies_last_games": ["player_id"],
+    "players_rolling_form": ["player_id"],
+    "goalies_rolling_form": ["player_id"],
+    "players_vs_opponent": ["player_id", "opponent_team_abbrev"],
+}
+
+EMPTY = np.array([], dtype=np.intp)
+
+
+class SeasonPartition:
+    """
+    All rows of one feature group for one season, with a hash index
+    (value -> row positions) per lookup column.
+    """
+
+    def __init__(self, frame, index_columns, ttl) -> None:
+        self.frame = frame.reset_index(drop=True)
+        self.expires_at = time.monotonic() + ttl
+        self.indexes = {
+            col: self.frame.groupby(col, sort=False, dropna=True).indices
+            for col in index_columns
+            if col in self.frame.columns
+        }
+
+    def positions(self, column, value):
+        """Row positions where column == value, or any of the values if a list is given."""
+        index = self.indexes.get(column)
+        if index is None:
+            # Not an indexed column, fall back to a scan
+            mask = self.frame[column].isin(value) if isinstance(value, (list, tuple, set)) else self.frame[column] == value
+            return np.flatnonzero(mask.to_numpy())
+
+        if isinstance(value, (list, tuple, set)):
+            parts = [index.get(v, EMPTY) for v in value]
+            return np.unique(np.concatenate(parts)) if parts else EMPTY
+        return index.get(value, EMPTY)
+
+    def take(self, positions):
+        return self.frame.take(np.sort(positions)).reset_index(drop=True)
+
+
+class FrameStore:
+    """
+    In-process store with the feature groups behind AgentFunctions, loaded one
+    season at a time on first use. Lookups are answered by an index probe plus
+    a slice instead of a remote filter().read().
+    """
+
+    def __init__(self, get_fg, ttls=None, default_ttl=DEFAULT_TTL) -> None:
+        self.get_fg = get_fg
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+
+        self._partitions = {}  # (feature_group, season) -> SeasonPartition
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def partition(self, feature_group, season):
+        """Returns the partition for (feature_group, season), loading it if needed."""
+        key = (feature_group, str(season))
+        partition = self._partitions.get(key)
+        if partition is not None and partition.expires_at > time.monotonic():
+            return partition
+
+        # One lock per partition so two threads don't load the same season twice
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            partition = self._partitions.get(key)
+            if partition is None or partition.expires_at <= time.monotonic():
+                partition = self._load(feature_group, str(season))
+                self._partitions[key] = partition
+        return partition
+
+    def lookup(self, feature_group, season, **equals):
+        """Rows for one season where every given column equals its value."""
+        partition = self.partition(feature_group, season)
+        if not equals:
+            return partition.frame.copy()
+
+        positions = None
+        for column, value in equals.items():
+            found = partition.positions(column, value)
+            positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+        return partition.take(positions)
+
+    def team_games(self, season, *teams):
+        """Matches in a season where every given team played, either at home or away."""
+        partition = self.partition("matches", season)
+        positions = None
+        for team in teams:
+            found = np.union1d(
+                partition.positions("home_team_name", team),
+                partition.positions("away_team_name", team),
+            )
+            positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+        return partition.take(positions)
+
+    def invalidate(self, feature_group=None):
+        """Drops the loaded seasons of feature_group, or everything if None."""
+        with self._lock:
+            if feature_group is None:
+                self._partitions.clear()
+                return
+            for key in [k for k in self._partitions if k[0] == feature_group]:
+                del self._partitions[key]
+
+    def loaded(self):
+        """(feature_group, season, rows) for every loaded partition."""
+        return [(fg, season, len(p.frame)) for (fg, season), p in self._partitions.items()]
+
+    def _load(self, feature_group, season):
+        fg = self.get_fg(feature_group)
+        season_column = SEASON_COLUMNS[feature_group]
+        frame = tracing.read(fg.filter(getattr(fg, season_column) == season), feature_group)
+        log.info("Loaded %s %s into the frame store (%d rows)", feature_group, season, len(frame))
+
+        return SeasonPartition(
+            frame,
+            INDEX_COLUMNS.get(feature_group, []),
+            self.ttls.get(feature_group, self.default_ttl),
+        )
@@ -0,0 +1,88 @@
+"""
+Team-vs-team matrix over the matches feature group. Every ordered pair
+(season, team, opponent) keeps its list of games and its record, so head-to-head
+and rivalry questions are lookups instead of filtered reads.
+"""
+import threading
+
+import pandas as pd
+
+from teamForm import team_games
+
+
+def empty_record() -> dict:
+    return {"games": [], "W": 0, "L": 0, "OTL": 0, "goals_for": 0, "goals_against": 0}
+
+
+class HeadToHead:
+    """
+    (season, team, opponent) -> record with the games (oldest first), W-L-OTL and goals,
+    from team's point of view; both orders of a pair are stored.
+
+    Seasons are added with add_games() as they are needed, and games that arrive later
+    are added the same way, games already in the matrix are skipped by id.
+    """
+
+    def __init__(self) -> None:
+        self.pairs = {}
+        self.seasons = set()     # Seasons that have been fully added
+        self.complete = False    # Every season has been added
+        self.latest_date = None  # Date of the latest game, refreshes read from here
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def add_games(self, matches: pd.DataFrame, today=None) -> int:
+        """Adds the played games in matches that are not in the matrix yet, returns how many."""
+        games = team_games(matches, today)
+        games = games[~games["game_id"].isin(self._seen)].sort_values(["game_date", "game_id"])
+
+        with self._lock:
+            for row in games.itertuples(index=False):
+                game_date = row.game_date.date()
+                if row.home:
+                    home, away, home_score, visiting_score = row.team, row.opponent, row.goals_for, row.goals_against
+                else:
+                    home, away, home_score, visiting_score = row.opponent, row.team, row.goals_against, row.goals_for
+
+                record = self.pairs.setdefault((str(row.season), row.team, row.opponent), empty_record())
+                record["games"].append((game_date, row.season, home, int(home_score), int(visiting_score), away))
+                record[row.result] += 1
+                record["goals_for"] += int(row.goals_for)
+                record["goals_against"] += int(row.goals_against)
+
+                if self.latest_date is None or game_date > self.latest_date:
+                    self.latest_date = game_date
+
+            self._seen.update(games["game_id"].tolist())
+        return games["game_id"].nunique()
+
+    def record(self, season: str, team: str, opponent: str) -> dict:
+        return self.pairs.get((str(season), team, opponent), empty_record())
+
+    def games(self, season: str, team: str, opponent: str) -> pd.DataFrame:
+        """The games between two teams in a season, oldest first."""
+        return pd.DataFrame(
+            self.record(season, team, opponent)["games"],
+            columns=["game_date", "season", "home_team_name", "home_score", "visiting_score", "away_team_name"],
+        )
+
+    def rivalry(self, teams, opponents) -> pd.DataFrame:
+        """
+        Season by season record of teams against opponents. Both are lists of names so
+        a relocated franchise counts under all its names ("Phoenix Coyotes", "Arizona Coyotes").
+        """
+        teams, opponents = set(teams), set(opponents)
+        rows = {}
+        with self._lock:
+            for (season, team, opponent), record in self.pairs.items():
+                if team not in teams or opponent not in opponents:
+                    continue
+                row = rows.setdefault(season, {"season": season, **{k: 0 for k in ("W", "L", "OTL", "goals_for", "goals_against")}})
+                for key in ("W", "L", "OTL", "goals_for", "goals_against"):
+                    row[key] += record[key]
+
+        table = pd.DataFrame(list(rows.values()), columns=["season", "W", "L", "OTL", "goals_for", "goals_against"])
+        table = table.sort_values("season", ignore_index=True)
+        table.insert(1, "games", table[["W", "L", "OTL"]].sum(axis=1))
+        table["goal_diff"] = table["goals_for"] - table["goals_against"]
+        return table
@@ -0,0 +1,200 @@
+"""
+Conversation history for the routing prompt, within a token budget.
+
+The assistant turns in the chat are full markdown tables. Here every table is
+replaced by a digest (entity, season and a few key stats per row), the
+explanation is cut to its first words, older turns that have nothing to do with
+the current question are left out and what is left is cut to the budget, newest
+turns first. The digests are cached per session, so a turn is only parsed once.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from routeCache import CONTEXT_WORDS, normalize_question
+from tracing import estimate_tokens
+
+
+# Columns shown in a table digest, in this order, the first MAX_STATS found
+KEY_STATS = [
+    "points", "goals", "assists", "games played", "points per game", "save pct",
+    "goals against average", "wins", "losses", "ot losses", "shutouts", "goals for",
+    "goals against", "win pct", "plus minus", "result", "score",
+]
+MAX_STATS = 4
+MAX_ROWS = 5
+PROSE_WORDS = 40
+
+# Words that say nothing about which players or teams a question is about
+GENERIC_WORDS = {
+    "the", "and", "for", "with", "who", "what", "which", "how", "was", "were", "has", "have", "had",
+    "did", "does", "are", "is", "in", "of", "on", "to", "by", "a", "an", "best", "most", "more",
+    "less", "top", "season", "seasons", "game", "games", "last", "this", "player", "players",
+    "team", "teams", "goalie", "goalies", "forwards", "forward", "defensemen", "defenseman",
+    "points", "goals", "assists", "wins", "save", "percentage", "stats", "show", "me", "give",
+    "compare", "against", "versus", "vs", "from", "between", "all", "time", "career", "nhl",
+    "played", "playing", "lately", "recent", "form", "better", "worse", "than", "many", "much",
+}
+
+
+@dataclass
+class CompactTurn:
+    text: str
+    tokens: int
+    words: set = field(default_factory=set)
+
+
+def significant_words(text: str) -> set:
+    """Lowercase words of text that can name a player or team ("mcdavid", "oilers", "edm")."""
+    return {
+        word for word in normalize_question(text).split()
+        if len(word) > 1 and not word.isdigit() and word not in GENERIC_WORDS and word not in CONTEXT_WORDS
+    }
+
+
+def turns(history) -> list[tuple[str, str]]:
+    """(user, assistant) pairs from Gradio history in the tuple or the messages format."""
+    if not history:
+        return []
+    if isinstance(history[0], (list, tuple)):
+        return [(str(user or ""), str(assistant or "")) for user, assistant in history]
+
+    pairs = []
+    for message in history:
+        if not isinstance(message, dict):
+            continue
+        content = message.get("content", "")
+        content = content if isinstance(content, str) else str(content)
+        if message.get("role") == "user" or not pairs:
+            pairs.append((content, "") if message.get("role") == "user" else ("", content))
+        else:
+            # An answer can be split over several assistant messages
+            pairs[-1] = (pairs[-1][0], "\n".join(filter(None, (pairs[-1][1], content))))
+    return pairs
+
+
+def _cells(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _column_key(header: str) -> str:
+    """"Time On Ice Per Game (sec)" -> "time on ice per game"."""
+    return " ".join(re.sub(r"\(.*?\)", " ", header).lower().replace("_", " ").split())
+
+
+def table_digest(lines: list[str]) -> str:
+    """One line for a markdown table: "12 rows: Connor McDavid 20252026 points 132, goals 52; ..."."""
+    header = _cells(lines[0])
+    rows = [_cells(line) for line in lines[2:] if line.strip()]
+    rows = [row for row in rows if len(row) == len(header)]
+    if not rows:
+        return ""
+
+    keys = [_column_key(column) for column in header]
+    entity = next((i for i, key in enumerate(keys) if "name" in key), None)
+    if entity is None:
+        entity = next((i for i, key in enumerate(keys) if key in ("player", "team", "opponent")), 0)
+    season = next((i for i, key in enumerate(keys) if key in ("season", "season id")), None)
+    stats = [keys.index(stat) for stat in KEY_STATS if stat in keys][:MAX_STATS]
+    if not stats:
+        stats = [i for i in range(len(header)) if i not in (entity, season)][:MAX_STATS]
+
+    shown = rows[:MAX_ROWS]
+    # A total row at the end is the summary of the table, keep it
+    if len(rows) > MAX_ROWS and rows[-1][0].lower() == "total":
+        shown = shown[:MAX_ROWS - 1] + [rows[-1]]
+
+    parts = []
+    for row in shown:
+        label = row[entity] + (f" {row[season]}" if season is not None and season != entity else "")
+        parts.append(label + " " + ", ".join(f"{keys[i]} {row[i]}" for i in stats))
+    more = f" (+{len(rows) - len(shown)} more)" if len(rows) > len(shown) else ""
+    return f"{len(rows)} rows: " + "; ".join(parts) + more
+
+
+def digest(answer: str) -> str:
+    """The assistant turn with its tables as digests and the explanation cut to PROSE_WORDS words."""
+    tables, prose, block = [], [], []
+    for line in answer.splitlines() + [""]:
+        if line.lstrip().startswith("|"):
+            block.append(line)
+            continue
+        if len(block) >= 2:
+            tables.append(table_digest(block))
+        block = []
+        if line.strip():
+            prose.append(line.strip().strip("*"))
+
+    words = " ".join(prose).split()
+    text = " ".join(words[:PROSE_WORDS]) + (" ..." if len(words) > PROSE_WORDS else "")
+    return "\n".join([f"[table {table}]" for table in tables if table] + ([text] if text else []))
+
+
+def compact_turn(user: str, assistant: str) -> CompactTurn:
+    summary = digest(assistant)
+    text = f"User: {user}" + (f"\nAssistant: {summary}" if summary else "")
+    return CompactTurn(text, estimate_tokens(text), significant_words(user + " " + summary))
+
+
+class HistoryCompactor:
+    """
+    Builds the history text for decide_tool within token_budget tokens. The compacted
+    turns of each session (up to max_sessions, least recently used dropped) are
+    cached, only the turns added since the last question are compacted.
+    """
+
+    def __init__(self, token_budget: int, max_turns: int = 6, max_sessions: int = 1000) -> None:
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session -> {fingerprint: CompactTurn}
+        self._lock = threading.Lock()
+
+    def compacted(self, history, session=None) -> list[CompactTurn]:
+        """The latest max_turns turns of history compacted, reusing what is cached for the session."""
+        pairs = turns(history)[-self.max_turns:]
+        if not pairs:
+            return []
+        # Without a session id the first question identifies the conversation
+        session = session or f"first:{hash(turns(history)[0][0])}"
+
+        with self._lock:
+            cached = self._sessions.get(session, {})
+        result = {}
+        for user, assistant in pairs:
+            fingerprint = (len(user), len(assistant), hash(user), hash(assistant))
+            result[fingerprint] = cached.get(fingerprint) or compact_turn(user, assistant)
+
+        with self._lock:
+            self._sessions[session] = result
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return list(result.values())
+
+    def compact(self, question: str, history, session=None) -> str:
+        """
+        The relevant turns of history as text, at most token_budget tokens. The
+        latest turn is always kept, an elliptic follow-up ("What about Ovechkin?")
+        names someone new and takes the stat and season from it. Older turns are
+        kept if they name a player or team the question names.
+        """
+        compacted = self.compacted(history, session)
+        if not compacted:
+            return ""
+
+        question_words = significant_words(question)
+
+        selected, used = [], 0
+        for age, turn in enumerate(reversed(compacted)):
+            if age > 0 and not question_words & turn.words:
+                continue
+            if used + turn.tokens > self.token_budget:
+                if not selected:
+                    # The latest relevant turn alone is over the budget, cut it
+                    selected.append(turn.text[:self.token_budget * 4])
+                break
+            selected.append(turn.text)
+            used += turn.tokens
+        return "\n".join(reversed(selected))
@@ -0,0 +1,141 @@
+"""
+Per-season leaderboards for top_players, top_goalies and top_teams. A board is the
+BOARD_SIZE best rows of one (group, metric), found with a partial selection
+(np.argpartition) instead of sorting the whole season, and is built the first
+time it is asked for, so adding metrics costs nothing until they are used.
+When the season gets new data only the rows that changed are merged into the
+boards that already exist.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Rows kept per board, larger n are selected from the whole season
+BOARD_SIZE = 50
+
+# Position groups for skaters, any other position is matched as it is
+POSITION_GROUPS = {"F": ("C", "L", "R")}
+
+# Metrics where lower is better
+ASCENDING_METRICS = {"goals_against_average"}
+
+EMPTY = np.array([], dtype=np.intp)
+
+
+def top_positions(score: np.ndarray, candidates: np.ndarray, n: int) -> np.ndarray:
+    """The n candidates with the lowest score, best first (argpartition + a sort of n)."""
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(score[candidates], n - 1)[:n]]
+    return candidates[np.argsort(score[candidates], kind="stable")]
+
+
+class Leaderboards:
+    """
+    Boards over one season of a feature group, keyed by key_column (player_id or
+    team_full_name). group_column splits the rows into groups (position_code), None
+    is the whole season and "F" is C/L/R as in the top_players tool.
+    """
+
+    def __init__(self, frame: pd.DataFrame, key_column: str, group_column: str | None = None) -> None:
+        self.frame = frame.reset_index(drop=True)
+        self.key_column = key_column
+        self.group_column = group_column
+        self.boards = {}  # (group, metric) -> row positions, best first
+        self._scores = {}
+        self._groups = {}
+
+    def top(self, metric: str, n: int = 10, group: str | None = None) -> pd.DataFrame:
+        """The n best rows for metric (lowest first for GAA), rows without a value are skipped."""
+        if metric not in self.frame.columns:
+            raise KeyError(metric)
+        n = int(n)
+        if n <= BOARD_SIZE:
+            positions = self.board(metric, group)[:n]
+        else:
+            positions = top_positions(self.score(metric), self.eligible(metric, group), n)
+        return self.frame.take(positions)
+
+    def board(self, metric: str, group: str | None = None) -> np.ndarray:
+        key = (group, metric)
+        board = self.boards.get(key)
+        if board is None:
+            board = top_positions(self.score(metric), self.eligible(metric, group), BOARD_SIZE)
+            self.boards[key] = board
+        return board
+
+    def score(self, metric: str) -> np.ndarray:
+        """The metric as floats where lower is better, NaN for rows without a value."""
+        score = self._scores.get(metric)
+        if score is None:
+            values = pd.to_numeric(self.frame[metric], errors="coerce").to_numpy(dtype=float)
+            score = values if metric in ASCENDING_METRICS else -values
+            self._scores[metric] = score
+        return score
+
+    def eligible(self, metric: str, group: str | None = None) -> np.ndarray:
+        """Positions of the rows in group that have a value for metric."""
+        return np.flatnonzero(self.in_group(group) & ~np.isnan(self.score(metric)))
+
+    def in_group(self, group: str | None) -> np.ndarray:
+        mask = self._groups.get(group)
+        if mask is None:
+            if group is None or self.group_column is None:
+                mask = np.ones(len(self.frame), dtype=bool)
+            else:
+                members = POSITION_GROUPS.get(group, (group,))
+                mask = self.frame[self.group_column].isin(members).to_numpy()
+            self._groups[group] = mask
+        return mask
+
+    def refresh(self, frame: pd.DataFrame) -> "Leaderboards":
+        """
+        Leaderboards over the new frame of the same season. Only the rows whose key is
+        new or whose group or board metrics changed are merged into the existing boards,
+        a board is selected again from the whole season only if a row dropped out of it.
+        """
+        new = Leaderboards(frame, self.key_column, self.group_column)
+        if not self.boards:
+            return new
+
+        metrics = sorted({metric for _, metric in self.boards if metric in new.frame.columns})
+        columns = metrics + ([self.group_column] if self.group_column else [])
+        touched = self._touched(new.frame, columns)
+
+        # Old position -> new position through the key
+        new_position = pd.Series(np.arange(len(new.frame)), index=new.frame[self.key_column])
+        new_position = new_position[~new_position.index.duplicated(keep="last")]
+        old_keys = self.frame[self.key_column].to_numpy()
+
+        for (group, metric), board in self.boards.items():
+            if metric not in new.frame.columns:
+                continue
+            kept = new_position.reindex(old_keys[board]).dropna().astype(np.intp).to_numpy()
+            kept = kept[~touched[kept]]
+
+            score = new.score(metric)
+            changed = np.flatnonzero(touched & new.in_group(group) & ~np.isnan(score))
+            candidates = np.union1d(kept, changed)
+            merged = top_positions(score, candidates, BOARD_SIZE)
+
+            # Untouched rows outside the old board are no better than its last row, so the
+            # merge is exact unless the old board was full and the new one ends worse
+            if len(board) == BOARD_SIZE and (
+                len(merged) < BOARD_SIZE or score[merged[-1]] > self.score(metric)[board[-1]]
+            ):
+                merged = top_positions(score, new.eligible(metric, group), BOARD_SIZE)
+            new.boards[(group, metric)] = merged
+        return new
+
+    def _touched(self, frame: pd.DataFrame, columns) -> np.ndarray:
+        """True for the rows in frame that are new or differ from self in any of columns."""
+        old = self.frame.drop_duplicates(self.key_column, keep="last").set_index(self.key_column)
+        old = old.reindex(frame[self.key_column])
+        touched = ~frame[self.key_column].isin(self.frame[self.key_column]).to_numpy()
+        for column in columns:
+            if column not in old.columns:
+                touched |= True
+                continue
+            before, after = old[column].to_numpy(), frame[column].to_numpy()
+            same = (before == after) | (pd.isna(before) & pd.isna(after))
+            touched |= ~same
+        return touched
@@ -0,0 +1,165 @@
+"""
+Local name resolution for skaters and goalies. A misspelled or unaccented name
+("Mcdavid", "Pastrnak", "Mitch Marner") is resolved to the exact name, the
+player_id and the kind (skater/goalie) with one in-memory lookup, instead of
+exact remote queries that come back empty.
+"""
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from unidecode import unidecode
+
+
+# Short forms of first names -> the form used in the NHL data
+NICKNAMES = {
+    "alex": "alexander", "sasha": "alexander", "alexandr": "alexander",
+    "mike": "michael", "mikey": "michael",
+    "mitch": "mitchell",
+    "matt": "matthew", "matty": "matthew",
+    "nick": "nicholas", "nic": "nicholas", "nicolas": "nicholas",
+    "jake": "jacob", "jakob": "jacob",
+    "zach": "zachary", "zack": "zachary",
+    "chris": "christopher",
+    "tony": "anthony",
+    "johnny": "john", "jonathan": "john",
+    "josh": "joshua",
+    "dan": "daniel", "danny": "daniel",
+    "tom": "thomas", "tommy": "thomas",
+    "will": "william", "willy": "william",
+    "sam": "samuel",
+    "ben": "benjamin",
+    "joe": "joseph",
+    "vince": "vincent",
+    "freddie": "frederik", "freddy": "frederik", "frederick": "frederik",
+}
+
+# A fuzzy candidate must be at least this similar to be returned
+MIN_SCORE = 0.8
+
+# Scores of the different ways to match
+EXACT_SCORE = 1.0
+LAST_NAME_SCORE = 0.95
+
+
+@dataclass(frozen=True)
+class NameMatch:
+    name: str           # Name as stored in the feature group
+    player_id: int
+    kind: str           # "skater" or "goalie"
+    score: float
+
+    @property
+    def feature_group(self) -> str:
+        return "player_season_stats" if self.kind == "skater" else "goalies"
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, no accents or punctuation, nicknames replaced by the full first name."""
+    text = unidecode(str(name)).lower()
+    text = re.sub(r"[.'’]", "", text)  # "J.T." -> "jt", "O'Reilly" -> "oreilly"
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    if words:
+        words[0] = NICKNAMES.get(words[0], words[0])
+    return " ".join(words)
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    Index over (name, player_id, kind) entries with three ways in:
+    - exact match on the normalized name
+    - a single word matched against last names ("mcdavid")
+    - trigram candidates ranked by edit distance (difflib ratio) for misspellings
+    resolve() returns all the best matches, so two players with the same name
+    (the two Sebastian Aho) both come back.
+    """
+
+    def __init__(self, entries) -> None:
+        self.entries = []
+        self.by_key = defaultdict(list)
+        self.by_last_name = defaultdict(list)
+        self.by_trigram = defaultdict(set)
+
+        seen = set()
+        for name, player_id, kind in entries:
+            if not isinstance(name, str) or not name or (player_id, kind) in seen:
+                continue
+            seen.add((player_id, kind))
+
+            key = normalize_name(name)
+            position = len(self.entries)
+            self.entries.append((name, int(player_id), kind, key))
+            self.by_key[key].append(position)
+            self.by_last_name[key.split()[-1]].append(position)
+            for gram in trigrams(key):
+                self.by_trigram[gram].add(position)
+
+    @classmethod
+    def from_frames(cls, skaters, goalies):
+        """Builds the index from player_season_stats and goalies rows."""
+        entries = []
+        if skaters is not None and not skaters.empty:
+            entries += [(name, pid, "skater") for name, pid in zip(skaters["skater_full_name"], skaters["player_id"])]
+        if goalies is not None and not goalies.empty:
+            entries += [(name, pid, "goalie") for name, pid in zip(goalies["goalie_full_name"], goalies["player_id"])]
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def resolve(self, name: str, kind: str | None = None) -> list[NameMatch]:
+        """
+        The best matches for name, optionally only of one kind. Empty if nothing
+        is similar enough. Every returned match has the same (top) score.
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+
+        allowed = lambda position: kind is None or self.entries[position][2] == kind
+
+        exact = [p for p in self.by_key.get(key, []) if allowed(p)]
+        if exact:
+            return self._matches(exact, EXACT_SCORE)
+
+        if " " not in key:
+            last_name = [p for p in self.by_last_name.get(key, []) if allowed(p)]
+            if last_name:
+                return self._matches(last_name, LAST_NAME_SCORE)
+
+        # Misspellings: the entries sharing the most trigrams, ranked by edit distance
+        query = trigrams(key)
+        shared = Counter()
+        for gram in query:
+            for position in self.by_trigram.get(gram, ()):
+                shared[position] += 1
+
+        best_score, best = 0.0, []
+        for position, count in shared.most_common(50):
+            if not allowed(position) or count < len(query) * 0.3:
+                continue
+            entry_key = self.entries[position][3]
+            if " " not in key:
+                # A single word is compared with the last name ("Shesterkn")
+                entry_key = entry_key.split()[-1]
+            score = SequenceMatcher(None, key, entry_key).ratio()
+            if score > best_score:
+                best_score, best = score, [position]
+            elif score == best_score:
+                best.append(position)
+
+        if best_score < MIN_SCORE:
+            return []
+        return self._matches(best, round(best_score, 3))
+
+    def _matches(self, positions, score):
+        return [
+            NameMatch(name=self.entries[p][0], player_id=self.entries[p][1], kind=self.entries[p][2], score=score)
+            for p in positions
+        ]
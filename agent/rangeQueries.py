@@ -0,0 +1,133 @@
+"""
+Season-range and career queries. A SeasonHistory holds every season of a feature
+group in one frame sorted by season, so a range of seasons is one slice, and the
+per-player (or per-team) numbers are a vectorized group-by over that slice. Rates
+are recomputed from the summed counts (points per game from points and games,
+SV% from saves and shots) instead of averaging the per-season rates.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Counts that are summed over seasons, per kind
+SUM_COLUMNS = {
+    "skater": ["games_played", "goals", "assists", "points", "ev_points", "pp_points", "shots",
+               "plus_minus", "penalty_minutes"],
+    "goalie": ["games_played", "wins", "losses", "ot_losses", "saves", "shots_against", "goals_against",
+               "time_on_ice", "shutouts"],
+    "team": ["games_played", "wins", "losses", "ot_losses", "points", "goals_for", "goals_against"],
+}
+
+# Per-game values that are averaged weighted by games played
+GAME_WEIGHTED_COLUMNS = {
+    "skater": ["time_on_ice_per_game"],
+    "goalie": [],
+    # The teams feature group has no power play opportunities, games played is the closest weight
+    "team": ["power_play_pct", "penalty_kill_pct"],
+}
+
+# Key and name columns per kind
+KEY_COLUMNS = {"skater": "player_id", "goalie": "player_id", "team": "team_full_name"}
+NAME_COLUMNS = {"skater": "skater_full_name", "goalie": "goalie_full_name", "team": "team_full_name"}
+
+
+def to_season_id(value) -> int | None:
+    """20052006 -> 20052006, "2005" or 2005 -> 20052006 (the season starting that year), None/"all" -> None."""
+    if value is None or str(value).strip().lower() in ("", "all", "career", "none"):
+        return None
+    text = str(value).strip().replace("-", "")
+    if len(text) == 4:
+        year = int(text)
+        return year * 10000 + year + 1
+    return int(text)
+
+
+def weighted_rates(totals: pd.DataFrame, kind: str) -> pd.DataFrame:
+    """Rate stats recomputed from summed counts, next to the counts in totals."""
+    games = totals["games_played"].where(totals["games_played"] > 0)
+    if kind == "skater":
+        if "points" in totals.columns:
+            totals["points_per_game"] = (totals["points"] / games).round(2)
+        if {"goals", "shots"}.issubset(totals.columns):
+            totals["shooting_pct"] = (totals["goals"] / totals["shots"].where(totals["shots"] > 0)).round(3)
+    elif kind == "goalie":
+        if {"saves", "shots_against"}.issubset(totals.columns):
+            totals["save_pct"] = (totals["saves"] / totals["shots_against"].where(totals["shots_against"] > 0)).round(3)
+        elif {"goals_against", "shots_against"}.issubset(totals.columns):
+            totals["save_pct"] = (1 - totals["goals_against"] / totals["shots_against"].where(totals["shots_against"] > 0)).round(3)
+        if {"goals_against", "time_on_ice"}.issubset(totals.columns):
+            totals["goals_against_average"] = (
+                totals["goals_against"] * 3600 / totals["time_on_ice"].where(totals["time_on_ice"] > 0)
+            ).round(2)
+    else:
+        if "points" in totals.columns:
+            totals["point_pct"] = (totals["points"] / (2 * games)).round(3)
+    return totals
+
+
+class SeasonHistory:
+    """
+    All seasons of player_season_stats, goalies or teams in one frame sorted by
+    season, with the start row of each season so a range is a slice.
+    """
+
+    def __init__(self, frame: pd.DataFrame, season_column: str, kind: str) -> None:
+        self.kind = kind
+        self.season_column = season_column
+        frame = frame.assign(**{season_column: pd.to_numeric(frame[season_column])})
+        self.frame = frame.sort_values(season_column, kind="stable").reset_index(drop=True)
+        self.seasons = self.frame[season_column].to_numpy()
+
+    def between(self, start=None, end=None) -> pd.DataFrame:
+        """Rows of the seasons start..end (both included, None is open)."""
+        start, end = to_season_id(start), to_season_id(end)
+        lo = 0 if start is None else np.searchsorted(self.seasons, start, side="left")
+        hi = len(self.seasons) if end is None else np.searchsorted(self.seasons, end, side="right")
+        return self.frame.iloc[lo:hi]
+
+    def per_season(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        One row per season for the rows of one player or franchise (a player traded
+        mid-season can have more than one), with a Total row last.
+        """
+        by_season = self._aggregate(rows, [self.season_column])
+        total = self._aggregate(rows.assign(**{self.season_column: 0}), [self.season_column])
+        total["seasons"] = len(by_season)
+        table = pd.concat([by_season, total], ignore_index=True)
+        table[self.season_column] = table[self.season_column].astype(int).astype(str).replace("0", "Total")
+        return table
+
+    def leaders(self, start=None, end=None, group_mask=None, min_games: int = 0) -> pd.DataFrame:
+        """One row per player or team with the totals and rates over the seasons start..end."""
+        rows = self.between(start, end)
+        if group_mask is not None:
+            rows = rows[group_mask(rows)]
+        totals = self._aggregate(rows, [KEY_COLUMNS[self.kind]])
+        if min_games:
+            totals = totals[totals["games_played"] >= int(min_games)]
+        return totals.reset_index(drop=True)
+
+    def _aggregate(self, rows: pd.DataFrame, keys) -> pd.DataFrame:
+        sums = [col for col in SUM_COLUMNS[self.kind] if col in rows.columns]
+        weighted = [col for col in GAME_WEIGHTED_COLUMNS[self.kind] if col in rows.columns]
+        games = rows["games_played"].fillna(0)
+
+        frame = rows[keys + sums].copy()
+        for col in weighted:
+            frame[col] = rows[col].fillna(0) * games
+            frame[col + "_games"] = games.where(rows[col].notna(), 0)
+        grouped = frame.groupby(keys, sort=True)
+
+        totals = grouped[sums + weighted + [col + "_games" for col in weighted]].sum()
+        for col in weighted:
+            totals[col] = (totals[col] / totals.pop(col + "_games").where(lambda g: g > 0)).round(3)
+        totals.insert(0, "seasons", rows.groupby(keys, sort=True)[self.season_column].nunique())
+
+        name_column = NAME_COLUMNS[self.kind]
+        last = rows.groupby(keys, sort=True).last()
+        if name_column not in keys:
+            totals.insert(0, name_column, last[name_column])
+        for col in ("position_code", "team_abbrevs"):
+            if col in last.columns:
+                totals.insert(1, col, last[col])
+        return weighted_rates(totals, self.kind).reset_index()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from unidecode import unidecode
+
+log = logging.getLogger(__name__)
+
+
+# Words that make a question depend on the conversation, e.g. "compare him with Crosby"
+CONTEXT_WORDS = {
+    "he", "him", "his", "she", "her", "they", "them", "their", "it", "its",
+    "that", "those", "these", "this", "same", "also", "too", "again", "previous",
+    "earlier", "above", "compare", "instead", "other", "else",
+}
+
+# Follow-ups that only name someone new and take the rest from the latest turn, e.g. "What about Ovechkin?"
+ELLIPTIC_PREFIXES = ("what about ", "how about ", "and ")
+SHORT_QUESTION_WORDS = 4
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, no accents, no punctuation and single spaces, so near-exact repeats share a key."""
+    text = unidecode(question).lower()
+    text = re.sub(r"[^\w/\s-]", " ", text)
+    return " ".join(text.split())
+
+
+def relevant_history(question: str, history_text: str) -> str:
+    """
+    The part of the history the decision depends on. Self-contained questions
+    ("Top 10 defensemen by points") get the same decision whatever was said before.
+    A question that refers back to it depends on the whole history, a short or
+    elliptic follow-up ("What about Ovechkin?") on the latest turn.
+    """
+    if not history_text:
+        return ""
+    normalized = normalize_question(question)
+    words = normalized.split()
+    if set(words) & CONTEXT_WORDS:
+        return history_text
+    if len(words) <= SHORT_QUESTION_WORDS or normalized.startswith(ELLIPTIC_PREFIXES):
+        return latest_turn(history_text)
+    return ""
+
+
+def latest_turn(history_text: str) -> str:
+    """The last "User: ..." turn of a compacted history, with its answer."""
+    return re.split(r"^(?=User: )", history_text, flags=re.MULTILINE)[-1]
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of routing decisions from decide_tool, persisted as JSON so
+    it survives restarts. Keyed on the normalized question, the current season and
+    a hash of the relevant history.
+    """
+
+    def __init__(self, path, max_entries: int) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def key(question: str, season: str, history_text: str = "") -> str:
+        history = relevant_history(question, history_text)
+        history_hash = hashlib.sha256(history.encode("utf-8")).hexdigest() if history else ""
+        raw = f"{normalize_question(question)}|{season}|{history_hash}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, season: str, history_text: str = ""):
+        key = self.key(question, season, history_text)
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, question: str, season: str, history_text: str, plan: dict) -> None:
+        """Stores a decision. Only call this with decisions that parsed and validated."""
+        key = self.key(question, season, history_text)
+        with self._lock:
+            self._entries[key] = plan
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, plan in entries[-self.max_entries:]:
+            self._entries[key] = plan
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning("Could not save the routing cache: %s", e)
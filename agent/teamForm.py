@@ -0,0 +1,186 @@
+"""
+League-wide team form for one season, computed for all teams at once from the
+matches feature group: last-N form, win/loss streaks and home/away splits.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Points per result, an overtime or shootout loss (last period > 3) gives one point
+RESULT_POINTS = {"W": 2, "OTL": 1, "L": 0}
+
+
+def team_games(matches: pd.DataFrame, today=None) -> pd.DataFrame:
+    """
+    One row per team and played game (two per match), oldest first within each team,
+    with goals for/against, home/away, the result and points.
+    """
+    today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.now().normalize()
+    played = matches[matches["home_score"].notna() & matches["visiting_score"].notna()]
+    played = played.assign(game_date=pd.to_datetime(played["game_date"]))
+    played = played[played["game_date"] < today]
+
+    overtime = played["period"].to_numpy() > 3 if "period" in played.columns else np.zeros(len(played), dtype=bool)
+    game_id = played["id"].to_numpy() if "id" in played.columns else np.arange(len(played))
+    season = played["season"].astype(str).to_numpy() if "season" in played.columns else None
+    home_score = played["home_score"].to_numpy()
+    visiting_score = played["visiting_score"].to_numpy()
+
+    games = pd.concat([
+        pd.DataFrame({
+            "season": season,
+            "team": played["home_team_name"].to_numpy(),
+            "opponent": played["away_team_name"].to_numpy(),
+            "game_date": played["game_date"].to_numpy(),
+            "game_id": game_id,
+            "home": True,
+            "goals_for": home_score,
+            "goals_against": visiting_score,
+            "overtime": overtime,
+        }),
+        pd.DataFrame({
+            "season": season,
+            "team": played["away_team_name"].to_numpy(),
+            "opponent": played["home_team_name"].to_numpy(),
+            "game_date": played["game_date"].to_numpy(),
+            "game_id": game_id,
+            "home": False,
+            "goals_for": visiting_score,
+            "goals_against": home_score,
+            "overtime": overtime,
+        }),
+    ], ignore_index=True)
+
+    win = games["goals_for"].to_numpy() > games["goals_against"].to_numpy()
+    games["result"] = np.where(win, "W", np.where(games["overtime"].to_numpy(), "OTL", "L"))
+    games["points"] = games["result"].map(RESULT_POINTS)
+    games = games.sort_values(["team", "game_date", "game_id"], ignore_index=True)
+
+    # 0 for each team's latest game, 1 for the one before, ...
+    games["games_ago"] = games.groupby("team", sort=False).cumcount(ascending=False)
+    return games
+
+
+def runs(games: pd.DataFrame, key: pd.Series) -> pd.DataFrame:
+    """Run-length encoding of key within each team: one row per run with team, value and length."""
+    new_run = (key != key.shift()) | (games["team"] != games["team"].shift())
+    run_id = new_run.cumsum()
+    return pd.DataFrame({"team": games["team"], "value": key, "run": run_id}).groupby("run", sort=False).agg(
+        team=("team", "first"), value=("value", "first"), length=("value", "size"),
+    )
+
+
+def record(frame: pd.DataFrame) -> pd.DataFrame:
+    """GP, W, L, OTL, points and goals per team for the rows in frame."""
+    results = pd.get_dummies(frame["result"]).reindex(columns=list(RESULT_POINTS), fill_value=0).astype(int)
+    grouped = pd.concat([frame[["team", "points", "goals_for", "goals_against"]], results], axis=1).groupby("team")
+    table = grouped.sum()
+    table.insert(0, "games", grouped.size())
+    return table
+
+
+class LeagueForm:
+    """
+    Form of every team in one season. Built once per season from the matches
+    feature group, after that every question is a lookup:
+    - last_n(n): record, points and goals over each team's last n games
+    - streaks: current streak (e.g. "W3", "OTL1") and longest win / winless streaks
+    - splits: home and away records over the whole season
+    """
+
+    def __init__(self, matches: pd.DataFrame, today=None) -> None:
+        self.games = team_games(matches, today)
+        self.streaks = self._streaks()
+        self.splits = self._splits()
+
+    def last_n(self, n: int) -> pd.DataFrame:
+        table = record(self.games[self.games["games_ago"] < n])
+        table["points_per_game"] = (table["points"] / table["games"]).round(2)
+        table["goal_diff"] = table["goals_for"] - table["goals_against"]
+        return table
+
+    def team_form(self, team: str, n: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """(summary, matches) for one team over its last n games, newest match first."""
+        recent = self.games[(self.games["team"] == team) & (self.games["games_ago"] < n)]
+        table = self.last_n(n)
+
+        if team in table.index:
+            row = table.loc[team]
+            games, wins, losses, ot_losses = int(row["games"]), int(row["W"]), int(row["L"]), int(row["OTL"])
+            points, goals_for, goals_against = int(row["points"]), int(row["goals_for"]), int(row["goals_against"])
+        else:
+            games = wins = losses = ot_losses = points = goals_for = goals_against = 0
+
+        summary = pd.DataFrame([{
+            "Team": team,
+            "Games": games,
+            "Wins": wins,
+            "Losses": losses,
+            "OT Losses": ot_losses,
+            "Points": points,
+            "Points Per Game": round(points / games, 2) if games else 0.0,
+            "Goals For": goals_for,
+            "Goals Against": goals_against,
+            "Goal Diff": goals_for - goals_against,
+            "Streak": self.streaks["current_streak"].get(team, ""),
+        }])
+
+        recent = recent.iloc[::-1]
+        matches = pd.DataFrame({
+            "Date": recent["game_date"].dt.date.to_numpy(),
+            "Opponent": recent["opponent"].to_numpy(),
+            "Home/Away": np.where(recent["home"].to_numpy(), "Home", "Away"),
+            "Result": recent["result"].to_numpy(),
+            "Score": (recent["goals_for"].astype(int).astype(str) + "-" + recent["goals_against"].astype(int).astype(str)).to_numpy(),
+        })
+        return summary, matches
+
+    def table(self, n: int) -> pd.DataFrame:
+        """All teams ranked by points over their last n games, with streaks and home/away records."""
+        table = self.last_n(n).join(self.streaks).join(self.splits)
+        table = table.sort_values(["points", "goal_diff", "goals_for"], ascending=False).reset_index()
+        return table.rename(columns={
+            "team": "Team",
+            "games": "Games",
+            "W": "Wins",
+            "L": "Losses",
+            "OTL": "OT Losses",
+            "points": "Points",
+            "points_per_game": "Points Per Game",
+            "goals_for": "Goals For",
+            "goals_against": "Goals Against",
+            "goal_diff": "Goal Diff",
+            "current_streak": "Streak",
+            "longest_win_streak": "Longest Win Streak",
+            "longest_winless_streak": "Longest Winless Streak",
+            "home_record": "Home (W-L-OTL)",
+            "away_record": "Away (W-L-OTL)",
+        })[[
+            "Team", "Games", "Wins", "Losses", "OT Losses", "Points", "Points Per Game",
+            "Goals For", "Goals Against", "Goal Diff", "Streak",
+            "Longest Win Streak", "Longest Winless Streak", "Home (W-L-OTL)", "Away (W-L-OTL)",
+        ]]
+
+    def _streaks(self) -> pd.DataFrame:
+        if self.games.empty:
+            return pd.DataFrame(columns=["current_streak", "longest_win_streak", "longest_winless_streak"])
+
+        by_result = runs(self.games, self.games["result"])
+        current = by_result.groupby("team").last()
+        current_streak = current["value"] + current["length"].astype(str)
+
+        by_win = runs(self.games, self.games["result"] == "W")
+        longest = by_win.groupby(["team", "value"])["length"].max().unstack(fill_value=0)
+
+        return pd.DataFrame({
+            "current_streak": current_streak,
+            "longest_win_streak": longest.get(True, 0),
+            "longest_winless_streak": longest.get(False, 0),
+        }).fillna(0).astype({"longest_win_streak": int, "longest_winless_streak": int})
+
+    def _splits(self) -> pd.DataFrame:
+        splits = {}
+        for home, label in ((True, "home_record"), (False, "away_record")):
+            table = record(self.games[self.games["home"] == home])
+            splits[label] = table["W"].astype(str) + "-" + table["L"].astype(str) + "-" + table["OTL"].astype(str)
+        return pd.DataFrame(splits)
@@ -0,0 +1,162 @@
+"""
+Resolves whatever the user (or the LLM) calls a team - "Leafs", "TOR", "Toronto",
+"Montreal Canadiens", "Phoenix Coyotes" - to the full name and abbreviation the
+feature groups use for that season, without touching the feature store.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from difflib import get_close_matches
+
+from unidecode import unidecode
+
+log = logging.getLogger(__name__)
+
+
+# Nicknames that are more than one word, the rest of the full name is the city
+TWO_WORD_NICKNAMES = {
+    "maple leafs", "red wings", "blue jackets", "golden knights", "north stars", "hockey club",
+    "golden seals", "california seals",
+}
+
+# Slang and short abbreviations -> triCode
+EXTRA_ALIASES = {
+    "habs": "MTL", "leafs": "TOR", "buds": "TOR", "bolts": "TBL", "pens": "PIT", "caps": "WSH",
+    "canes": "CAR", "sens": "OTT", "nucks": "VAN", "isles": "NYI", "blueshirts": "NYR",
+    "preds": "NSH", "avs": "COL", "hawks": "CHI", "wings": "DET", "knights": "VGK", "jackets": "CBJ",
+    "bs": "BOS", "flames": "CGY", "yotes": "ARI", "sharks": "SJS", "kraken": "SEA",
+    "tb": "TBL", "nj": "NJD", "la": "LAK", "sj": "SJS", "lv": "VGK", "vegas": "VGK",
+}
+
+# A fuzzy alias must be at least this similar to be used
+FUZZY_CUTOFF = 0.85
+
+
+@dataclass(frozen=True)
+class TeamMatch:
+    name: str           # Full name as stored in the feature groups, e.g. "Montréal Canadiens"
+    abbrev: str | None  # triCode, e.g. "MTL"
+    franchise_id: int
+
+
+def normalize_team(text: str) -> str:
+    text = unidecode(str(text)).lower()
+    text = re.sub(r"[.'’]", "", text)  # "St. Louis" -> "st louis", "B's" -> "bs"
+    text = " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+    text = re.sub(r"^the ", "", text)
+    return re.sub(r"^ny ", "new york ", text)
+
+
+def split_city(full_name: str) -> tuple[str, str]:
+    """("toronto", "maple leafs") from "toronto maple leafs"."""
+    words = full_name.split()
+    if len(words) > 2 and " ".join(words[-2:]) in TWO_WORD_NICKNAMES:
+        return " ".join(words[:-2]), " ".join(words[-2:])
+    return " ".join(words[:-1]), words[-1]
+
+
+class TeamResolver:
+    """
+    Alias index built from util.fetch_teams() (id, fullName, franchiseId, triCode).
+
+    Every full name, abbreviation, city, nickname and slang alias maps to the teams
+    (and through them the franchises) it can mean. A franchise keeps all its historical
+    names, so "Phoenix Coyotes" and "ARI" are the same franchise; season_names(season)
+    -> set of team names in the teams feature group picks the name the franchise had
+    that season.
+    """
+
+    def __init__(self, teams_df, season_names=None) -> None:
+        self.season_names = season_names
+        self.aliases = {}      # alias -> set of (franchise id, team id)
+        self.franchises = {}   # franchise id -> [(team id, full name, triCode)], newest team id last
+        self._season_cache = {}
+        self._lock = threading.Lock()
+
+        rows = teams_df.sort_values("id").itertuples(index=False) if len(teams_df) else []
+        for row in rows:
+            franchise_id = getattr(row, "franchiseId", None)
+            if franchise_id is None or franchise_id != franchise_id:  # Teams without a franchise (NaN)
+                franchise_id = -int(row.id)
+            franchise_id = int(franchise_id)
+            abbrev = getattr(row, "triCode", None)
+            self.franchises.setdefault(franchise_id, []).append((int(row.id), row.fullName, abbrev))
+
+            key = normalize_team(row.fullName)
+            city, nickname = split_city(key)
+            for alias in (key, city, nickname, abbrev):
+                if alias:
+                    self.aliases.setdefault(normalize_team(alias), set()).add((franchise_id, int(row.id)))
+
+        for alias, abbrev in EXTRA_ALIASES.items():
+            teams = self.aliases.get(normalize_team(abbrev))
+            if teams:
+                self.aliases.setdefault(alias, set()).update(teams)
+
+    def resolve(self, text: str, season: str | None = None) -> TeamMatch | None:
+        """The team text means in season, or None if it is unknown or ambiguous ("New York")."""
+        key = normalize_team(text)
+        teams = self.aliases.get(key)
+        if teams is None:
+            close = get_close_matches(key, self.aliases.keys(), n=1, cutoff=FUZZY_CUTOFF)
+            if not close:
+                return None
+            teams = self.aliases[close[0]]
+
+        alias_teams = {}  # franchise id -> ids of the teams the alias comes from
+        for franchise_id, team_id in teams:
+            alias_teams.setdefault(franchise_id, set()).add(team_id)
+
+        in_season = self._names_in(season)
+        candidates = {}  # full name -> (team id, TeamMatch)
+        for franchise_id, team_ids in alias_teams.items():
+            names = self.franchises[franchise_id]
+            if in_season:
+                names = [team for team in names if team[1] in in_season]
+                if not names:  # Franchise did not exist that season
+                    continue
+            # The team the alias was written for if it played that season, otherwise
+            # the franchise's (newest) name that season: "Phoenix Coyotes" in 2023 -> Arizona
+            preferred = [team for team in names if team[0] in team_ids]
+            team_id, name, abbrev = (preferred or names)[-1]
+
+            # Two franchises can have had the same name (the old and the new Winnipeg Jets),
+            # the feature groups are keyed on the name so keep the newest team
+            if name not in candidates or candidates[name][0] < team_id:
+                candidates[name] = (team_id, TeamMatch(name=name, abbrev=abbrev, franchise_id=franchise_id))
+
+        if len(candidates) != 1:
+            return None
+        _, (_, match) = candidates.popitem()
+        return match
+
+    def name(self, text: str, season: str | None = None) -> str:
+        """Full name for the teams and matches feature groups, text as it is if it can't be resolved."""
+        match = self.resolve(text, season)
+        return match.name if match else text
+
+    def abbrev(self, text: str, season: str | None = None) -> str:
+        """triCode for opponent_team_abbrev, text as it is if it can't be resolved."""
+        match = self.resolve(text, season)
+        return match.abbrev if match and match.abbrev else text
+
+    def franchise_names(self, franchise_id: int) -> list[str]:
+        """Every name a franchise has played under, oldest team id first."""
+        return list(dict.fromkeys(name for _, name, _ in self.franchises.get(franchise_id, [])))
+
+    def franchise_abbrevs(self, franchise_id: int) -> list[str]:
+        """Every abbreviation a franchise has played under ("PHX", "ARI")."""
+        return list(dict.fromkeys(abbrev for _, _, abbrev in self.franchises.get(franchise_id, []) if abbrev))
+
+    def _names_in(self, season):
+        if season is None or self.season_names is None:
+            return None
+        with self._lock:
+            if season not in self._season_cache:
+                try:
+                    self._season_cache[season] = set(self.season_names(season))
+                except Exception as e:
+                    log.warning("Could not read the teams of %s: %s", season, e)
+                    return None
+            return self._season_cache[season]
@@ -0,0 +1,172 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# How long a cached tool result may live, per feature group. The data only
+# changes once a day, the version marker written by the pipelines is what
+# normally invalidates an entry; the TTL is the safety net if a marker is missed.
+DEFAULT_TTLS = {
+    "player_season_stats": 6 * 3600,
+    "goalies": 6 * 3600,
+    "teams": 6 * 3600,
+    "matches": 3 * 3600,
+    "players_form": 3 * 3600,
+    "goalies_form": 3 * 3600,
+    "players_last_games": 3 * 3600,
+    "goalies_last_games": 3 * 3600,
+    "players_rolling_form": 3 * 3600,
+    "goalies_rolling_form": 3 * 3600,
+    "players_vs_opponent": 3 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def normalize_value(value):
+    """
+    Normalizes a tool parameter so that equivalent calls share a cache key, e.g.
+    season 20232024 and "20232024". Strings are kept as they are since the
+    feature store lookups are exact matches.
+    """
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_value(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_value(v)) for k, v in value.items()))
+    return repr(value)
+
+
+def make_key(tool, params):
+    """Cache key for a tool call: (tool, sorted normalized params)."""
+    return (tool, tuple(sorted((k, normalize_value(v)) for k, v in params.items())))
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a tool result in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+
+def copy_result(value):
+    """Copies DataFrames so callers can't mutate what is stored in the cache."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(copy_result(v) for v in value)
+    if isinstance(value, list):
+        return [copy_result(v) for v in value]
+    return value
+
+
+class ToolCache:
+    """
+    Memory bounded LRU cache for tool results.
+
+    Every entry remembers which feature groups it was computed from, so it can be
+    dropped when one of them gets a new version or when its TTL runs out.
+    """
+
+    def __init__(self, max_bytes, ttls=None, default_ttl=DEFAULT_TTL) -> None:
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict()  # key -> (value, feature_groups, expires_at, size)
+        self._versions = {}
+        self._versions_seen = False
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, feature_groups):
+        return min((self.ttls.get(fg, self.default_ttl) for fg in feature_groups), default=self.default_ttl)
+
+    def get(self, tool, params):
+        """Returns (hit, value). The value is a copy of the stored result."""
+        key = make_key(tool, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            value, _, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return True, copy_result(value)
+
+    def put(self, tool, params, feature_groups, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        key = make_key(tool, params)
+        expires_at = time.monotonic() + self.ttl_for(feature_groups)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (copy_result(value), tuple(feature_groups), expires_at, size)
+            self._bytes += size
+
+            # Evict the least recently used entries until we are under the limit
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, feature_group=None):
+        """Drops every entry built from feature_group, or everything if None."""
+        with self._lock:
+            if feature_group is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            stale = [key for key, entry in self._entries.items() if feature_group in entry[1]]
+            for key in stale:
+                self._remove(key)
+
+    def apply_versions(self, versions):
+        """
+        Takes the latest {feature_group: version} markers written by the pipelines
+        and invalidates the feature groups whose version changed. Returns the
+        feature groups that changed.
+        """
+        changed = []
+        for feature_group, version in versions.items():
+            previous = self._versions.get(feature_group)
+            self._versions[feature_group] = version
+            # A marker that shows up after the first sync is also a new version
+            if previous != version and (previous is not None or self._versions_seen):
+                changed.append(feature_group)
+        self._versions_seen = True
+
+        for feature_group in changed:
+            self.invalidate(feature_group)
+        return changed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
@@ -0,0 +1,232 @@
+"""
+Parameters of the tools the router can choose between, used to validate a
+routing decision before it is executed or cached, and to build the response
+schema the model is held to when it supports structured output.
+"""
+import functools
+
+TOP_PLAYER_METRICS = [
+    "points", "points_per_game", "ev_points", "goals", "assists",
+    "penalty_minutes", "plus_minus", "time_on_ice_per_game",
+]
+TOP_GOALIE_METRICS = ["save_pct", "wins", "goals_against_average", "shots_against"]
+TOP_TEAM_METRICS = ["points", "wins", "goals_for", "goals_against", "power_play_pct", "penalty_kill_pct"]
+POSITIONS = ["F", "D", "C", "L", "R"]
+
+# tool -> {"required": [...], "optional": [...], "choices": {param: allowed values}}
+TOOL_SPECS = {
+    "get_player_overview": {"required": ["player_name", "season"]},
+    "top_players": {
+        "required": ["season", "metric"],
+        "optional": ["position", "n"],
+        "choices": {"metric": TOP_PLAYER_METRICS, "position": POSITIONS + [None]},
+    },
+    "get_team_overview": {"required": ["teamName", "season"]},
+    "get_goalie": {"required": ["goalie_full_name", "season"]},
+    "top_goalies": {
+        "required": ["season"],
+        "optional": ["metric", "n"],
+        "choices": {"metric": TOP_GOALIE_METRICS},
+    },
+    "top_teams": {
+        "required": ["season"],
+        "optional": ["metric", "n"],
+        "choices": {"metric": TOP_TEAM_METRICS},
+    },
+    "get_team_form": {"required": ["team_name", "season"], "optional": ["n"]},
+    "league_form_table": {"required": ["season"], "optional": ["n"]},
+    "get_player_form": {"required": ["player_name", "season"], "optional": ["n"]},
+    "get_goalie_form": {"required": ["player_name", "season"], "optional": ["n"]},
+    "get_game_results": {"required": ["team", "opponent", "season"]},
+    "get_rivalry": {"required": ["team", "opponent"]},
+    "get_player_performance_against_team": {"required": ["player_name", "opponent_team_abbrev", "season"]},
+    "get_player_seasons": {"required": ["player_name"], "optional": ["start_season", "end_season"]},
+    "get_team_seasons": {"required": ["team_name"], "optional": ["start_season", "end_season"]},
+    "top_players_range": {
+        "required": ["start_season"],
+        "optional": ["end_season", "position", "metric", "n", "min_games"],
+        "choices": {"metric": TOP_PLAYER_METRICS, "position": POSITIONS + [None]},
+    },
+    "compare_players": {"required": ["player_names", "season"]},
+    "compare_goalies": {"required": ["goalie_names", "season"]},
+    "compare_teams": {"required": ["team_names", "season"]},
+    "compare_player_form": {"required": ["player_names", "season"], "optional": ["n"]},
+    "top_goalies_range": {
+        "required": ["start_season"],
+        "optional": ["end_season", "metric", "n", "min_games"],
+        "choices": {"metric": TOP_GOALIE_METRICS},
+    },
+}
+
+# Single-entity tools whose sibling calls (same tool, same other parameters) are merged
+# into one batched call: tool -> (name parameter, batched tool, list parameter).
+# get_player_form is not merged, compare_player_form only has the totals and the
+# game-by-game rows would be lost, the router picks it when a comparison is asked for
+BATCHED_TOOLS = {
+    "get_player_overview": ("player_name", "compare_players", "player_names"),
+    "get_goalie": ("goalie_full_name", "compare_goalies", "goalie_names"),
+    "get_team_overview": ("teamName", "compare_teams", "team_names"),
+}
+
+# Decisions that answer without calling a tool
+NO_TOOL_DECISIONS = ("none", "enough")
+
+# Parameter types in the response schema, all other parameters are strings
+PARAM_TYPES = {
+    "n": "INTEGER",
+    "min_games": "INTEGER",
+    "player_names": "ARRAY",
+    "goalie_names": "ARRAY",
+    "team_names": "ARRAY",
+}
+
+
+def validate_tool_call(call: dict) -> list[str]:
+    """Returns a list of problems with a single {"tool": ..., **params} call, empty if it is valid."""
+    tool = call.get("tool")
+    spec = TOOL_SPECS.get(tool)
+    if spec is None:
+        return [f"unknown tool: {tool}"]
+
+    errors = []
+    for param in spec["required"]:
+        if call.get(param) in (None, ""):
+            errors.append(f"{tool}: missing {param}")
+    for param, allowed in spec.get("choices", {}).items():
+        if param in call and call[param] not in allowed:
+            errors.append(f"{tool}: {param} must be one of {allowed}")
+    if "n" in call:
+        try:
+            if int(call["n"]) < 1:
+                errors.append(f"{tool}: n must be positive")
+        except (TypeError, ValueError):
+            errors.append(f"{tool}: n must be an integer")
+    return errors
+
+
+def merge_sibling_calls(tool_calls):
+    """
+    Merges calls to the same single-entity tool with the same other parameters
+    (season, n) into one call of its batched variant, e.g. eight get_player_overview
+    calls for one season become one compare_players call. The merged call takes
+    the place of the first of its siblings, the other calls keep their order.
+    """
+    groups = {}
+    for position, (tool, params) in enumerate(tool_calls):
+        if tool not in BATCHED_TOOLS:
+            continue
+        name_param = BATCHED_TOOLS[tool][0]
+        if params.get(name_param) in (None, ""):
+            continue
+        rest = tuple(sorted((k, str(v)) for k, v in params.items() if k != name_param))
+        groups.setdefault((tool, rest), []).append(position)
+
+    merged = {}
+    skipped = set()
+    for (tool, _), positions in groups.items():
+        if len(positions) < 2:
+            continue
+        name_param, batched_tool, list_param = BATCHED_TOOLS[tool]
+        first = tool_calls[positions[0]][1]
+        params = {k: v for k, v in first.items() if k != name_param}
+        params[list_param] = list(dict.fromkeys(tool_calls[p][1][name_param] for p in positions))
+        merged[positions[0]] = (batched_tool, params)
+        skipped.update(positions[1:])
+
+    return [merged.get(position, call) for position, call in enumerate(tool_calls) if position not in skipped]
+
+
+def validate_plan(plan) -> list[str]:
+    """Returns a list of problems with a routing decision, empty if it is valid."""
+    if not isinstance(plan, dict):
+        return ["decision is not a JSON object"]
+
+    if "tools" in plan:
+        calls = plan["tools"]
+        if not isinstance(calls, list) or not calls:
+            return ["tools must be a non-empty list"]
+        errors = []
+        for call in calls:
+            errors += validate_tool_call(call) if isinstance(call, dict) else ["tool call is not a JSON object"]
+        return errors
+
+    if plan.get("tool") in NO_TOOL_DECISIONS:
+        return [] if plan.get("explanation") else [f"{plan.get('tool')}: missing explanation"]
+
+    return validate_tool_call(plan)
+
+
+def normalize_plan(plan):
+    """
+    The decision in the shape the rest of the agent expects: a structured-output
+    reply fills both "tools" and "tool", only the one in use is kept, and
+    parameters the model left as null are dropped.
+    """
+    if not isinstance(plan, dict):
+        return plan
+    plan = {k: v for k, v in plan.items() if v is not None}
+    if plan.get("tools"):
+        plan.pop("tool", None)
+        plan.pop("explanation", None)
+        if isinstance(plan["tools"], list):
+            plan["tools"] = [
+                {k: v for k, v in call.items() if v is not None} if isinstance(call, dict) else call
+                for call in plan["tools"]
+            ]
+    elif "tool" in plan:
+        plan.pop("tools", None)
+    return plan
+
+
+def _param_schema(param: str) -> dict:
+    kind = PARAM_TYPES.get(param, "STRING")
+    if kind == "ARRAY":
+        return {"type": "ARRAY", "items": {"type": "STRING"}}
+    schema = {"type": kind}
+    # The allowed values of a parameter over all tools, which tool allows which is checked by validate_plan
+    allowed = [
+        value for spec in TOOL_SPECS.values() for value in spec.get("choices", {}).get(param, [])
+        if value is not None
+    ]
+    if allowed:
+        schema.update({"format": "enum", "enum": list(dict.fromkeys(allowed))})
+    if any(None in spec.get("choices", {}).get(param, []) for spec in TOOL_SPECS.values()):
+        schema["nullable"] = True
+    return schema
+
+
+@functools.lru_cache(maxsize=1)
+def plan_schema() -> dict:
+    """
+    Response schema (the OpenAPI subset Gemini takes) for a routing decision,
+    generated from TOOL_SPECS: {"tools": [{"tool": ..., params}]} or
+    {"tool": "none" | "enough", "explanation": ...}.
+    """
+    params = sorted({p for spec in TOOL_SPECS.values() for p in spec["required"] + spec.get("optional", [])})
+    call = {
+        "type": "OBJECT",
+        "properties": {
+            "tool": {"type": "STRING", "format": "enum", "enum": list(TOOL_SPECS)},
+            **{param: _param_schema(param) for param in params},
+        },
+        "required": ["tool"],
+    }
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "tools": {"type": "ARRAY", "items": call},
+            "tool": {"type": "STRING", "format": "enum", "enum": list(NO_TOOL_DECISIONS)},
+            "explanation": {"type": "STRING"},
+        },
+    }
+
+
+def describe_tool(tool: str) -> str:
+    """"top_players(season, metric, [position], [n]) metric: points|goals|..." for a repair prompt."""
+    spec = TOOL_SPECS[tool]
+    params = spec["required"] + [f"[{param}]" for param in spec.get("optional", [])]
+    choices = "; ".join(
+        f"{param}: " + "|".join(str(value) for value in allowed if value is not None)
+        for param, allowed in spec.get("choices", {}).items()
+    )
+    return f"{tool}({', '.join(params)})" + (f" {choices}" if choices else "")
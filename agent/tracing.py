@@ -0,0 +1,281 @@
+"""
+Per-question tracing and metrics for the agent.
+
+A question is one trace: a root span ("turn") with child spans for routing,
+the LLM calls, every tool call, every remote feature store read, the table
+rendering and the explanation. Finished traces are written as one JSON line
+to a size-rotated file (settings.TRACE_FILE_PATH), and every span feeds the
+counters and histograms served in Prometheus text format by metrics_text().
+
+Spans nest through a context variable within a thread. Work handed to a
+thread pool is attached to its parent with bind(), and spans that stay open
+across yields in a generator are created with start()/finish() and passed as
+parent explicitly, a context variable does not survive those.
+"""
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from config import settings
+
+
+log = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """The spans of one question, written to the trace file when the root span finishes."""
+
+    def __init__(self) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.started)
+        return {
+            "trace_id": self.trace_id,
+            "started_at": round(self.started_at, 3),
+            "spans": [span.to_dict(self.started) for span in spans],
+        }
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attributes", "started", "duration", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id, attributes: dict) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = trace.next_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self, trace_started: float) -> dict:
+        return {
+            "name": self.name,
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "start_ms": round((self.started - trace_started) * 1000, 3),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Metrics:
+    """Counters and duration histograms, rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters = {}    # (metric, labels) -> value
+        self.histograms = {}  # span name -> [bucket counts..., sum, count]
+        self.help = {}
+
+    def inc(self, metric: str, value: float = 1.0, help: str = "", **labels) -> None:
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+            self.help.setdefault(metric, help)
+
+    def observe(self, span_name: str, seconds: float) -> None:
+        with self._lock:
+            values = self.histograms.setdefault(span_name, [0] * len(BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def text(self) -> str:
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: list(values) for name, values in self.histograms.items()}
+            help_texts = dict(self.help)
+
+        lines = [
+            "# HELP agent_span_seconds Duration of the agent spans (routing, tools, feature store reads, rendering, LLM calls)",
+            "# TYPE agent_span_seconds histogram",
+        ]
+        for name, values in sorted(histograms.items()):
+            label = f'span="{_escape(name)}"'
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f'agent_span_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'agent_span_seconds_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f"agent_span_seconds_sum{{{label}}} {values[-2]:.6f}")
+            lines.append(f"agent_span_seconds_count{{{label}}} {values[-1]}")
+
+        for metric in sorted({metric for metric, _ in counters}):
+            lines.append(f"# HELP {metric} {help_texts.get(metric, '')}".rstrip())
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    rendered = ",".join(f'{key}="{_escape(str(v))}"' for key, v in labels)
+                    value = int(value) if float(value).is_integer() else value
+                    lines.append(f"{metric}{{{rendered}}} {value}" if rendered else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+# Finished traces, one JSON line each, configured by configure_logging()
+trace_log = logging.getLogger("agent.traces")
+trace_log.propagate = False
+
+
+def configure_logging() -> None:
+    """Leveled logging to stderr and the rotating trace file, both from settings."""
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    if settings.TRACE_FILE_PATH and not trace_log.handlers:
+        try:
+            path = Path(settings.TRACE_FILE_PATH)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                path, maxBytes=settings.TRACE_FILE_MAX_MB * 1024 * 1024,
+                backupCount=settings.TRACE_FILE_BACKUPS, encoding="utf-8",
+            )
+        except OSError as e:
+            log.warning("Could not open the trace file %s: %s", settings.TRACE_FILE_PATH, e)
+            return
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_log.addHandler(handler)
+        trace_log.setLevel(logging.INFO)
+
+
+def start(name: str, parent: Span | None = None, **attributes) -> Span:
+    """
+    Opens a span under parent (or the current span). Without either it is the
+    root of a new trace. Must be closed with finish().
+    """
+    parent = parent or _current.get()
+    if parent is None:
+        return Span(Trace(), name, None, attributes)
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def finish(span: Span, error: BaseException | str | None = None) -> None:
+    """Closes span, records its duration and writes the trace when span is the root."""
+    if span.duration is not None:
+        return
+    span.duration = time.perf_counter() - span.started
+    if error is not None:
+        span.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        metrics.inc("agent_span_errors_total", help="Spans that ended with an error", span=span.name)
+    span.trace.add(span)
+    metrics.observe(span.name, span.duration)
+
+    if span.parent_id is None:
+        metrics.inc("agent_traces_total", help="Finished traces (questions)", root=span.name)
+        if trace_log.handlers:
+            trace_log.info(json.dumps(span.trace.to_dict(), default=str, ensure_ascii=False))
+
+
+@contextmanager
+def span(name: str, parent: Span | None = None, **attributes):
+    """Span around a block, the current span inside it. Exceptions are recorded and re-raised."""
+    current = start(name, parent, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        _current.reset(token)
+        finish(current, e)
+        raise
+    _current.reset(token)
+    finish(current)
+
+
+def annotate(**attributes) -> None:
+    """Adds attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def bind(fn, parent: Span | None = None):
+    """fn running with parent (or the current span) as its parent, for thread pools."""
+    parent = parent or _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+def read(query, feature_group: str):
+    """query.read() as a "store.read" span with the rows and (in-memory) bytes returned."""
+    with span("store.read", feature_group=feature_group) as current:
+        frame = query.read()
+        rows = len(frame)
+        size = int(frame.memory_usage(index=False).sum()) if hasattr(frame, "memory_usage") else 0
+        current.set(rows=rows, bytes=size)
+    metrics.inc("agent_store_reads_total", help="Feature store reads", feature_group=feature_group)
+    metrics.inc("agent_store_rows_total", rows, help="Rows returned by feature store reads", feature_group=feature_group)
+    metrics.inc("agent_store_bytes_total", size, help="Bytes (in memory) returned by feature store reads",
+                feature_group=feature_group)
+    return frame
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) when the model does not report usage."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def record_tokens(current: Span, call: str, prompt: str, response_text: str, usage=None) -> None:
+    """
+    Prompt and response token counts of an LLM call on current and in the
+    token counters. usage is the response's usage_metadata when the model has it.
+    """
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    estimated = prompt_tokens is None or response_tokens is None
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt)
+    if response_tokens is None:
+        response_tokens = estimate_tokens(response_text)
+
+    current.set(prompt_tokens=prompt_tokens, response_tokens=response_tokens, tokens_estimated=estimated)
+    metrics.inc("agent_llm_tokens_total", prompt_tokens, help="LLM tokens", call=call, direction="prompt")
+    metrics.inc("agent_llm_tokens_total", response_tokens, help="LLM tokens", call=call, direction="response")
+
+
+def metrics_text() -> str:
+    return metrics.text()
@@ -0,0 +1,70 @@
+"""
+Deterministic stand-in for the Gemini model used by agentApp: routing prompts are
+answered from a script (question -> plan), explanation prompts with a fixed text,
+with a configurable latency per call and per streamed chunk. install() puts it
+in place of google.generativeai in agentApp, nothing is imported from Google.
+"""
+import json
+import re
+import time
+from types import SimpleNamespace
+
+
+UNSCRIPTED = "Not in the benchmark script."
+
+EXPLANATION = (
+    "The table above answers the question. The leader stands out clearly, the rest of the rows "
+    "are close to each other and the differences are within a few points over the period."
+)
+
+
+class FakeResponse:
+    def __init__(self, text, chunks=None, chunk_latency=0.0):
+        self.text = text
+        self._chunks = chunks
+        self._chunk_latency = chunk_latency
+
+    def __iter__(self):
+        for chunk in self._chunks or [self.text]:
+            if self._chunk_latency:
+                time.sleep(self._chunk_latency)
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeModel:
+    """
+    generate_content() like google.generativeai.GenerativeModel:
+    - a routing prompt (decide_tool) returns the scripted plan for its question as JSON,
+      {"tool": "none", ...} for questions that are not in the script
+    - any other prompt returns EXPLANATION, in chunks of chunk_words words if stream=True
+    """
+
+    def __init__(self, plans: dict, latency: float = 0.0, chunk_latency: float = 0.0, chunk_words: int = 6) -> None:
+        self.plans = plans
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.chunk_words = chunk_words
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "Decide which tool(s) to use" in prompt:
+            match = re.search(r'User question:\s*"(.*?)"\s*\n', prompt, re.S)
+            question = match.group(1) if match else ""
+            plan = self.plans.get(question, {"tool": "none", "explanation": UNSCRIPTED})
+            return FakeResponse(json.dumps(plan))
+
+        if not stream:
+            return FakeResponse(EXPLANATION)
+        words = EXPLANATION.split(" ")
+        chunks = [" ".join(words[i:i + self.chunk_words]) + " " for i in range(0, len(words), self.chunk_words)]
+        return FakeResponse(EXPLANATION, chunks, self.chunk_latency)
+
+
+def install(agent_app, model: FakeModel) -> None:
+    """Makes agentApp use model instead of importing and configuring google.generativeai."""
+    agent_app._genai = SimpleNamespace(types=SimpleNamespace(GenerationConfig=lambda **kwargs: kwargs))
+    agent_app._model = model
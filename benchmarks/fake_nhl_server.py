@@ -0,0 +1,141 @@
+"""
+Stub of the NHL stats REST API (api.nhle.com/stats/rest/en) serving a synthetic
+league from benchmarks/synthetic.py, for util.py to fetch from through the real
+http_client. Point NHL_STATS_BASE_URL at StubNHLServer.base_url before config
+is imported. Supports the endpoints and cayenneExp filters util.py uses, the
+10 000 row cap and start/limit paging, with a fixed latency per request.
+"""
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+import synthetic
+
+
+ROW_CAP = 10000
+
+
+def to_camel(name: str) -> str:
+    """"skater_full_name" -> "skaterFullName", the inverse of util.to_snake."""
+    head, *rest = name.split("_")
+    return head + "".join(word.capitalize() for word in rest)
+
+
+def camel_records(frame: pd.DataFrame) -> list:
+    frame = frame.rename(columns={column: to_camel(column) for column in frame.columns})
+    return json.loads(frame.to_json(orient="records"))
+
+
+def parse_cayenne(expression: str) -> dict:
+    """{"season": "20232024", "gameDate>=": "2023-10-01", ...} from a cayenneExp."""
+    filters = {}
+    for field, op, value in re.findall(r"(\w+)\s*(>=|<=|=)\s*'?([\w\-]+)'?", expression):
+        filters[field + (op if op != "=" else "")] = value
+    return filters
+
+
+class StubNHLServer:
+    """Threaded HTTP server on 127.0.0.1 with the synthetic league, started with start()."""
+
+    def __init__(self, tables: dict, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        forms = {"skater": tables["players_form"], "goalie": tables["goalies_form"]}
+        self.game_logs = {kind: form.assign(season_id=form["season_id"].astype(str)) for kind, form in forms.items()}
+        self.summaries = {
+            "skater": tables["player_season_stats"].assign(season_id=lambda df: df["season_id"].astype(str)),
+            "goalie": tables["goalies"].assign(season_id=lambda df: df["season_id"].astype(str)),
+            "team": tables["teams"].assign(season_id=lambda df: df["season_id"].astype(str)),
+        }
+        self.games = tables["matches"].assign(season=lambda df: df["season"].astype(str)).rename(columns={
+            "home_score": "homeScore", "visiting_score": "visitingScore", "game_state_id": "gameStateId",
+        })
+        self.teams = json.loads(synthetic.teams_frame().to_json(orient="records"))
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "StubNHLServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-nhl", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, request) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+
+        url = urlparse(request.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            payload = self.payload(url.path.rstrip("/"), params)
+            status = 200 if payload is not None else 404
+        except Exception as e:
+            payload, status = {"error": str(e)}, 500
+
+        body = json.dumps(payload or {"error": "not found"}).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def payload(self, path: str, params: dict):
+        filters = parse_cayenne(params.get("cayenneExp", ""))
+        season = filters.get("seasonId") or filters.get("season")
+
+        if path.endswith("/team"):
+            return {"data": self.teams, "total": len(self.teams)}
+        if path.endswith("/game"):
+            games = self.games[self.games["season"] == season] if season else self.games
+            return self.page(games, params)
+        if path.endswith("/team/summary"):
+            return self.page(self.summaries["team"][self.summaries["team"]["season_id"] == season], params)
+
+        for kind in ("skater", "goalie"):
+            if path.endswith(f"/{kind}/summary"):
+                if params.get("isGame") == "true":
+                    rows = self.game_logs[kind]
+                    rows = rows[rows["season_id"] == season]
+                    if "gameDate>=" in filters:
+                        rows = rows[rows["game_date"] >= filters["gameDate>="]]
+                    if "gameDate<=" in filters:
+                        rows = rows[rows["game_date"] <= filters["gameDate<="]]
+                    return self.page(rows, params)
+                summary = self.summaries[kind]
+                return self.page(summary[summary["season_id"] == season], params)
+        return None
+
+    @staticmethod
+    def page(rows: pd.DataFrame, params: dict) -> dict:
+        """At most ROW_CAP rows from start, like the real API, with the total row count."""
+        start = int(params.get("start", 0) or 0)
+        limit = int(params.get("limit", -1) or -1)
+        limit = ROW_CAP if limit < 0 else min(limit, ROW_CAP)
+        return {"data": camel_records(rows.iloc[start:start + limit]), "total": len(rows)}
@@ -0,0 +1,160 @@
+"""
+In-process stand-in for the parts of the Hopsworks feature store API the agent
+and the pipelines use: get_feature_group, get_or_create_feature_group, filter
+expressions (==, <, >=, isin, &, |), select, read and insert (upsert on the
+primary key). Every read sleeps read_latency seconds like a remote round trip
+and is counted, so a benchmark can report how many reads a tool makes.
+"""
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+
+class Filter:
+    def __init__(self, mask):
+        self.mask = mask  # DataFrame -> boolean Series
+
+    def __and__(self, other):
+        return Filter(lambda df: self.mask(df) & other.mask(df))
+
+    def __or__(self, other):
+        return Filter(lambda df: self.mask(df) | other.mask(df))
+
+
+def coerce(column: pd.Series, value):
+    """value as the column's type, like the feature store does with "20232024" against a bigint."""
+    if pd.api.types.is_numeric_dtype(column) and isinstance(value, str):
+        try:
+            return float(value) if "." in value else int(value)
+        except ValueError:
+            return value
+    if not pd.api.types.is_numeric_dtype(column) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+class Feature:
+    def __init__(self, name):
+        self.name = name
+
+    def _compare(self, value, op):
+        return Filter(lambda df: op(df[self.name], coerce(df[self.name], value)))
+
+    def __eq__(self, value):
+        return self._compare(value, lambda column, v: column == v)
+
+    def __ne__(self, value):
+        return self._compare(value, lambda column, v: column != v)
+
+    def __lt__(self, value):
+        return self._compare(value, lambda column, v: column < v)
+
+    def __le__(self, value):
+        return self._compare(value, lambda column, v: column <= v)
+
+    def __gt__(self, value):
+        return self._compare(value, lambda column, v: column > v)
+
+    def __ge__(self, value):
+        return self._compare(value, lambda column, v: column >= v)
+
+    def isin(self, values):
+        return Filter(lambda df: df[self.name].isin([coerce(df[self.name], v) for v in values]))
+
+    __hash__ = object.__hash__
+
+
+class Query:
+    def __init__(self, group, condition=None, columns=None):
+        self.group, self.condition, self.columns = group, condition, columns
+
+    def filter(self, condition):
+        return Query(self.group, condition if self.condition is None else self.condition & condition, self.columns)
+
+    def read(self, *args, **kwargs):
+        return self.group.store.read(self.group, self.condition, self.columns)
+
+
+class FakeFeatureGroup:
+    def __init__(self, store, name, frame, primary_key=None):
+        self.store = store
+        self.name = name
+        self.frame = frame
+        self.primary_key = list(primary_key or [])
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return Feature(item)
+
+    def filter(self, condition):
+        return Query(self).filter(condition)
+
+    def select(self, columns):
+        return Query(self, columns=list(columns))
+
+    def select_all(self):
+        return Query(self)
+
+    def read(self, *args, **kwargs):
+        return Query(self).read()
+
+    def insert(self, df, *args, **kwargs):
+        with self.store.lock:
+            frame = pd.concat([self.frame, df], ignore_index=True) if len(self.frame) else df.reset_index(drop=True)
+            if self.primary_key and set(self.primary_key).issubset(frame.columns):
+                frame = frame.drop_duplicates(subset=self.primary_key, keep="last", ignore_index=True)
+            self.frame = frame
+            self.store.writes[self.name] += 1
+
+
+class FakeFeatureStore:
+    def __init__(self, frames: dict, primary_keys: dict | None = None, read_latency: float = 0.0) -> None:
+        self.read_latency = read_latency
+        self.reads = Counter()
+        self.rows_read = Counter()
+        self.writes = Counter()
+        self.lock = threading.Lock()
+        primary_keys = primary_keys or {}
+        self.groups = {
+            name: FakeFeatureGroup(self, name, frame, primary_keys.get(name))
+            for name, frame in frames.items()
+        }
+
+    def get_feature_group(self, name, version=1):
+        return self.groups.get(name)
+
+    def get_or_create_feature_group(self, name, version=1, primary_key=None, **kwargs):
+        with self.lock:
+            if name not in self.groups:
+                self.groups[name] = FakeFeatureGroup(self, name, pd.DataFrame(), primary_key)
+            return self.groups[name]
+
+    def read(self, group, condition, columns):
+        if self.read_latency:
+            time.sleep(self.read_latency)
+        frame = group.frame
+        if condition is not None and len(frame):
+            frame = frame[condition.mask(frame)]
+        if columns is not None:
+            frame = frame[columns]
+        with self.lock:
+            self.reads[group.name] += 1
+            self.rows_read[group.name] += len(frame)
+        return frame.reset_index(drop=True).copy()
+
+    def reset_counters(self):
+        with self.lock:
+            self.reads.clear()
+            self.rows_read.clear()
+            self.writes.clear()
+
+
+class FakeProject:
+    def __init__(self, store: FakeFeatureStore) -> None:
+        self.store = store
+
+    def get_feature_store(self):
+        return self.store
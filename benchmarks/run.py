@@ -0,0 +1,435 @@
+"""
+Offline benchmarks for the agent, with no Hopsworks, NHL API or Gemini access.
+
+A synthetic league (synthetic.py) is served by an in-process feature store
+(fake_store.py), a stub of the NHL stats API (fake_nhl_server.py) and a
+scripted LLM (fake_llm.py), each with a configurable latency. Measured:
+
+- the fast router's plans for questions it must route or leave to the LLM
+- the conversation history kept for follow-up questions
+- every tool in agentFunctions, p50/p95/p99 and feature store reads per call
+- chat_interface end to end, time to the first table and to the full answer,
+  and the LLM calls per question
+- util.py fetch throughput against the NHL API stub (rows/s, requests/s)
+- peak Python memory per section (tracemalloc) and the max RSS of the process
+
+The metrics are compared with the checked-in baseline (baseline.json), the run
+fails (exit code 1) when a store read or LLM call count goes up, or when a
+timing is worse than the baseline by more than --tolerance after the machine
+factor (the median change of all timings) is divided out. Without a baseline,
+or with one written with other options, the run exits with code 2.
+--update-baseline writes this run as the new baseline.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --seasons 2 --iterations 5 --skip-chat
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+for path in (BENCH_DIR, ROOT, ROOT / "agent"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import synthetic
+import scenarios
+from fake_store import FakeFeatureStore, FakeProject
+from fake_nhl_server import StubNHLServer
+from fake_llm import FakeModel, install, UNSCRIPTED
+
+
+PRIMARY_KEYS = {
+    "matches": ["id"],
+    "players_form": ["player_id", "season_id", "game_id"],
+    "goalies_form": ["player_id", "goalie_full_name", "season_id", "game_id"],
+    "player_season_stats": ["player_id", "season_id"],
+    "goalies": ["player_id", "season_id"],
+    "teams": ["team_full_name", "season_id"],
+}
+
+# Metrics where more is better, all others are latencies, sizes or counts
+HIGHER_IS_BETTER = ("_per_s",)
+
+# Counts that do not depend on the machine (feature store reads and LLM calls per
+# call, wrong fast router plans), any increase over the baseline is a regression
+COUNTS = ("_reads", "_calls", ".mismatches")
+
+# Timings depend on the machine and its load. They are compared after dividing out
+# the median change of all latencies in the run, so a slower machine or a busy CI
+# runner moves every timing and fails none, a single slower tool still stands out
+TIMINGS = ("_ms", "_per_s")
+
+# Timings of runs with fewer --iterations are median-of-a-few noise, only counts are compared
+MIN_TIMING_ITERATIONS = 10
+
+# Smallest absolute change that counts as a regression, per unit, so that
+# sub-millisecond tools do not fail the run on scheduler noise
+MIN_DELTA = {"_ms": 5.0, "_mb": 2.0, "_per_s": 0.0}
+
+# Metrics that are reported but not compared with the baseline, the first call
+# depends on the order of the calls, p95 and p99 of 30 samples are one or two
+# outliers and the RSS depends on the installed packages
+REPORT_ONLY = ("first_ms", "p95_ms", "p99_ms", "max_rss_mb")
+
+# Options that change what is measured, a baseline is only compared with runs made with the same
+BASELINE_OPTIONS = ("seasons", "iterations", "chat_rounds", "store_latency", "nhl_latency", "llm_latency",
+                    "chunk_latency")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seasons", type=int, default=3, help="Number of synthetic seasons")
+    parser.add_argument("--iterations", type=int, default=30, help="Calls per tool after the first one")
+    parser.add_argument("--chat-rounds", type=int, default=5, help="Times every chat question is asked")
+    parser.add_argument("--store-latency", type=float, default=0.02, help="Seconds per feature store read")
+    parser.add_argument("--nhl-latency", type=float, default=0.005, help="Seconds per NHL API request")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per LLM call")
+    parser.add_argument("--chunk-latency", type=float, default=0.02, help="Seconds per streamed LLM chunk")
+    parser.add_argument("--skip-chat", action="store_true", help="Skip chat_interface (needs gradio)")
+    parser.add_argument("--skip-fetch", action="store_true", help="Skip the NHL API fetch throughput")
+    parser.add_argument("--baseline", default=str(BENCH_DIR / "baseline.json"))
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative regression of timings (after the machine factor) and memory, 0.5 = 50%%")
+    parser.add_argument("--output", help="Also write the metrics of this run to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show what the agent prints")
+    return parser.parse_args(argv)
+
+
+def configure_env(server: StubNHLServer, workdir: str) -> None:
+    """Points config.py at the stubs, must run before anything imports config."""
+    os.environ["NHL_STATS_BASE_URL"] = server.base_url
+    os.environ["NHL_CACHE_ENABLED"] = "false"
+    os.environ["NHL_RATE_LIMIT_PER_SECOND"] = "1000"
+    os.environ["NHL_RATE_LIMIT_BURST"] = "100"
+    os.environ["ROUTE_CACHE_PATH"] = str(Path(workdir) / "route_cache.json")
+    os.environ["TRACE_FILE_PATH"] = str(Path(workdir) / "traces.jsonl")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("HOPSWORKS_API_KEY", "benchmark")
+    os.environ.setdefault("HOPSWORKS_PROJECT", "benchmark")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+
+def percentiles(samples: list, prefix: str) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {f"{prefix}.{name}_ms": round(float(np.percentile(ms, q)), 3) for name, q in (("p50", 50), ("p95", 95), ("p99", 99))}
+
+
+def quiet(verbose: bool):
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def check_router(cases) -> list[str]:
+    """Lines describing every question the fast router routes differently than expected."""
+    from config import settings
+    from fastRouter import FastRouter
+
+    router = FastRouter(settings.FAST_ROUTER_THRESHOLD)
+    mismatches = []
+    for question, expected in cases:
+        plan = router.route(question)
+        if plan != expected:
+            mismatches.append(f"{question!r}: {plan} (expected {expected})")
+    return mismatches
+
+
+def check_history(cases) -> list[str]:
+    """
+    Lines describing every follow-up whose compacted history lost or kept the wrong
+    turns, or that routes (fast router and cache key) without the history it needs.
+    """
+    from historyCompactor import HistoryCompactor
+    from routeCache import relevant_history
+
+    mismatches = []
+    for question, history, kept, dropped, refers_back in cases:
+        text = HistoryCompactor(800).compact(question, history)
+        wrong = [f"missing {t!r}" for t in kept if t not in text] + [f"has {t!r}" for t in dropped if t in text]
+        if bool(relevant_history(question, text)) != refers_back:
+            wrong.append("routed with history" if not refers_back else "routed without history")
+        if wrong:
+            mismatches.append(f"{question!r}: {', '.join(wrong)} in {text!r}")
+    return mismatches
+
+
+def bench_tools(agent, store, calls, iterations) -> dict:
+    """
+    First call per tool (partitions and season views built on demand, in the
+    order of calls), then iterations calls with an empty tool cache each time.
+    """
+    metrics = {}
+    for label, method, kwargs in calls:
+        fn = getattr(agent, method)
+        agent.cache.invalidate()
+        started = time.perf_counter()
+        fn(**kwargs)
+        metrics[f"tools.{label}.first_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+        store.reset_counters()
+        samples = []
+        for _ in range(iterations):
+            agent.cache.invalidate()
+            started = time.perf_counter()
+            fn(**kwargs)
+            samples.append(time.perf_counter() - started)
+        metrics.update(percentiles(samples, f"tools.{label}"))
+        metrics[f"tools.{label}.store_reads"] = round(sum(store.reads.values()) / iterations, 2)
+    return metrics
+
+
+def ask(agent_app, question) -> tuple[float, float, str]:
+    """(seconds to the first yield, seconds to the last, final answer)"""
+    started = time.perf_counter()
+    first, answer = None, ""
+    for answer in agent_app.chat_interface(question, []):
+        if first is None:
+            first = time.perf_counter() - started
+    return first or 0.0, time.perf_counter() - started, answer
+
+
+def bench_chat(agent_app, agent, questions, rounds, workdir) -> dict:
+    """
+    Every round starts with an empty route cache and tool cache and asks each
+    question twice, the second time the plan and the results are cached.
+    """
+    from routeCache import RouteCache
+
+    first_table, total, repeat_total = [], [], []
+    errors = llm_calls = 0
+    for round_no in range(rounds):
+        agent_app.route_cache = RouteCache(str(Path(workdir) / f"route_cache_{round_no}.json"), 1000)
+        agent.cache.invalidate()
+        for question in questions:
+            calls = agent_app._model.calls
+            first, elapsed, answer = ask(agent_app, question)
+            llm_calls += agent_app._model.calls - calls
+            first_table.append(first)
+            total.append(elapsed)
+            # An unscripted question means the prompt format changed and no tool ran
+            errors += answer.startswith("Error") or "Error executing" in answer or UNSCRIPTED in answer
+            repeat_total.append(ask(agent_app, question)[1])
+
+    metrics = {}
+    metrics.update(percentiles(first_table, "chat.first_yield"))
+    metrics.update(percentiles(total, "chat.total"))
+    metrics.update(percentiles(repeat_total, "chat.repeat_total"))
+    # LLM calls (routing and explanation) per question, counted on the first ask
+    metrics["chat.llm_calls"] = round(llm_calls / max(len(first_table), 1), 2)
+    metrics["chat.errors"] = errors
+    return metrics
+
+
+def bench_fetch(util, server, seasons) -> dict:
+    """Rows and requests per second for the fetches the pipelines make."""
+    latest = seasons[-1]
+    fetches = {
+        "player_stats": lambda: util.fetch_seasons(util.fetch_player_stats, seasons),
+        "goalies": lambda: util.fetch_seasons(util.fetch_goalies_for_season, seasons),
+        "teams": lambda: util.fetch_seasons(util.fetch_team_for_season, seasons),
+        "player_form": lambda: util.fetch_player_form_for_season(latest),
+        "goalie_form": lambda: util.fetch_goalie_form_for_season(latest),
+    }
+    metrics = {}
+    for name, fetch in fetches.items():
+        requests_before = server.requests
+        started = time.perf_counter()
+        rows = len(fetch())
+        elapsed = time.perf_counter() - started
+        metrics[f"fetch.{name}.rows"] = rows
+        metrics[f"fetch.{name}.rows_per_s"] = round(rows / elapsed, 1)
+        metrics[f"fetch.{name}.requests_per_s"] = round((server.requests - requests_before) / elapsed, 1)
+    return metrics
+
+
+def peak_memory(section: str, fn) -> dict:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {f"memory.{section}.peak_mb": round(peak / 1024 / 1024, 2)}
+
+
+def machine_factor(metrics: dict, baseline: dict) -> float:
+    """Median ratio of the latencies of this run to the baseline's, 1.0 on the same machine and load."""
+    ratios = sorted(
+        value / baseline[name] for name, value in metrics.items()
+        if name.endswith("_ms") and not name.endswith(REPORT_ONLY) and baseline.get(name)
+    )
+    return ratios[len(ratios) // 2] if ratios else 1.0
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float, timings: bool = True) -> list[str]:
+    """Lines describing every metric that regressed against the baseline, timings only if timings is set."""
+    factor = machine_factor(metrics, baseline)
+    regressions = []
+    for name, value in metrics.items():
+        old = baseline.get(name)
+        if not isinstance(old, (int, float)) or name.endswith(REPORT_ONLY):
+            continue
+        if name.endswith(COUNTS):
+            if value > old + 1e-9:
+                regressions.append(f"{name}: {old} -> {value}")
+            continue
+        if not name.endswith(tuple(MIN_DELTA)) or (name.endswith(TIMINGS) and not timings):
+            continue
+
+        higher_is_better = name.endswith(HIGHER_IS_BETTER)
+        delta = (old - value) if higher_is_better else (value - old)
+        expected = old
+        if name.endswith(TIMINGS):
+            # What the baseline value is on this machine
+            expected = old / factor if higher_is_better else old * factor
+        worse = (expected - value) if higher_is_better else (value - expected)
+        min_delta = next(d for suffix, d in MIN_DELTA.items() if name.endswith(suffix))
+        if worse > tolerance * abs(expected) and delta > min_delta:
+            regressions.append(f"{name}: {old} -> {value}" + (f" (machine factor {factor:.2f})" if factor != 1.0 else ""))
+    return regressions
+
+
+def report(metrics: dict) -> None:
+    width = max(len(name) for name in metrics)
+    for name in sorted(metrics):
+        print(f"  {name:<{width}}  {metrics[name]}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    seasons = synthetic.completed_seasons(args.seasons)
+    print(f"Building a synthetic league for {', '.join(seasons)}")
+    tables = synthetic.league(seasons)
+
+    server = StubNHLServer(tables, latency=args.nhl_latency).start()
+    workdir = tempfile.mkdtemp(prefix="hockey-bench-")
+    configure_env(server, workdir)
+
+    import util
+    import materialize
+    from agentFunctions import agentFunctions as agent
+
+    store = FakeFeatureStore(tables, PRIMARY_KEYS, read_latency=args.store_latency)
+    metrics = {}
+    try:
+        with quiet(args.verbose):
+            # Same tables as the pipelines write, without the store latency
+            latency, store.read_latency = store.read_latency, 0.0
+            materialize.run(store, seasons)
+            materialize.update_opponent_splits(store, tables["players_form"])
+            store.read_latency = latency
+
+            agent._project, agent._fs = FakeProject(store), store
+            agent.warm_up()
+
+        cases = scenarios.router_cases(seasons[-1])
+        print(f"Router: {len(cases)} questions")
+        mismatches = check_router(cases)
+        for line in mismatches:
+            print(f"  {line}")
+        metrics["router.mismatches"] = len(mismatches)
+
+        cases = scenarios.history_cases(seasons[-1])
+        print(f"History: {len(cases)} follow-up questions")
+        mismatches = check_history(cases)
+        for line in mismatches:
+            print(f"  {line}")
+        metrics["history.mismatches"] = len(mismatches)
+
+        calls = scenarios.tool_calls(seasons)
+        print(f"Tools: {len(calls)} calls x {args.iterations} iterations")
+        with quiet(args.verbose):
+            metrics.update(bench_tools(agent, store, calls, args.iterations))
+
+        agent_app = None
+        if not args.skip_chat:
+            try:
+                import agentApp as agent_app
+            except ImportError as e:
+                print(f"Skipping chat_interface: {e}")
+        if agent_app is not None:
+            questions = scenarios.chat_questions(seasons)
+            install(agent_app, FakeModel(questions, latency=args.llm_latency, chunk_latency=args.chunk_latency))
+            print(f"Chat: {len(questions)} questions x {args.chat_rounds} rounds")
+            with quiet(args.verbose):
+                metrics.update(bench_chat(agent_app, agent, list(questions), args.chat_rounds, workdir))
+
+        if not args.skip_fetch:
+            print("Fetch: NHL API stub")
+            with quiet(args.verbose):
+                metrics.update(bench_fetch(util, server, seasons))
+
+        # Separate pass, tracemalloc slows everything down
+        print("Memory")
+        with quiet(args.verbose):
+            def all_tools():
+                agent.cache.invalidate()
+                for _, method, kwargs in calls:
+                    getattr(agent, method)(**kwargs)
+            metrics.update(peak_memory("tools", all_tools))
+            if agent_app is not None:
+                questions = list(scenarios.chat_questions(seasons))
+                metrics.update(peak_memory("chat", lambda: bench_chat(agent_app, agent, questions, 1, workdir)))
+            if not args.skip_fetch:
+                metrics.update(peak_memory("fetch", lambda: util.fetch_player_form_for_season(seasons[-1])))
+        # ru_maxrss is in kB on Linux
+        metrics["memory.max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    finally:
+        server.stop()
+
+    print("Results")
+    report(metrics)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(metrics, indent=2, sort_keys=True))
+
+    failed = any(metrics.get(name, 0) > 0 for name in ("chat.errors", "router.mismatches", "history.mismatches"))
+    if metrics.get("chat.errors", 0):
+        print(f"{metrics['chat.errors']} chat answers were errors")
+    if metrics.get("router.mismatches", 0):
+        print(f"{metrics['router.mismatches']} questions were routed wrong by the fast router")
+    if metrics.get("history.mismatches", 0):
+        print(f"{metrics['history.mismatches']} follow-up questions got the wrong history")
+
+    baseline_path = Path(args.baseline)
+    options = {name: getattr(args, name) for name in BASELINE_OPTIONS}
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps({"options": options, **metrics}, indent=2, sort_keys=True))
+        print(f"Baseline written to {baseline_path}")
+        return int(failed)
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}, write one with --update-baseline")
+        return 2
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("options", options) != options:
+        print(f"{baseline_path} was written with {baseline['options']}, this run used {options}. "
+              f"Run with the same options or write a new baseline with --update-baseline")
+        return 2
+
+    timings = args.iterations >= MIN_TIMING_ITERATIONS
+    if not timings:
+        print(f"Fewer than {MIN_TIMING_ITERATIONS} iterations, only the counts are compared")
+    regressions = compare(metrics, baseline, args.tolerance, timings)
+    if regressions:
+        print(f"Regressions against {baseline_path} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions against {baseline_path}")
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
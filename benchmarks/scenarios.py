@@ -0,0 +1,116 @@
+"""
+What the benchmarks run: tool calls against the synthetic league, chat
+questions with the plan the fake LLM answers them with, and questions the fast
+router and the history compactor have to get right. Names and teams are the ones synthetic.py puts on the
+rosters.
+"""
+
+
+def tool_calls(seasons: list[str]) -> list[tuple[str, str, dict]]:
+    """(label, AgentFunctions method, kwargs) for every tool."""
+    season, first = seasons[-1], seasons[0]
+    return [
+        ("get_player_overview", "get_player_overview", {"player_name": "Connor McDavid", "season": season}),
+        ("top_players", "top_players", {"season": season, "position": "F", "metric": "points", "n": 10}),
+        ("top_players_d_ppg", "top_players", {"season": season, "position": "D", "metric": "points_per_game", "n": 5}),
+        ("get_team_overview", "get_team_overview", {"teamName": "Edmonton Oilers", "season": season}),
+        ("get_goalie", "get_goalie", {"name": "Igor Shesterkin", "season": season}),
+        ("top_goalies", "top_goalies", {"season": season, "metric": "save_pct", "n": 5}),
+        ("top_goalies_gaa", "top_goalies", {"season": season, "metric": "goals_against_average", "n": 5}),
+        ("top_teams", "top_teams", {"season": season, "metric": "points", "n": 10}),
+        ("get_team_form", "get_team_form", {"team_name": "Oilers", "season": season, "n": 5}),
+        ("league_form_table", "league_form_table", {"season": season, "n": 10}),
+        ("get_player_form", "get_player_form", {"player_name": "Auston Matthews", "season": season, "n": 5}),
+        ("get_player_form_n30", "get_player_form", {"player_name": "Auston Matthews", "season": season, "n": 30}),
+        ("get_goalie_form", "get_goalie_form", {"goalie_name": "Shesterkin", "season": season, "n": 5}),
+        ("get_game_results", "get_game_results", {"team": "New York Rangers", "opponent": "New York Islanders", "season": season}),
+        ("get_rivalry", "get_rivalry", {"team": "Bruins", "opponent": "Habs"}),
+        ("player_vs_team", "get_player_performance_against_team",
+         {"player_name": "Sidney Crosby", "opponent_team_abbrev": "NYR", "season": season}),
+        ("player_vs_team_career", "get_player_performance_against_team",
+         {"player_name": "Sidney Crosby", "opponent_team_abbrev": "NYR", "season": "all"}),
+        ("get_player_seasons", "get_player_seasons", {"player_name": "Alex Ovechkin"}),
+        ("get_team_seasons", "get_team_seasons", {"team_name": "Edmonton Oilers", "start_season": first}),
+        ("top_players_range", "top_players_range", {"start_season": first, "end_season": season, "metric": "goals", "n": 10}),
+        ("top_goalies_range", "top_goalies_range",
+         {"start_season": first, "end_season": season, "metric": "save_pct", "n": 5, "min_games": 60}),
+        ("compare_players_8", "compare_players", {"player_names": [
+            "Connor McDavid", "Sidney Crosby", "Auston Matthews", "Nathan MacKinnon",
+            "David Pastrnak", "Cale Makar", "Quinn Hughes", "Nikita Kucherov",
+        ], "season": season}),
+        ("compare_player_form_4", "compare_player_form", {"player_names": [
+            "Connor McDavid", "Leon Draisaitl", "Auston Matthews", "Mitch Marner",
+        ], "season": season, "n": 10}),
+    ]
+
+
+def chat_questions(seasons: list[str]) -> dict:
+    """question -> the plan the fake LLM returns when the question reaches decide_tool."""
+    season, first = seasons[-1], seasons[0]
+    label = f"{season[:4]}/{season[4:]}"
+    players = ["Sidney Crosby", "Connor McDavid", "Auston Matthews", "Nathan MacKinnon"]
+    return {
+        f"Compare Sidney Crosby, Connor McDavid, Auston Matthews and Nathan MacKinnon in the {label} season": {
+            "tools": [{"tool": "get_player_overview", "player_name": name, "season": season} for name in players],
+        },
+        f"Top 10 defensemen by points in the {label} season": {
+            "tool": "top_players", "season": season, "position": "D", "metric": "points", "n": 10,
+        },
+        f"How did Connor McDavid play in his last 10 games of the {label} season?": {
+            "tool": "get_player_form", "player_name": "Connor McDavid", "season": season, "n": 10,
+        },
+        "What is the all-time record between Boston and Montreal?": {
+            "tool": "get_rivalry", "team": "Boston Bruins", "opponent": "Montréal Canadiens",
+        },
+        f"How many goals did Ovechkin score from {first[:4]} to {season[4:]}?": {
+            "tool": "get_player_seasons", "player_name": "Alex Ovechkin", "start_season": first, "end_season": season,
+        },
+        f"How have the Rangers done against the Islanders in the {label} season?": {
+            "tool": "get_game_results", "team": "New York Rangers", "opponent": "New York Islanders", "season": season,
+        },
+        f"Which goalies had the best save percentage from {first[:4]} to {season[4:]}?": {
+            "tool": "top_goalies_range", "start_season": first, "end_season": season, "metric": "save_pct",
+            "n": 5, "min_games": 60,
+        },
+    }
+
+
+def router_cases(season: str) -> list[tuple[str, dict | None]]:
+    """
+    (question, plan) the fast router must return, None when the question has to go
+    to the LLM. The None cases ask for the end of a board the tool does not list first.
+    """
+    label = f"{season[:4]}/{season[4:]}"
+    return [
+        (f"Top 10 defensemen by points in the {label} season",
+         {"tool": "top_players", "season": season, "position": "D", "metric": "points", "n": 10}),
+        (f"Which goalies have the lowest GAA in the {label} season?",
+         {"tool": "top_goalies", "season": season, "metric": "goals_against_average", "n": 5}),
+        (f"Which teams have the most goals against in the {label} season?",
+         {"tool": "top_teams", "season": season, "metric": "goals_against", "n": 5}),
+        (f"Which defensemen have the lowest plus-minus in the {label} season?", None),
+        (f"Which teams have the lowest points in the {label} season?", None),
+        (f"Which goalies have the highest GAA in the {label} season?", None),
+        (f"Which teams have the fewest goals against in the {label} season?", None),
+        (f"Worst goalies by save percentage in the {label} season", None),
+    ]
+
+
+def history_cases(season: str) -> list[tuple[str, list, list[str], list[str], bool]]:
+    """
+    (question, history, text the compacted history must contain, text it must not,
+    whether routing depends on it) for historyCompactor and the routing cache key.
+    A follow-up that names someone new keeps the latest turn.
+    """
+    label = f"{season[:4]}/{season[4:]}"
+    mcdavid = (f"How many goals did Connor McDavid score in {label}?",
+               f"| Skater Full Name | Season Id | Goals |\n|---|---|---|\n| Connor McDavid | {season} | 32 |\n\n"
+               "Connor McDavid scored 32 goals.")
+    crosby = (f"Sidney Crosby's points in {label}",
+              f"| Skater Full Name | Season Id | Points |\n|---|---|---|\n| Sidney Crosby | {season} | 94 |")
+    return [
+        ("What about Ovechkin?", [mcdavid], ["McDavid", "goals 32", season], [], True),
+        ("And Auston Matthews?", [crosby, mcdavid], ["McDavid", "goals 32"], ["Crosby"], True),
+        ("Compare him with Sidney Crosby", [crosby, mcdavid], ["McDavid", "Crosby"], [], True),
+        (f"Top 10 defensemen by points in {label}", [mcdavid], ["McDavid"], [], False),
+    ]
@@ -0,0 +1,281 @@
+"""
+Synthetic league at NHL scale for the benchmarks: 32 teams, full 1312 game
+seasons, per-game logs for every skater and goalie, and the season tables built
+from them, with the same columns as the feature groups. Deterministic for a seed.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+# (team id, full name, franchise id, triCode)
+TEAMS = [
+    (1, "New Jersey Devils", 23, "NJD"), (2, "New York Islanders", 22, "NYI"),
+    (3, "New York Rangers", 10, "NYR"), (4, "Philadelphia Flyers", 16, "PHI"),
+    (5, "Pittsburgh Penguins", 17, "PIT"), (6, "Boston Bruins", 6, "BOS"),
+    (7, "Buffalo Sabres", 19, "BUF"), (8, "Montréal Canadiens", 1, "MTL"),
+    (9, "Ottawa Senators", 30, "OTT"), (10, "Toronto Maple Leafs", 5, "TOR"),
+    (12, "Carolina Hurricanes", 26, "CAR"), (13, "Florida Panthers", 33, "FLA"),
+    (14, "Tampa Bay Lightning", 31, "TBL"), (15, "Washington Capitals", 24, "WSH"),
+    (16, "Chicago Blackhawks", 11, "CHI"), (17, "Detroit Red Wings", 12, "DET"),
+    (18, "Nashville Predators", 34, "NSH"), (19, "St. Louis Blues", 18, "STL"),
+    (20, "Calgary Flames", 21, "CGY"), (21, "Colorado Avalanche", 27, "COL"),
+    (22, "Edmonton Oilers", 25, "EDM"), (23, "Vancouver Canucks", 20, "VAN"),
+    (24, "Anaheim Ducks", 32, "ANA"), (25, "Dallas Stars", 15, "DAL"),
+    (26, "Los Angeles Kings", 14, "LAK"), (28, "San Jose Sharks", 29, "SJS"),
+    (29, "Columbus Blue Jackets", 36, "CBJ"), (30, "Minnesota Wild", 37, "MIN"),
+    (52, "Winnipeg Jets", 35, "WPG"), (54, "Vegas Golden Knights", 38, "VGK"),
+    (55, "Seattle Kraken", 39, "SEA"), (59, "Utah Hockey Club", 40, "UTA"),
+]
+
+# Names the benchmark questions ask about: triCode -> skaters (first ones on the roster)
+KNOWN_SKATERS = {
+    "EDM": ["Connor McDavid", "Leon Draisaitl"], "PIT": ["Sidney Crosby"], "TOR": ["Auston Matthews", "Mitch Marner"],
+    "BOS": ["David Pastrnak"], "COL": ["Cale Makar", "Nathan MacKinnon"], "VAN": ["Quinn Hughes"],
+    "NYR": ["Artemi Panarin"], "TBL": ["Nikita Kucherov"], "WSH": ["Alex Ovechkin"],
+    "CAR": ["Sebastian Aho"], "NYI": ["Sebastian Aho"],  # Two players with the same name
+}
+KNOWN_GOALIES = {"NYR": "Igor Shesterkin", "BOS": "Jeremy Swayman", "TBL": "Andrei Vasilevskiy", "EDM": "Stuart Skinner"}
+
+FIRST_NAMES = ["Adam", "Brady", "Carl", "Dylan", "Erik", "Filip", "Gabriel", "Henrik", "Ivan", "Jack",
+               "Kevin", "Lucas", "Mikael", "Noah", "Oskar", "Patrik", "Ryan", "Simon", "Tyler", "Viktor",
+               "Anton", "Axel", "Elias", "Hugo", "Jonas", "Leo", "Marcus", "Nils", "Rasmus", "William"]
+LAST_NAMES = ["Andersson", "Bergstrom", "Carlsson", "Dahlberg", "Ekholm", "Forsberg", "Granlund", "Holm",
+              "Isaksson", "Johansson", "Karlsson", "Lindholm", "Magnusson", "Nilsson", "Olofsson", "Persson",
+              "Quist", "Robertsson", "Sandin", "Tornqvist", "Ullmark", "Virtanen", "Wennberg", "Zetterberg"]
+
+# Roster layout per team
+SKATER_POSITIONS = ["C"] * 5 + ["L"] * 4 + ["R"] * 4 + ["D"] * 7
+GOALIES_PER_TEAM = 2
+GAMES_PER_SEASON = 1312
+
+
+def completed_seasons(count: int, today: date | None = None) -> list[str]:
+    """The count latest seasons that are over, oldest first."""
+    today = today or date.today()
+    last_start = (today.year - 1) if today.month >= 7 else (today.year - 2)
+    return [f"{year}{year + 1}" for year in range(last_start - count + 1, last_start + 1)]
+
+
+def rosters(seed: int = 0):
+    """(skaters, goalies) with player_id, full name, team and position, the same every season."""
+    rng = np.random.default_rng(seed)
+    skaters, goalies = [], []
+    # Every first/last name combination once, in random order (720 names for about 640 slots)
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    generated = iter([names[i] for i in rng.permutation(len(names))])
+
+    def generated_name():
+        return next(generated)
+
+    for team_index, (_, _, _, abbrev) in enumerate(TEAMS):
+        known = KNOWN_SKATERS.get(abbrev, [])
+        for slot, position in enumerate(SKATER_POSITIONS):
+            name = known[slot] if slot < len(known) else generated_name()
+            skaters.append((8470000 + team_index * 100 + slot, name, abbrev, position))
+        for slot in range(GOALIES_PER_TEAM):
+            name = KNOWN_GOALIES[abbrev] if slot == 0 and abbrev in KNOWN_GOALIES else generated_name()
+            goalies.append((8480000 + team_index * 10 + slot, name, abbrev))
+
+    return (
+        pd.DataFrame(skaters, columns=["player_id", "name", "team_abbrev", "position_code"]),
+        pd.DataFrame(goalies, columns=["player_id", "name", "team_abbrev"]),
+    )
+
+
+def schedule(season: str, rng) -> pd.DataFrame:
+    """The matches of one season, finished games only."""
+    year = int(season[:4])
+    start = pd.Timestamp(date(year, 10, 8))
+    days = np.sort(rng.integers(0, 185, GAMES_PER_SEASON))
+
+    home = rng.integers(0, len(TEAMS), GAMES_PER_SEASON)
+    away = (home + rng.integers(1, len(TEAMS), GAMES_PER_SEASON)) % len(TEAMS)
+    home_score = rng.poisson(3.1, GAMES_PER_SEASON)
+    visiting_score = rng.poisson(2.9, GAMES_PER_SEASON)
+
+    # Ties are decided in overtime (period 4) or a shootout (period 5)
+    tied = home_score == visiting_score
+    period = np.where(tied, rng.choice([4, 5], GAMES_PER_SEASON), 3)
+    home_wins_tie = rng.random(GAMES_PER_SEASON) < 0.5
+    home_score = home_score + (tied & home_wins_tie)
+    visiting_score = visiting_score + (tied & ~home_wins_tie)
+
+    team_ids = np.array([team[0] for team in TEAMS])
+    names = np.array([team[1] for team in TEAMS], dtype=object)
+    return pd.DataFrame({
+        "id": year * 1000000 + 20001 + np.arange(GAMES_PER_SEASON),
+        "season": int(season),
+        "game_date": (start + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d"),
+        "home_team_id": team_ids[home],
+        "visiting_team_id": team_ids[away],
+        "home_team_name": names[home],
+        "away_team_name": names[away],
+        "home_score": home_score,
+        "visiting_score": visiting_score,
+        "period": period,
+        "game_state_id": 7,
+    })
+
+
+def skater_games(matches: pd.DataFrame, skaters: pd.DataFrame, season: str, rng) -> pd.DataFrame:
+    """One players_form row per skater and game, every skater dresses for every game."""
+    abbrevs = {team[1]: team[3] for team in TEAMS}
+    by_team = {abbrev: group for abbrev, group in skaters.groupby("team_abbrev")}
+
+    frames = []
+    for home_road, team_column, opponent_column in (("H", "home_team_name", "away_team_name"),
+                                                     ("R", "away_team_name", "home_team_name")):
+        team = matches[team_column].map(abbrevs).to_numpy()
+        opponent = matches[opponent_column].map(abbrevs).to_numpy()
+        for abbrev, roster in by_team.items():
+            games = np.flatnonzero(team == abbrev)
+            n_games, n_players = len(games), len(roster)
+            frames.append(pd.DataFrame({
+                "player_id": np.tile(roster["player_id"].to_numpy(), n_games),
+                "skater_full_name": np.tile(roster["name"].to_numpy(), n_games),
+                "position_code": np.tile(roster["position_code"].to_numpy(), n_games),
+                "team_abbrev": abbrev,
+                "game_id": np.repeat(matches["id"].to_numpy()[games], n_players),
+                "game_date": np.repeat(matches["game_date"].to_numpy()[games], n_players),
+                "opponent_team_abbrev": np.repeat(opponent[games], n_players),
+                "home_road": home_road,
+            }))
+
+    games = pd.concat(frames, ignore_index=True)
+    n = len(games)
+    forward = games["position_code"].to_numpy() != "D"
+    games["season_id"] = int(season)
+    games["goals"] = rng.poisson(np.where(forward, 0.17, 0.06))
+    games["assists"] = rng.poisson(np.where(forward, 0.25, 0.2))
+    games["points"] = games["goals"] + games["assists"]
+    games["shots"] = games["goals"] + rng.poisson(np.where(forward, 1.9, 1.2))
+    games["plus_minus"] = rng.integers(-2, 3, n)
+    games["pp_points"] = np.minimum(games["points"], rng.poisson(0.08, n))
+    games["ev_points"] = games["points"] - games["pp_points"]
+    games["game_winning_goals"] = np.minimum(games["goals"], rng.random(n) < 0.02).astype(int)
+    games["penalty_minutes"] = 2 * rng.poisson(0.2, n)
+    games["time_on_ice_per_game"] = np.round(np.where(forward, 1000.0, 1300.0) + rng.normal(0, 120, n), 1)
+    return games
+
+
+def goalie_games(matches: pd.DataFrame, goalies: pd.DataFrame, season: str, rng) -> pd.DataFrame:
+    """One goalies_form row per game and team, the first goalie starts about 70 % of the games."""
+    abbrevs = {team[1]: team[3] for team in TEAMS}
+    starters = {abbrev: group["player_id"].to_numpy() for abbrev, group in goalies.groupby("team_abbrev")}
+    names = dict(zip(goalies["player_id"], goalies["name"]))
+
+    frames = []
+    for home_road, team_column, opponent_column, for_column, against_column in (
+        ("H", "home_team_name", "away_team_name", "home_score", "visiting_score"),
+        ("R", "away_team_name", "home_team_name", "visiting_score", "home_score"),
+    ):
+        team = matches[team_column].map(abbrevs).to_numpy()
+        starter = np.array([starters[abbrev][0 if rng.random() < 0.7 else 1] for abbrev in team])
+        goals_for = matches[for_column].to_numpy()
+        goals_against = matches[against_column].to_numpy()
+        overtime = matches["period"].to_numpy() > 3
+        shots_against = np.maximum(goals_against, rng.integers(20, 40, len(matches)))
+
+        frames.append(pd.DataFrame({
+            "player_id": starter,
+            "goalie_full_name": [names[player_id] for player_id in starter],
+            "season_id": int(season),
+            "game_id": matches["id"].to_numpy(),
+            "game_date": matches["game_date"].to_numpy(),
+            "team_abbrev": team,
+            "opponent_team_abbrev": matches[opponent_column].map(abbrevs).to_numpy(),
+            "home_road": home_road,
+            "decision": np.where(goals_for > goals_against, "W", np.where(overtime, "O", "L")),
+            "shots_against": shots_against,
+            "goals_against": goals_against,
+            "saves": shots_against - goals_against,
+            "time_on_ice": np.where(overtime, 3900, 3600),
+        }))
+
+    games = pd.concat(frames, ignore_index=True)
+    games["save_pct"] = (games["saves"] / games["shots_against"]).round(3)
+    games["goals_against_average"] = (games["goals_against"] * 3600 / games["time_on_ice"]).round(2)
+    return games
+
+
+def season_tables(matches, skater_form, goalie_form, season):
+    """player_season_stats, goalies and teams rows of one season, summed from the game logs."""
+    grouped = skater_form.groupby("player_id")
+    skaters = grouped[["goals", "assists", "points", "shots", "plus_minus", "pp_points", "ev_points",
+                       "penalty_minutes"]].sum()
+    skaters["games_played"] = grouped.size()
+    skaters["skater_full_name"] = grouped["skater_full_name"].first()
+    skaters["team_abbrevs"] = grouped["team_abbrev"].first()
+    skaters["position_code"] = grouped["position_code"].first()
+    skaters["points_per_game"] = (skaters["points"] / skaters["games_played"]).round(2)
+    skaters["shooting_pct"] = (skaters["goals"] / skaters["shots"].where(skaters["shots"] > 0)).round(3)
+    skaters["time_on_ice_per_game"] = grouped["time_on_ice_per_game"].mean().round(1)
+    skaters["season_id"] = int(season)
+
+    grouped = goalie_form.groupby("player_id")
+    goalies = grouped[["saves", "shots_against", "goals_against", "time_on_ice"]].sum()
+    goalies["games_played"] = grouped.size()
+    goalies["goalie_full_name"] = grouped["goalie_full_name"].first()
+    goalies["team_abbrevs"] = grouped["team_abbrev"].first()
+    for decision, column in (("W", "wins"), ("L", "losses"), ("O", "ot_losses")):
+        goalies[column] = (goalie_form["decision"] == decision).groupby(goalie_form["player_id"]).sum()
+    goalies["shutouts"] = (goalie_form["goals_against"] == 0).groupby(goalie_form["player_id"]).sum()
+    goalies["save_pct"] = (goalies["saves"] / goalies["shots_against"]).round(3)
+    goalies["goals_against_average"] = (goalies["goals_against"] * 3600 / goalies["time_on_ice"]).round(2)
+    goalies["season_id"] = int(season)
+
+    sides = []
+    for team_column, for_column, against_column in (("home_team_name", "home_score", "visiting_score"),
+                                                    ("away_team_name", "visiting_score", "home_score")):
+        sides.append(pd.DataFrame({
+            "team_full_name": matches[team_column],
+            "goals_for": matches[for_column],
+            "goals_against": matches[against_column],
+            "win": matches[for_column] > matches[against_column],
+            "ot_loss": (matches[for_column] < matches[against_column]) & (matches["period"] > 3),
+        }))
+    sides = pd.concat(sides, ignore_index=True)
+    grouped = sides.groupby("team_full_name")
+    teams = grouped[["goals_for", "goals_against"]].sum()
+    teams["games_played"] = grouped.size()
+    teams["wins"] = grouped["win"].sum()
+    teams["ot_losses"] = grouped["ot_loss"].sum()
+    teams["losses"] = teams["games_played"] - teams["wins"] - teams["ot_losses"]
+    teams["points"] = 2 * teams["wins"] + teams["ot_losses"]
+    teams["team_id"] = teams.index.map({team[1]: team[0] for team in TEAMS})
+    rng = np.random.default_rng(int(season))
+    teams["power_play_pct"] = rng.uniform(0.14, 0.3, len(teams)).round(3)
+    teams["penalty_kill_pct"] = rng.uniform(0.72, 0.86, len(teams)).round(3)
+    teams["season_id"] = int(season)
+
+    return skaters.reset_index(), goalies.reset_index(), teams.reset_index()
+
+
+def league(seasons, seed: int = 0) -> dict:
+    """{feature group name: DataFrame} for the given seasons."""
+    skaters, goalies = rosters(seed)
+    tables = {name: [] for name in ("matches", "players_form", "goalies_form", "player_season_stats", "goalies", "teams")}
+
+    for season in seasons:
+        rng = np.random.default_rng([seed, int(season)])
+        matches = schedule(season, rng)
+        skater_form = skater_games(matches, skaters, season, rng)
+        goalie_form = goalie_games(matches, goalies, season, rng)
+        season_skaters, season_goalies, season_teams = season_tables(matches, skater_form, goalie_form, season)
+
+        tables["matches"].append(matches)
+        tables["players_form"].append(skater_form)
+        tables["goalies_form"].append(goalie_form)
+        tables["player_season_stats"].append(season_skaters)
+        tables["goalies"].append(season_goalies)
+        tables["teams"].append(season_teams)
+
+    return {name: pd.concat(frames, ignore_index=True) for name, frames in tables.items()}
+
+
+def teams_frame() -> pd.DataFrame:
+    """The team list as util.fetch_teams() returns it."""
+    return pd.DataFrame(TEAMS, columns=["id", "fullName", "franchiseId", "triCode"])
+
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+from pathlib import Path
 
 
 # Ladda .env automatiskt när modulen importeras
@@ -24,6 +25,64 @@ class Settings:
             "HOPSWORKS_HOST",
             "eu-west.cloud.hopsworks.ai",
         )
+
+        # NHL API
+        self.NHL_STATS_BASE_URL = self._get_env("NHL_STATS_BASE_URL", "https://api.nhle.com/stats/rest/en")
+        self.NHL_RATE_LIMIT_PER_SECOND = float(self._get_env("NHL_RATE_LIMIT_PER_SECOND", "5"))
+        self.NHL_RATE_LIMIT_BURST = int(self._get_env("NHL_RATE_LIMIT_BURST", "10"))
+        self.NHL_MAX_CONNECTIONS = int(self._get_env("NHL_MAX_CONNECTIONS", "8"))
+        self.NHL_MAX_RETRIES = int(self._get_env("NHL_MAX_RETRIES", "5"))
+        self.NHL_BACKOFF_SECONDS = float(self._get_env("NHL_BACKOFF_SECONDS", "0.5"))
+        self.NHL_TIMEOUT_SECONDS = float(self._get_env("NHL_TIMEOUT_SECONDS", "20"))
+
+        # On-disk cache for NHL API responses, closed seasons never expire
+        self.NHL_CACHE_ENABLED = self._get_env("NHL_CACHE_ENABLED", "true").lower() == "true"
+        self.NHL_CACHE_DIR = self._get_env("NHL_CACHE_DIR", str(Path(__file__).resolve().parent / ".cache" / "nhl"))
+        self.NHL_CACHE_TTL_SECONDS = int(self._get_env("NHL_CACHE_TTL_SECONDS", "3600"))
+
+        # Incremental sync, max rows per insert()
+        self.SYNC_BATCH_SIZE = int(self._get_env("SYNC_BATCH_SIZE", "50000"))
+
+        # Tool result cache
+        self.TOOL_CACHE_MAX_MB = int(self._get_env("TOOL_CACHE_MAX_MB", "256"))
+        self.TOOL_CACHE_VERSION_CHECK_SECONDS = int(
+            self._get_env("TOOL_CACHE_VERSION_CHECK_SECONDS", "300")
+        )
+
+        # In-memory, season partitioned copy of the feature groups
+        self.FRAME_STORE_ENABLED = self._get_env("FRAME_STORE_ENABLED", "true").lower() == "true"
+
+        # Max number of tool calls from a multi-tool plan that run at the same time
+        self.AGENT_MAX_PARALLEL_TOOLS = int(self._get_env("AGENT_MAX_PARALLEL_TOOLS", "4"))
+
+        # Cache of routing decisions from the LLM, persisted between restarts
+        self.ROUTE_CACHE_PATH = self._get_env("ROUTE_CACHE_PATH", str(Path(__file__).resolve().parent / ".cache" / "route_cache.json"))
+        self.ROUTE_CACHE_MAX_ENTRIES = int(self._get_env("ROUTE_CACHE_MAX_ENTRIES", "5000"))
+
+        # Pattern based router that skips the LLM for common question shapes
+        self.FAST_ROUTER_ENABLED = self._get_env("FAST_ROUTER_ENABLED", "true").lower() == "true"
+        self.FAST_ROUTER_THRESHOLD = float(self._get_env("FAST_ROUTER_THRESHOLD", "0.9"))
+
+        # LLM behind routing and explanations. Routing uses the model's structured output
+        # (a response schema built from toolSpecs.py) when ROUTER_STRUCTURED_OUTPUT is true,
+        # "auto" turns it on for the Gemini models, Gemma on the Gemini API does not have it
+        self.LLM_MODEL = self._get_env("LLM_MODEL", "gemma-3-27b-it")
+        self.ROUTER_STRUCTURED_OUTPUT = self._get_env("ROUTER_STRUCTURED_OUTPUT", "auto").lower()
+
+        # Conversation history in the routing prompt, compacted to this many tokens
+        self.HISTORY_TOKEN_BUDGET = int(self._get_env("HISTORY_TOKEN_BUDGET", "800"))
+        self.HISTORY_MAX_SESSIONS = int(self._get_env("HISTORY_MAX_SESSIONS", "1000"))
+
+        # Who writes the explanation under the tables: "auto" uses the templates in
+        # explainTemplates.py for simple one-tool answers and the LLM for the rest,
+        # "local" uses a template whenever the tool has one, "llm" always asks the LLM
+        self.EXPLAIN_MODE = self._get_env("EXPLAIN_MODE", "auto").lower()
+
+        # Logging and per-question traces (one JSON line per question, rotated by size)
+        self.LOG_LEVEL = self._get_env("LOG_LEVEL", "INFO").upper()
+        self.TRACE_FILE_PATH = self._get_env("TRACE_FILE_PATH", str(Path(__file__).resolve().parent / ".cache" / "traces" / "agent_traces.jsonl"))
+        self.TRACE_FILE_MAX_MB = int(self._get_env("TRACE_FILE_MAX_MB", "20"))
+        self.TRACE_FILE_BACKUPS = int(self._get_env("TRACE_FILE_BACKUPS", "5"))
          
 
     @staticmethod
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import settings
+
+
+# Status codes that are worth retrying: rate limited or a temporary server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by all threads.
+    Allows bursts of up to `capacity` requests and `rate` requests per second on average.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def current_season_id(today: date | None = None) -> str:
+    """Samma regel som util.get_season: säsongen byter i oktober."""
+    today = today or date.today()
+    start_year = today.year if today.month >= 10 else today.year - 1
+    return f"{start_year}{start_year + 1}"
+
+
+def season_in_params(params: dict | None) -> str | None:
+    """Season id (YYYYYYYY) a request is for, taken from the cayenneExp filter."""
+    if not params:
+        return None
+    match = re.search(r"season(?:Id)?\s*=\s*(\d{8})", str(params.get("cayenneExp", "")))
+    return match.group(1) if match else None
+
+
+class ResponseCache:
+    """
+    Content addressed on-disk cache for NHL API responses.
+    Every response is stored gzip compressed under the sha256 of its URL and params.
+    Responses fetched after their season closed never expire, everything else (a
+    season that was still running when it was fetched, requests without a season)
+    is refetched when it is older than ttl seconds.
+    """
+
+    def __init__(self, directory: str | Path, ttl: float) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+
+    @staticmethod
+    def key(url: str, params: dict | None) -> str:
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    @staticmethod
+    def is_immutable(params: dict | None, mtime: float) -> bool:
+        """True if the entry was written after its season closed, so it holds the final numbers."""
+        season = season_in_params(params)
+        return season is not None and season < current_season_id(date.fromtimestamp(mtime))
+
+    def get(self, url: str, params: dict | None) -> dict | None:
+        path = self.path(self.key(url, params))
+        try:
+            mtime = path.stat().st_mtime
+            if not self.is_immutable(params, mtime) and time.time() - mtime > self.ttl:
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, params: dict | None, payload: dict) -> None:
+        path = self.path(self.key(url, params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file first so a crash never leaves a half written entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class NHLClient:
+    """
+    Shared HTTP client for the NHL API.
+    - Keep-alive connection pool (one requests.Session for all fetchers)
+    - Token bucket rate limiter, every attempt takes a token
+    - Exponential backoff with jitter on 429/5xx and connection errors, honours Retry-After
+    - Optional on-disk response cache (see ResponseCache), cache hits never touch the network
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        rate_limit: float,
+        burst: int,
+        max_connections: int,
+        max_retries: int,
+        backoff: float,
+        timeout: float,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        """Full URL for a path under the stats API, e.g. "goalie/summary"."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, url: str, params: dict | None = None, timeout: float | None = None) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                resp = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep(attempt)
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep(attempt, resp.headers.get("Retry-After"))
+                continue
+
+            resp.raise_for_status()
+            return resp
+
+    def get_json(self, url: str, params: dict | None = None, timeout: float | None = None) -> dict:
+        if self.cache is not None:
+            payload = self.cache.get(url, params)
+            if payload is not None:
+                return payload
+
+        payload = self.get(url, params=params, timeout=timeout).json()
+        if self.cache is not None:
+            self.cache.put(url, params, payload)
+        return payload
+
+    def _sleep(self, attempt: int, retry_after: str | None = None) -> None:
+        delay = self.backoff * (2 ** attempt)
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(delay + random.uniform(0, self.backoff))
+
+
+# Global instance used by util.py
+client = NHLClient(
+    base_url=settings.NHL_STATS_BASE_URL,
+    rate_limit=settings.NHL_RATE_LIMIT_PER_SECOND,
+    burst=settings.NHL_RATE_LIMIT_BURST,
+    max_connections=settings.NHL_MAX_CONNECTIONS,
+    max_retries=settings.NHL_MAX_RETRIES,
+    backoff=settings.NHL_BACKOFF_SECONDS,
+    timeout=settings.NHL_TIMEOUT_SECONDS,
+    cache=ResponseCache(settings.NHL_CACHE_DIR, settings.NHL_CACHE_TTL_SECONDS) if settings.NHL_CACHE_ENABLED else None,
+)
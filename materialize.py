@@ -0,0 +1,229 @@
+import pandas as pd
+
+import util
+
+
+# Rolling windows that are materialized, the form tools answer other N from players_form/goalies_form
+WINDOWS = (5, 10, 20)
+MAX_WINDOW = max(WINDOWS)
+
+PLAYERS_LAST_GAMES_FG = "players_last_games"
+GOALIES_LAST_GAMES_FG = "goalies_last_games"
+PLAYERS_ROLLING_FG = "players_rolling_form"
+GOALIES_ROLLING_FG = "goalies_rolling_form"
+
+PLAYERS_VS_OPPONENT_FG = "players_vs_opponent"
+
+# Columns summed over a window
+PLAYER_SUM_COLUMNS = ["goals", "assists", "points", "shots", "plus_minus", "pp_points", "ev_points"]
+GOALIE_SUM_COLUMNS = ["saves", "shots_against", "goals_against", "time_on_ice"]
+
+# Columns summed per player, opponent and season
+OPPONENT_SUM_COLUMNS = ["goals", "assists", "points", "penalty_minutes", "plus_minus", "game_winning_goals"]
+OPPONENT_KEYS = ["player_id", "opponent_team_abbrev", "season_id"]
+
+
+def last_games(form_df: pd.DataFrame, max_games: int = MAX_WINDOW) -> pd.DataFrame:
+    """
+    The max_games latest rows per player and season, with game_rank 0 for the latest game.
+    Sorted on (player_id, game_rank) so "last n games" is a prefix of each player's rows.
+    """
+    if form_df.empty:
+        return form_df.assign(game_rank=pd.Series(dtype="int64"))
+
+    df = form_df.copy()
+    df["game_date"] = pd.to_datetime(df["game_date"])
+    df = df.sort_values(["player_id", "season_id", "game_date", "game_id"], ascending=[True, True, False, False])
+    df["game_rank"] = df.groupby(["player_id", "season_id"], sort=False).cumcount()
+    df = df[df["game_rank"] < max_games].reset_index(drop=True)
+    df["game_date"] = df["game_date"].dt.strftime("%Y-%m-%d")
+    return df
+
+
+def window_totals(games: pd.DataFrame, kind: str = "skater") -> pd.DataFrame:
+    """
+    Totals per player and season over the given game rows. For goalies SV% and GAA
+    are recomputed from the totals instead of averaging the per-game values.
+    """
+    keys = ["player_id", "season_id"]
+    grouped = games.groupby(keys, sort=False)
+
+    sum_columns = PLAYER_SUM_COLUMNS if kind == "skater" else GOALIE_SUM_COLUMNS
+    totals = grouped[[col for col in sum_columns if col in games.columns]].sum()
+    totals.insert(0, "games", grouped.size())
+
+    if kind == "skater":
+        if "time_on_ice_per_game" in games.columns:
+            totals["time_on_ice_per_game"] = grouped["time_on_ice_per_game"].mean().round(1)
+        if "points" in totals.columns:
+            totals["points_per_game"] = (totals["points"] / totals["games"]).round(2)
+    else:
+        if "decision" in games.columns:
+            totals["wins"] = (games["decision"] == "W").groupby([games[k] for k in keys], sort=False).sum()
+        if {"saves", "shots_against"}.issubset(totals.columns):
+            totals["save_pct"] = (totals["saves"] / totals["shots_against"].where(totals["shots_against"] > 0)).round(3)
+        if {"goals_against", "time_on_ice"}.issubset(totals.columns):
+            totals["goals_against_average"] = (
+                totals["goals_against"] * 3600 / totals["time_on_ice"].where(totals["time_on_ice"] > 0)
+            ).round(2)
+    return totals.reset_index()
+
+
+def rolling_form(last_games_df: pd.DataFrame, kind: str = "skater", windows=WINDOWS) -> pd.DataFrame:
+    """
+    One row per player, season and window with the totals over the player's
+    last `window` games, from the output of last_games().
+    """
+    if last_games_df.empty:
+        return pd.DataFrame()
+
+    frames = []
+    for window in windows:
+        totals = window_totals(last_games_df[last_games_df["game_rank"] < window], kind)
+        totals["window"] = window
+        frames.append(totals)
+    return pd.concat(frames, ignore_index=True)
+
+
+def materialize_form(fs, season: str, kind: str = "skater") -> dict:
+    """
+    Rebuilds the last games and rolling form tables of one season from players_form
+    (kind="skater") or goalies_form (kind="goalie"). Returns {feature_group: rows}.
+    """
+    if kind == "skater":
+        source, last_fg, rolling_fg = "players_form", PLAYERS_LAST_GAMES_FG, PLAYERS_ROLLING_FG
+    else:
+        source, last_fg, rolling_fg = "goalies_form", GOALIES_LAST_GAMES_FG, GOALIES_ROLLING_FG
+
+    form_fg = fs.get_feature_group(name=source, version=1)
+    form_df = form_fg.filter(form_fg.season_id == season).read()
+    if form_df.empty:
+        print(f"No rows in {source} for {season}, nothing materialized!")
+        return {}
+
+    last_df = last_games(form_df)
+    rolling_df = rolling_form(last_df, kind)
+
+    written = {}
+    for name, df, primary_key, description in (
+        (last_fg, last_df, ["player_id", "season_id", "game_rank"],
+         f"The {MAX_WINDOW} latest games per player and season from {source}, game_rank 0 is the latest"),
+        (rolling_fg, rolling_df, ["player_id", "season_id", "window"],
+         f"Totals over the last {', '.join(map(str, WINDOWS))} games per player and season from {source}"),
+    ):
+        fg = fs.get_or_create_feature_group(
+            name=name,
+            description=description,
+            version=1,
+            primary_key=primary_key,
+        )
+        print(f"Inserting {len(df)} rows into {name}")
+        fg.insert(df)
+        util.mark_feature_group_updated(fs, name)
+        written[name] = len(df)
+    return written
+
+
+def run(fs, seasons) -> dict:
+    """Materializes the skater and goalie form tables for the given seasons."""
+    written = {}
+    for season in seasons:
+        for kind in ("skater", "goalie"):
+            for name, rows in materialize_form(fs, season, kind).items():
+                written[name] = written.get(name, 0) + rows
+    return written
+
+
+def opponent_splits(form_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totals per (player_id, opponent_team_abbrev, season_id) from players_form rows.
+    game_ids points to the underlying rows in players_form (comma separated, oldest first).
+    """
+    if form_df.empty:
+        return pd.DataFrame(columns=OPPONENT_KEYS + ["skater_full_name", "games"] + OPPONENT_SUM_COLUMNS
+                            + ["last_game_date", "game_ids"])
+
+    df = form_df.sort_values(["game_date", "game_id"])
+    grouped = df.groupby(OPPONENT_KEYS, sort=False)
+
+    splits = grouped[[col for col in OPPONENT_SUM_COLUMNS if col in df.columns]].sum()
+    splits.insert(0, "games", grouped.size())
+    splits.insert(0, "skater_full_name", grouped["skater_full_name"].last())
+    for col in ("team_abbrev", "position_code"):
+        if col in df.columns:
+            splits[col] = grouped[col].last()
+    splits["last_game_date"] = grouped["game_date"].max().astype(str)
+    splits["game_ids"] = grouped["game_id"].agg(lambda ids: ",".join(str(int(i)) for i in ids))
+    return splits.reset_index()
+
+
+def merge_opponent_splits(existing: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the players_form rows in new_rows to the existing aggregate rows. Games that
+    an aggregate already points to are skipped, so a re-synced day is not counted twice.
+    Returns the updated rows for the keys touched by new_rows.
+    """
+    if new_rows.empty:
+        return opponent_splits(new_rows)
+    if existing.empty:
+        return opponent_splits(new_rows)
+
+    counted = {
+        (row.player_id, row.opponent_team_abbrev, str(row.season_id), int(game_id))
+        for row in existing.itertuples(index=False)
+        for game_id in str(row.game_ids).split(",") if game_id
+    }
+    keys = zip(new_rows["player_id"], new_rows["opponent_team_abbrev"], new_rows["season_id"].astype(str), new_rows["game_id"].astype(int))
+    new_rows = new_rows[[key not in counted for key in keys]]
+    if new_rows.empty:
+        return opponent_splits(new_rows)
+
+    delta = opponent_splits(new_rows)
+    existing = existing.assign(season_id=existing["season_id"].astype(str))
+    delta = delta.assign(season_id=delta["season_id"].astype(str))
+    touched = existing.merge(delta[OPPONENT_KEYS], on=OPPONENT_KEYS)
+
+    merged = pd.concat([touched, delta], ignore_index=True)
+    grouped = merged.groupby(OPPONENT_KEYS, sort=False)
+    result = grouped[["games"] + [col for col in OPPONENT_SUM_COLUMNS if col in merged.columns]].sum()
+    result.insert(0, "skater_full_name", grouped["skater_full_name"].last())
+    for col in ("team_abbrev", "position_code"):
+        if col in merged.columns:
+            result[col] = grouped[col].last()
+    result["last_game_date"] = grouped["last_game_date"].max()
+    result["game_ids"] = grouped["game_ids"].agg(lambda ids: ",".join(i for i in ids if i))
+    return result.reset_index()
+
+
+def update_opponent_splits(fs, new_rows: pd.DataFrame) -> int:
+    """
+    Incremental update of players_vs_opponent with the players_form rows just inserted
+    by the sync (or a backfill). Only the aggregates of the touched players are read.
+    """
+    if new_rows.empty:
+        print("No new players_form rows, players_vs_opponent not updated")
+        return 0
+
+    fg = fs.get_or_create_feature_group(
+        name=PLAYERS_VS_OPPONENT_FG,
+        description="Totals per player, opponent and season from players_form, with the game ids they are built from",
+        version=1,
+        primary_key=OPPONENT_KEYS,
+    )
+
+    try:
+        player_ids = [int(i) for i in new_rows["player_id"].unique()]
+        existing = fg.filter(fg.player_id.isin(player_ids)).read()
+    except Exception as e:
+        # A new feature group has no data to read yet
+        print(f"Could not read {PLAYERS_VS_OPPONENT_FG}, starting from empty: {e}")
+        existing = pd.DataFrame()
+
+    updated = merge_opponent_splits(existing, new_rows)
+    if updated.empty:
+        return 0
+
+    print(f"Inserting {len(updated)} rows into {PLAYERS_VS_OPPONENT_FG}")
+    fg.insert(updated)
+    util.mark_feature_group_updated(fs, PLAYERS_VS_OPPONENT_FG)
+    return len(updated)
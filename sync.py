@@ -0,0 +1,206 @@
+import time
+from datetime import date
+
+import pandas as pd
+
+import util
+from config import settings
+
+
+WATERMARKS_FG = "ingest_watermarks"
+
+# gameStateId for games that are over (OFF / FINAL) in the NHL stats API
+FINISHED_GAME_STATES = {6, 7}
+
+
+def read_watermarks(fs) -> dict:
+    """
+    Returns {feature_group: {"game_date": date, "game_id": int}} with the last ingested
+    game for each feature group synced by IncrementalSync.
+    """
+    watermarks_fg = fs.get_feature_group(name=WATERMARKS_FG, version=1)
+    if watermarks_fg is None:
+        return {}
+
+    df = watermarks_fg.read()
+    if df.empty:
+        return {}
+
+    df = df.sort_values(["game_date", "game_id"]).drop_duplicates("feature_group", keep="last")
+    return {
+        row["feature_group"]: {
+            "game_date": date.fromisoformat(str(row["game_date"])[:10]),
+            "game_id": int(row["game_id"]),
+        }
+        for _, row in df.iterrows()
+    }
+
+
+def write_watermark(fs, feature_group_name: str, game_date: date, game_id: int) -> None:
+    watermarks_fg = fs.get_or_create_feature_group(
+        name=WATERMARKS_FG,
+        description="Last ingested game per feature group, used by the incremental sync",
+        version=1,
+        primary_key=["feature_group"],
+    )
+    watermarks_fg.insert(
+        pd.DataFrame([{
+            "feature_group": feature_group_name,
+            "game_date": game_date.isoformat(),
+            "game_id": int(game_id),
+            "updated_at": int(time.time() * 1000),
+        }]),
+        write_options={"wait_for_job": False},
+    )
+
+
+def watermark_of(df: pd.DataFrame, id_column: str) -> tuple[date, int] | None:
+    """(game_date, game_id) of the latest game in df, or None if df is empty."""
+    if df.empty:
+        return None
+    dates = pd.to_datetime(df["game_date"])
+    last_date = dates.max()
+    last_id = df.loc[dates == last_date, id_column].max()
+    return last_date.date(), int(last_id)
+
+
+def update_watermark_from(fs, feature_group_name: str, df: pd.DataFrame) -> None:
+    """Writes the watermark for a feature group from the rows that were just inserted (used by the backfills)."""
+    id_column = "id" if feature_group_name == "matches" else "game_id"
+    if feature_group_name == "matches":
+        df = finished_games(df)
+
+    watermark = watermark_of(df, id_column)
+    if watermark is not None:
+        write_watermark(fs, feature_group_name, *watermark)
+
+
+def finished_games(games_df: pd.DataFrame) -> pd.DataFrame:
+    """Games that are over, only these move the matches watermark forward."""
+    if "game_state_id" in games_df.columns:
+        return games_df[games_df["game_state_id"].isin(FINISHED_GAME_STATES)]
+    return games_df[pd.to_datetime(games_df["game_date"]) < pd.Timestamp.today().normalize()]
+
+
+def seasons_between(start: date, end: date) -> list[str]:
+    """Season ids covering every date in [start, end]."""
+    seasons = []
+    for year in range(start.year - 1, end.year + 1):
+        season = f"{year}{year + 1}"
+        season_start, season_end = util.season_date_range(season)
+        if season_start <= end and season_end >= start:
+            seasons.append(season)
+    return seasons
+
+
+def prepare_matches(games_df: pd.DataFrame, team_id_to_name: dict) -> pd.DataFrame:
+    games_df = games_df.rename(columns={col: util.to_snake(col) for col in games_df.columns})
+    games_df["home_team_name"] = games_df["home_team_id"].map(team_id_to_name)
+    games_df["away_team_name"] = games_df["visiting_team_id"].map(team_id_to_name)
+    return games_df
+
+
+def prepare_players_form(players_df: pd.DataFrame) -> pd.DataFrame:
+    players_df = players_df.rename(columns={col: util.to_snake(col) for col in players_df.columns})
+    players_df["season_id"] = players_df["season_id"].astype(str)
+    return players_df
+
+
+def prepare_goalies_form(goalies_df: pd.DataFrame) -> pd.DataFrame:
+    goalies_df = goalies_df.rename(columns={col: util.to_snake(col) for col in goalies_df.columns})
+    goalies_df = goalies_df.drop(columns=["ties"], errors="ignore")
+    return goalies_df
+
+
+class IncrementalSync:
+    """
+    Incremental ingest of matches, players_form and goalies_form.
+
+    Each feature group has a watermark with the last ingested game. A sync fetches
+    only the games from the watermark date up to today and inserts them in batches,
+    so a run after downtime catches up on the missed days instead of losing them.
+    The watermark date itself is fetched again since it may have been partial;
+    the primary keys make the re-insert an upsert.
+    """
+
+    def __init__(self, fs, batch_size: int | None = None) -> None:
+        self.fs = fs
+        self.batch_size = batch_size or settings.SYNC_BATCH_SIZE
+        self.watermarks = read_watermarks(fs)
+
+    def missing_range(self, feature_group_name: str, today: date) -> tuple[date, date]:
+        watermark = self.watermarks.get(feature_group_name)
+        if watermark is None:
+            # No watermark yet: start from the beginning of the current season
+            start, _ = util.season_date_range(util.get_season(today))
+            print(f"No watermark for {feature_group_name}, syncing from {start}")
+            return start, today
+        return watermark["game_date"], today
+
+    def sync_matches(self, today: date | None = None) -> pd.DataFrame:
+        today = today or date.today()
+        start, end = self.missing_range("matches", today)
+
+        teams_df = util.fetch_teams()
+        team_id_to_name = dict(zip(teams_df["id"], teams_df["fullName"]))
+
+        frames = [util.fetch_games_from_nhl(season) for season in seasons_between(start, end)]
+        games_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if games_df.empty:
+            print("No games found, nothing uploaded!")
+            return games_df
+
+        games_df = prepare_matches(games_df, team_id_to_name)
+        dates = pd.to_datetime(games_df["game_date"]).dt.date
+        games_df = games_df[(dates >= start) & (dates <= end)].copy()
+        games_df["game_date"] = games_df["game_date"].astype(str)
+
+        self._insert("matches", games_df, finished_games(games_df), "id")
+        return games_df
+
+    def sync_players_form(self, today: date | None = None) -> pd.DataFrame:
+        return self._sync_game_log("players_form", util.fetch_player_form_for_season, prepare_players_form, today)
+
+    def sync_goalies_form(self, today: date | None = None) -> pd.DataFrame:
+        return self._sync_game_log("goalies_form", util.fetch_goalie_form_for_season, prepare_goalies_form, today)
+
+    def run(self, today: date | None = None) -> dict:
+        """Syncs all three feature groups, returns {feature_group: inserted rows}."""
+        return {
+            "matches": len(self.sync_matches(today)),
+            "players_form": len(self.sync_players_form(today)),
+            "goalies_form": len(self.sync_goalies_form(today)),
+        }
+
+    def _sync_game_log(self, feature_group_name, fetch_fn, prepare_fn, today):
+        today = today or date.today()
+        start, end = self.missing_range(feature_group_name, today)
+
+        frames = [fetch_fn(season, start, end) for season in seasons_between(start, end)]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            print(f"No new games for {feature_group_name}, nothing uploaded!")
+            return pd.DataFrame()
+
+        df = prepare_fn(pd.concat(frames, ignore_index=True))
+        df["game_date"] = df["game_date"].astype(str)
+
+        self._insert(feature_group_name, df, df, "game_id")
+        return df
+
+    def _insert(self, feature_group_name, df, watermark_rows, id_column):
+        if df.empty:
+            print(f"Empty DataFrame for {feature_group_name}, nothing uploaded!")
+            return
+
+        fg = self.fs.get_feature_group(name=feature_group_name, version=1)
+        for offset in range(0, len(df), self.batch_size):
+            batch = df.iloc[offset:offset + self.batch_size]
+            print(f"Inserting {len(batch)} rows into {feature_group_name}")
+            fg.insert(batch)
+        util.mark_feature_group_updated(self.fs, feature_group_name)
+
+        watermark = watermark_of(watermark_rows, id_column)
+        if watermark is not None:
+            write_watermark(self.fs, feature_group_name, *watermark)
+            self.watermarks[feature_group_name] = {"game_date": watermark[0], "game_id": watermark[1]}
@@ -1,8 +1,10 @@
-import requests
 import pandas as pd
 import re
 from datetime import datetime, date, timedelta
-import calendar
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
+from http_client import client
 
 def generate_season_ids(start_year=2000):
     current_year = datetime.now().year
@@ -31,30 +33,25 @@ def fetch_games_from_nhl(season):
     """
     Hämtar alla matcher för en säsong från NHL REST API.
     """
-    url = "https://api.nhle.com/stats/rest/en/game"
+    url = client.url("game")
 
     params = {
         "cayenneExp": f"gameType=2 and season={season}"
     }
 
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-
-    data = response.json()["data"]
+    data = client.get_json(url, params=params)["data"]
     return pd.DataFrame(data)
 
 def fetch_teams():
-    url = "https://api.nhle.com/stats/rest/en/team"
-    response = requests.get(url)
-    response.raise_for_status()
-
-    teams = response.json()["data"]
+    url = client.url("team")
+    teams = client.get_json(url)["data"]
     df = pd.DataFrame(teams)
 
     return df[[
         "id",
         "fullName",
-        "franchiseId"
+        "franchiseId",
+        "triCode"
     ]]
 
 def to_snake(name: str) -> str:
@@ -64,79 +61,116 @@ def to_snake(name: str) -> str:
     return s.lower()
 
 
-def fetch_player_form_for_season(season_id: str) -> pd.DataFrame:
-    PLAYER_GAME_LOG_URL = "https://api.nhle.com/stats/rest/en/skater/summary"
-
-    start_year = int(season_id[:4]) 
-    end_year = int(season_id[4:]) 
-
-    season_start = date(start_year, 10, 1)
-    season_end = date(end_year, 4, 30)
-    all_months = []
-    #Fetch per month in order to get all player stats. The max limit from the api is 10 000 datapoints
-    current = season_start 
-    while current <= season_end:
-        last_day_of_month = calendar.monthrange(current.year, current.month)[1]
-        month_end = date(current.year, current.month, last_day_of_month)
-
-        range_end = min(month_end, season_end)
-
-        params = {
-            "isGame": "true",  
-            "cayenneExp": (
-            f"gameTypeId=2 and seasonId={season_id} "
-            f"and gameDate>='{current.isoformat()}' and gameDate<='{range_end.isoformat()}'"),
-            "limit": -1  
-        }
-        
-        print(f"Downloading {current} to {range_end} for season {season_id}")
-        resp = requests.get(PLAYER_GAME_LOG_URL, params=params, timeout=20)
-        resp.raise_for_status()
-        
-        data = resp.json().get("data")
-
-        if data:
-            df_month = pd.DataFrame(data)
-            print("Shape: " + str(df_month.shape))
-            if "seasonId" not in df_month.columns:
-                df_month["seasonId"] = int(season_id)
-            all_months.append(df_month)
-        
-        current = range_end + timedelta(days=1)
-    
-    if not all_months:
-        return pd.DataFrame()
-    
-    return pd.concat(all_months, ignore_index=True)
+# NHL API:t returnerar max 10 000 rader per anrop
+ROW_CAP = 10000
+# Storleken på de första datumfönstren, fönster som når ROW_CAP delas på mitten
+INITIAL_WINDOW_DAYS = 64
 
 
-def fetch_goalie_form_for_season(season_id: str) -> pd.DataFrame:
-    # URL för målvakter
-    GOALIE_GAME_LOG_URL = "https://api.nhle.com/stats/rest/en/goalie/summary"
-    params = {
-        "isGame": "true",  
-        "cayenneExp": f"gameTypeId=2 and seasonId={season_id}",
-        "limit": -1  
-    }
-    
-    resp = requests.get(GOALIE_GAME_LOG_URL, params=params, timeout=20)
-    resp.raise_for_status()
-    
-    data = resp.json()
-    
-    if "data" not in data or not data["data"]:
+def season_date_range(season_id: str) -> tuple[date, date]:
+    """Datumintervall som täcker grundserien för en säsong, med marginal för förskjutna säsonger."""
+    return date(int(season_id[:4]), 9, 1), date(int(season_id[4:]), 7, 31)
+
+
+def plan_date_windows(start: date, end: date, window_days: int = INITIAL_WINDOW_DAYS) -> list[tuple[date, date]]:
+    """Delar upp [start, end] i fönster om window_days dagar."""
+    windows = []
+    current = start
+    while current <= end:
+        window_end = min(current + timedelta(days=window_days - 1), end)
+        windows.append((current, window_end))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+def _fetch_game_log_window(url: str, season_id: str, start: date, end: date) -> tuple[list, bool]:
+    """
+    Hämtar ett datumfönster. Returnerar (rader, capped) där capped betyder att svaret
+    nådde radtaket och att fönstret måste delas för att inte tappa rader.
+    """
+    cayenne = (
+        f"gameTypeId=2 and seasonId={season_id} "
+        f"and gameDate>='{start.isoformat()}' and gameDate<='{end.isoformat()}'"
+    )
+    payload = client.get_json(url, params={"isGame": "true", "cayenneExp": cayenne, "limit": -1})
+    rows = payload.get("data") or []
+    total = payload.get("total", len(rows))
+    capped = len(rows) >= ROW_CAP or total > len(rows)
+
+    # En enskild dag kan inte delas mer, bläddra i stället med start-offset
+    if capped and start == end:
+        while len(rows) < total:
+            page = client.get_json(
+                url,
+                params={"isGame": "true", "cayenneExp": cayenne, "start": len(rows), "limit": ROW_CAP},
+            ).get("data") or []
+            if not page:
+                break
+            rows.extend(page)
+        capped = False
+
+    return rows, capped
+
+
+def fetch_game_log(path: str, season_id: str, start: date | None = None, end: date | None = None,
+                   max_workers: int | None = None) -> pd.DataFrame:
+    """
+    Hämtar matchloggar (isGame=true) från t.ex. "skater/summary" eller "goalie/summary".
+    Börjar med stora datumfönster och delar rekursivt på mitten de fönster som når radtaket.
+    Fönstren laddas ner parallellt och dubbletter på (playerId, gameId) tas bort.
+    """
+    url = client.url(path)
+    season_start, season_end = season_date_range(season_id)
+    start = max(start or season_start, season_start)
+    end = min(end or season_end, season_end)
+
+    pending = plan_date_windows(start, end)
+    done = []
+    max_workers = max_workers or settings.NHL_MAX_CONNECTIONS
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending:
+            results = list(pool.map(lambda w: _fetch_game_log_window(url, season_id, *w), pending))
+            split = []
+            for (window_start, window_end), (rows, capped) in zip(pending, results):
+                if capped:
+                    mid = window_start + (window_end - window_start) // 2
+                    print(f"{window_start} to {window_end} hit the row cap, splitting ({season_id})")
+                    split += [(window_start, mid), (mid + timedelta(days=1), window_end)]
+                elif rows:
+                    done.append((window_start, rows))
+            pending = split
+
+    if not done:
         return pd.DataFrame()
-    
-    df = pd.DataFrame(data["data"])
-    
+
+    done.sort(key=lambda item: item[0])
+    df = pd.DataFrame([row for _, rows in done for row in rows])
+    if {"playerId", "gameId"}.issubset(df.columns):
+        df = df.drop_duplicates(subset=["playerId", "gameId"], ignore_index=True)
+
+    print(f"Downloaded {len(df)} rows from {path} for season {season_id}")
+    return df
+
+
+def fetch_player_form_for_season(season_id: str, start: date | None = None, end: date | None = None) -> pd.DataFrame:
+    df = fetch_game_log("skater/summary", season_id, start, end)
+
+    if not df.empty and "seasonId" not in df.columns:
+        df["seasonId"] = int(season_id)
+    return df
+
+
+def fetch_goalie_form_for_season(season_id: str, start: date | None = None, end: date | None = None) -> pd.DataFrame:
+    df = fetch_game_log("goalie/summary", season_id, start, end)
+
     # Säkerställ att seasonId finns
-    if "seasonId" not in df.columns:
+    if not df.empty and "seasonId" not in df.columns:
         df["seasonId"] = season_id
-    
     return df
 
 def fetch_player_stats(season_id: str) -> pd.DataFrame:
-    PLAYER_GAME_LOG_URL = "https://api.nhle.com/stats/rest/en/skater/summary"
+    PLAYER_GAME_LOG_URL = client.url("skater/summary")
     cayenne = f"gameTypeId=2 and seasonId={season_id}"
 
     base_params = {
@@ -147,23 +181,18 @@ def fetch_player_stats(season_id: str) -> pd.DataFrame:
         "cayenneExp": cayenne,
     }
 
-    resp = requests.get(PLAYER_GAME_LOG_URL, params=base_params, timeout=20)
-    resp.raise_for_status()
-    data = resp.json()["data"]
+    data = client.get_json(PLAYER_GAME_LOG_URL, params=base_params)["data"]
     return pd.DataFrame(data)
 
 
 def fetch_goalies_for_season(season_id: str) -> pd.DataFrame:
-    GOALIE_URL = "https://api.nhle.com/stats/rest/en/goalie/summary"
+    GOALIE_URL = client.url("goalie/summary")
     params = {
         "cayenneExp": f"gameTypeId=2 and seasonId={season_id}",
         "limit": -1
     }
 
-    resp = requests.get(GOALIE_URL, params=params, timeout=20)
-    resp.raise_for_status()
-
-    data = resp.json()["data"]
+    data = client.get_json(GOALIE_URL, params=params)["data"]
     df = pd.DataFrame(data)
 
     df["seasonId"] = season_id  # säkerställ att den finns
@@ -171,17 +200,61 @@ def fetch_goalies_for_season(season_id: str) -> pd.DataFrame:
 
 
 def fetch_team_for_season(season_id: str) -> pd.DataFrame:
-    URL = "https://api.nhle.com/stats/rest/en/team/summary"
+    URL = client.url("team/summary")
     params = {
         "cayenneExp": f"gameTypeId=2 and seasonId={season_id}",
         "limit": -1
     }
 
-    resp = requests.get(URL, params=params, timeout=20)
-    resp.raise_for_status()
-
-    data = resp.json()["data"]
+    data = client.get_json(URL, params=params)["data"]
     df = pd.DataFrame(data)
 
     df["seasonId"] = season_id  # säkerställ att den finns
-    return df
\ No newline at end of file
+    return df
+
+
+def fetch_seasons(fetch_fn, season_ids, max_workers: int | None = None) -> pd.DataFrame:
+    """
+    Hämtar flera säsonger parallellt, t.ex. fetch_seasons(fetch_goalies_for_season, season_ids).
+    Alla anrop går via den delade klienten, så det är NHL_RATE_LIMIT_PER_SECOND som begränsar farten.
+    Säsonger som misslyckas skrivs ut och hoppas över. Resultatet är i samma ordning som season_ids.
+    """
+    max_workers = max_workers or settings.NHL_MAX_CONNECTIONS
+    frames = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_fn, season_id): season_id for season_id in season_ids}
+        for future in as_completed(futures):
+            season_id = futures[future]
+            try:
+                frames[season_id] = future.result()
+                print(f"Hämtade säsong {season_id}")
+            except Exception as e:
+                print(f"Misslyckades för {season_id}: {e}")
+
+    frames = [frames[season_id] for season_id in season_ids if season_id in frames]
+    if not frames:
+        return pd.DataFrame()
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def mark_feature_group_updated(fs, feature_group_name: str) -> None:
+    """
+    Skriver en versionsmarkör för en feature group efter insert().
+    Agenten läser markörerna och slänger cachade resultat för feature groups som uppdaterats.
+    """
+    versions_fg = fs.get_or_create_feature_group(
+        name="pipeline_versions",
+        description="Version marker per feature group, written by the pipelines after each insert",
+        version=1,
+        primary_key=["feature_group"],
+    )
+
+    versions_fg.insert(
+        pd.DataFrame([{
+            "feature_group": feature_group_name,
+            "version": int(time.time() * 1000),
+        }]),
+        write_options={"wait_for_job": False},
+    )